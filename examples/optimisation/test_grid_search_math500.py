@@ -5,44 +5,34 @@ SPDX-License-Identifier: Apache-2.0
 This expects the math-500 jsonlines dataset to be stored locally.
 """
 
+import json
 import os
 import pandas as pd
-import random
-from bhive import TrialConfig, Hive
+from bhive import TrialConfig, Hive, JsonlDataset
 from .math import answer_math_equal
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 n_samples = 20
 math500_path = f"{current_dir}/math500.jsonl"
+# earlier versions wrote the subset as python dict reprs to math500_subset.jsonl, which are not
+# valid JSON lines, so the subset now lives under a new name and is recreated on first use
+subset_path = f"{current_dir}/math500_subset_v2.jsonl"
 
-with open(math500_path, "r") as f:
-    raw_data: list[str] = f.readlines()
-    parsed_raw_data: list[dict[str, str]] = [eval(line) for line in raw_data]
-random.shuffle(parsed_raw_data)
-
-if not os.path.exists(current_dir + "/math500_subset.jsonl"):
+if not os.path.exists(subset_path):
     print("Creating subset of math500 dataset...")
-    dataset_subset = []
-    for i in range(n_samples):
-        sample = parsed_raw_data[i]
-        problem, answer = sample["problem"], sample["answer"]
-        question = f"""
+    # streams the random subset from disk, without loading the whole file
+    raw_subset = JsonlDataset(math500_path, question_key="problem", answer_key="answer")
+    with open(subset_path, "w") as f:
+        for problem, answer in raw_subset.sample(n_samples):
+            question = f"""
         What is the answer to the following math problem:
         {problem}
 
         Make sure to always state your final answer in <answer> </answer> tags.
         """
-        dataset_subset.append({"q": question, "a": answer})
-
-    # Save subset
-    with open(current_dir + "/math500_subset.jsonl", "w") as f:
-        for sample in dataset_subset:
-            f.write(str(sample) + "\n")
+            f.write(json.dumps({"q": question, "a": answer}) + "\n")
 
-# Load subset into list[tuple]
-with open(current_dir + "/math500_subset.jsonl", "r") as f:
-    test_dataset = [eval(line) for line in f.readlines()]
-    test_dataset = [(s["q"], s["a"]) for s in test_dataset]
+test_dataset = JsonlDataset(subset_path)
 
 
 def math_in_tags(expected_answer: str, response: str):
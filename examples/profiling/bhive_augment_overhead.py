@@ -0,0 +1,41 @@
+"""
+Measures the import time of bhive and the per-call cost of lexical augmentation.
+
+nlpaug and PIL are only imported once an augmentation runs, and the nlpaug augmenters are
+built on the first `augment_character` call and reused afterwards.
+"""
+
+import subprocess
+import sys
+import time
+
+N_CALLS = 200
+TEXT = "A train leaves the station at 3pm travelling at 60 miles per hour, when does it arrive?"
+
+
+def import_seconds(statement: str) -> float:
+    script = (
+        f"import time; start = time.perf_counter(); {statement}; print(time.perf_counter() - start)"
+    )
+    return float(
+        subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True
+        ).stdout
+    )
+
+
+if __name__ == "__main__":
+    print(f"import bhive:                 {import_seconds('import bhive') * 1000:7.1f}ms")
+    print(
+        f"import bhive, nlpaug and PIL: {import_seconds('import bhive, nlpaug.augmenter.word, PIL.Image') * 1000:7.1f}ms"
+    )
+
+    from bhive.augment import augment_character
+
+    start = time.perf_counter()
+    augment_character(TEXT, 4)
+    print(f"first augment_character call: {(time.perf_counter() - start) * 1000:7.1f}ms")
+    start = time.perf_counter()
+    for _ in range(N_CALLS):
+        augment_character(TEXT, 4)
+    print(f"later calls:                  {(time.perf_counter() - start) / N_CALLS * 1000:7.1f}ms")
@@ -0,0 +1,48 @@
+"""
+Measures the CPU time Hive.converse spends per request with a Bedrock client that answers instantly.
+
+With no network latency, everything measured is library overhead: parsing responses, tracking
+the chat histories and usage, and building the returned HiveOutput.
+"""
+
+import time
+
+from bhive import Hive, HiveConfig, set_logger_level
+
+set_logger_level("ERROR")
+
+MODEL = "amazon.nova-micro-v1:0"
+AGGREGATOR = "amazon.nova-lite-v1:0"
+N_CALLS = 2000
+
+_RESPONSE = {
+    "ResponseMetadata": {"HTTPStatusCode": 200},
+    "output": {"message": {"role": "assistant", "content": [{"text": "The answer is 4."}]}},
+    "usage": {"inputTokens": 10, "outputTokens": 20, "totalTokens": 30},
+    "metrics": {"latencyMs": 0},
+    "stopReason": "end_turn",
+}
+
+
+class InstantClient:
+    def converse(self, modelId: str, messages: list[dict], **kwargs) -> dict:
+        return _RESPONSE
+
+
+def cpu_us_per_call(hive_config: HiveConfig) -> float:
+    hive = Hive(client=InstantClient())
+    start = time.process_time()
+    for _ in range(N_CALLS):
+        hive.converse([{"role": "user", "content": [{"text": "What is 2+2?"}]}], hive_config)
+    return (time.process_time() - start) / N_CALLS * 1e6
+
+
+if __name__ == "__main__":
+    configs = {
+        "1 model, 2 reflections": HiveConfig(bedrock_model_ids=[MODEL], num_reflections=2),
+        "3 models, 1 round + aggregator": HiveConfig(
+            bedrock_model_ids=[MODEL] * 3, aggregator_model_id=AGGREGATOR
+        ),
+    }
+    for name, hive_config in configs.items():
+        print(f"{name:<32} {cpu_us_per_call(hive_config):8.1f}us CPU per request")
@@ -0,0 +1,53 @@
+"""
+Measures the library overhead of a large debate with a converse function that returns instantly.
+
+`run_rounds` builds every slot's debate prompt from the other slots' latest answers, so the
+chatlog lookups run once per slot per round. The first figure times the whole debate, the
+second only the lookups made in the final round, when the histories are longest.
+"""
+
+import time
+
+from bhive import HiveConfig, set_logger_level
+from bhive.chat import ChatLog, ConverseResponse
+from bhive.inference import run_rounds
+
+set_logger_level("ERROR")
+
+MODEL = "amazon.nova-micro-v1:0"
+N_SLOTS = 32
+N_ROUNDS = 10
+N_REPEATS = 5
+
+
+def _instant_converse(model_id: str, messages: list[dict], **kwargs) -> ConverseResponse:
+    return ConverseResponse(answer=f"Answer {len(messages)} from {model_id}")
+
+
+def _new_chatlog() -> ChatLog:
+    return ChatLog([MODEL] * N_SLOTS, [{"role": "user", "content": [{"text": "What is 2+2?"}]}])
+
+
+def time_debate(hive_config: HiveConfig) -> float:
+    start = time.perf_counter()
+    run_rounds(hive_config, _new_chatlog(), _instant_converse)
+    return time.perf_counter() - start
+
+
+def time_final_round_lookups(hive_config: HiveConfig) -> float:
+    chatlog = run_rounds(hive_config, _new_chatlog(), _instant_converse)
+    start = time.perf_counter()
+    for index in range(N_SLOTS):
+        chatlog.get_recent_other_answers(index)
+    chatlog.get_last_answer()
+    chatlog.get_last_thinking()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    hive_config = HiveConfig(bedrock_model_ids=[MODEL] * N_SLOTS, num_reflections=N_ROUNDS - 1)
+    debate = min(time_debate(hive_config) for _ in range(N_REPEATS))
+    lookups = min(time_final_round_lookups(hive_config) for _ in range(N_REPEATS))
+    print(f"{N_SLOTS} slots x {N_ROUNDS} rounds")
+    print(f"whole debate:        {debate * 1000:8.2f}ms")
+    print(f"final round lookups: {lookups * 1e6:8.1f}us")
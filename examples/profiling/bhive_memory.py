@@ -0,0 +1,46 @@
+"""
+Measures the peak memory of a multimodal Hive.converse request as the number of model slots grows.
+
+Slots share the prompt messages, so a request carrying a large image should use about the same
+memory with 1 or 10 slots. Tracemalloc counts the Python allocations made during the request,
+the prompt itself is allocated beforehand and is not included.
+"""
+
+import os
+import tracemalloc
+
+from bhive import Hive, HiveConfig, set_logger_level
+from bhive.simulator import SimulatedBedrockClient
+
+set_logger_level("ERROR")
+
+MODEL = "amazon.nova-lite-v1:0"
+IMAGE_MB = 5
+SLOTS = [1, 2, 5, 10]
+N_REFLECTIONS = 2
+
+
+def peak_memory_mb(n_slots: int, image_bytes: bytes) -> float:
+    hive = Hive(client=SimulatedBedrockClient())
+    hive_config = HiveConfig(bedrock_model_ids=[MODEL] * n_slots, num_reflections=N_REFLECTIONS)
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {"text": "Describe this image"},
+                {"image": {"format": "png", "source": {"bytes": image_bytes}}},
+            ],
+        }
+    ]
+    tracemalloc.start()
+    hive.converse(messages, hive_config)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+if __name__ == "__main__":
+    image_bytes = os.urandom(IMAGE_MB * 1024 * 1024)
+    print(f"{IMAGE_MB}MB image, {N_REFLECTIONS} debate rounds")
+    for n_slots in SLOTS:
+        print(f"{n_slots:>3} slots: peak {peak_memory_mb(n_slots, image_bytes):8.2f}MB")
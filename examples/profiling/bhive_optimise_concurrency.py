@@ -0,0 +1,42 @@
+"""
+Compares serial and concurrent Hive.optimise wall-clock time using the simulated client.
+
+Every simulated Bedrock call sleeps for a fixed latency, so the speedup reflects how well
+independent (config, sample) pairs overlap rather than any real model behaviour.
+"""
+
+import time
+
+from bhive import Hive, TrialConfig, set_logger_level
+from bhive.simulator import SimulatedBedrockClient
+
+set_logger_level("ERROR")
+
+MODELS = ["amazon.nova-micro-v1:0", "amazon.nova-lite-v1:0", "amazon.nova-pro-v1:0"]
+N_SAMPLES = 20
+LATENCY_SECONDS = 0.05
+MAX_WORKERS = [1, 4, 16, 32]
+MAX_CALLS_PER_MODEL = 16
+
+dataset = [(f"What is {i} + {i}?", str(2 * i)) for i in range(N_SAMPLES)]
+trial_config = TrialConfig(
+    bedrock_model_combinations=[[m] for m in MODELS],
+    reflection_range=[0, 1, 2],
+)
+
+
+def run(max_workers: int) -> float:
+    simulator = SimulatedBedrockClient(latency_seconds=LATENCY_SECONDS)
+    hive = Hive(client=simulator, max_concurrent_calls_per_model=MAX_CALLS_PER_MODEL)
+    start = time.perf_counter()
+    hive.optimise(dataset, trial_config, max_workers=max_workers)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    n_pairs = len(trial_config._all_configuration_options()) * N_SAMPLES
+    print(f"{n_pairs} (config, sample) pairs, {LATENCY_SECONDS * 1000:.0f}ms per simulated call")
+    serial = run(1)
+    for workers in MAX_WORKERS:
+        elapsed = serial if workers == 1 else run(workers)
+        print(f"max_workers={workers:>3}: {elapsed:6.2f}s  speedup x{serial / elapsed:5.1f}")
@@ -0,0 +1,49 @@
+"""
+Times visual augmentation of a multi-image prompt for many model slots.
+
+Compares augmenting every slot separately, which decodes every image once per slot, with
+rendering all variants from a single decode, first in this process and then in a process
+pool. With the pool, the time should fall with the number of cores rather than grow with slots.
+"""
+
+import io
+import os
+import time
+
+from PIL import Image
+
+from bhive.augment import augment_images_in_content, augment_images_in_content_variants
+
+N_SLOTS = 8
+N_IMAGES = 4
+IMAGE_SIZE = (1600, 1200)
+
+
+def _jpeg(seed: int) -> bytes:
+    buf = io.BytesIO()
+    Image.effect_mandelbrot(IMAGE_SIZE, (-2 + seed / 10, -1.2, 1, 1.2), 100).convert("RGB").save(
+        buf, format="JPEG", quality=90
+    )
+    return buf.getvalue()
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    content = [{"text": "Compare these images"}] + [
+        {"image": {"format": "jpeg", "source": {"bytes": _jpeg(i)}}} for i in range(N_IMAGES)
+    ]
+    processes = os.cpu_count() or 1
+    augment_images_in_content_variants(content, 2, processes=processes)  # starts the pool
+
+    per_slot = timed(lambda: [augment_images_in_content(content) for _ in range(N_SLOTS)])
+    single_decode = timed(lambda: augment_images_in_content_variants(content, N_SLOTS, 0))
+    pooled = timed(lambda: augment_images_in_content_variants(content, N_SLOTS, processes))
+    print(f"{N_SLOTS} slots x {N_IMAGES} images of {IMAGE_SIZE[0]}x{IMAGE_SIZE[1]}")
+    print(f"decode per slot:           {per_slot:6.2f}s")
+    print(f"single decode, in process: {single_decode:6.2f}s")
+    print(f"single decode, {processes:>2} processes: {pooled:6.2f}s")
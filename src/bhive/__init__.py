@@ -7,11 +7,18 @@ import sys
 
 from loguru import logger
 
+from bhive.archive import OutputArchive as OutputArchive
 from bhive.client import Hive as Hive
 from bhive.config import HiveConfig as HiveConfig
+from bhive.config import ImagePreprocessing as ImagePreprocessing
+from bhive.config import InferenceParameters as InferenceParameters
 from bhive.config import TrialConfig as TrialConfig
 from bhive.cost import TokenPrices as TokenPrices
+from bhive.datasets import JsonlDataset as JsonlDataset
 from bhive.evaluators import BudgetConfig as BudgetConfig
+from bhive.rephrase_cache import RephraseCache as RephraseCache
+from bhive.search import EarlyStopping as EarlyStopping
+from bhive.search import SuccessiveHalving as SuccessiveHalving
 
 LOGGER_LEVELS = ["TRACE", "DEBUG", "INFO", "SUCCESS", "WARNING", "ERROR", "CRITICAL"]
 
@@ -0,0 +1,89 @@
+"""
+Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+SPDX-License-Identifier: Apache-2.0
+"""
+
+import json
+import os
+import threading
+from typing import Any, Iterator
+
+from bhive.blobs import content_hash
+from bhive.chat import HiveOutput
+
+_HASH_KEY = "sha256"
+
+
+class OutputArchive:
+    """
+    Append-only JSON lines archive of `HiveOutput`s, one output per line.
+
+    Image and document bytes in the chat history are replaced by `{"sha256": <digest>}`,
+    so lines stay small and an image sent to every model slot is stored once. With a
+    `blob_dir` the bytes are written there under their digest, and `read(resolve_blobs=True)`
+    puts them back. Combine with `HiveConfig.output_detail` to keep less history per line.
+
+    Parameters:
+        path (str | os.PathLike): The JSON lines file, appended to if it exists.
+        blob_dir (str | os.PathLike | None): Directory keeping each distinct blob once, without
+            it only the digests are archived.
+    """
+
+    def __init__(self, path: str | os.PathLike, blob_dir: str | os.PathLike | None = None):
+        self.path = path
+        self.blob_dir = blob_dir
+        self._lock = threading.Lock()
+        if blob_dir is not None:
+            os.makedirs(blob_dir, exist_ok=True)
+
+    def write(self, output: HiveOutput, **metadata: Any) -> None:
+        """Appends `output` along with any JSON serialisable metadata, e.g. a request id."""
+        digests: dict[int, str] = {}  # slots share their prompt, so each blob is hashed once
+
+        def _encode(value):
+            if isinstance(value, (bytes, bytearray)):
+                if id(value) not in digests:
+                    digests[id(value)] = self._store(value)
+                return {_HASH_KEY: digests[id(value)]}
+            raise TypeError(f"Cannot archive values of type {type(value).__name__}")
+
+        record = {"metadata": metadata, "output": output.model_dump(serialize_as_any=True)}
+        line = json.dumps(record, default=_encode) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def _store(self, blob: bytes) -> str:
+        digest = content_hash(blob)
+        if self.blob_dir is not None:
+            path = os.path.join(self.blob_dir, digest)
+            if not os.path.exists(path):
+                # written under a temporary name so readers never see a partial blob
+                partial = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(partial, "wb") as f:
+                    f.write(blob)
+                os.replace(partial, path)
+        return digest
+
+    def read(self, resolve_blobs: bool = False) -> Iterator[dict]:
+        """Yields archived records as `{"metadata": ..., "output": ...}` dictionaries."""
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                yield self._resolve(record) if resolve_blobs else record
+
+    def _resolve(self, value):
+        if isinstance(value, dict):
+            if value.keys() == {_HASH_KEY}:
+                return self.load_blob(value[_HASH_KEY])
+            return {k: self._resolve(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._resolve(v) for v in value]
+        return value
+
+    def load_blob(self, digest: str) -> bytes:
+        if self.blob_dir is None:
+            raise ValueError("Blobs can only be loaded from an archive with a blob_dir")
+        with open(os.path.join(self.blob_dir, digest), "rb") as f:
+            return f.read()
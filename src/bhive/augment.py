@@ -3,17 +3,23 @@ Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 SPDX-License-Identifier: Apache-2.0
 """
 
-import copy
+import atexit
+import concurrent.futures
 import io
+import multiprocessing
 import random
 import re
-from typing import Callable
-
-import nlpaug.augmenter.char as nac
-import nlpaug.augmenter.word as naw
-from PIL import Image, ImageEnhance
+import threading
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, Callable
 
 from bhive import logger, prompt
+from bhive.cost import ConverseUsage
+from bhive.rephrase_cache import RephraseCache, rephrase_key
+
+# nlpaug and PIL are slow to import, so they are only loaded once an augmentation needs them
+if TYPE_CHECKING:
+    from PIL import Image
 
 
 def detect_image_format(image_bytes: bytes) -> str:
@@ -35,38 +41,68 @@ def augment_llm(
     converse_func: Callable,
     model_id: str,
     content_blocks: list[dict] | None = None,
+    cache: RephraseCache | None = None,
 ) -> list[str]:
     """Use an LLM to rephrase the user prompt into n variants.
 
     If content_blocks is provided (e.g. containing images), they are included
-    before the rephrase prompt so the model has full context.
+    before the rephrase prompt so the model has full context. With a `cache`, prompts
+    rephrased before by the same model are answered without calling it.
     """
-    rephrase_prompt = prompt.rephrase.format(n=n, prompt=text)
-    content: list[dict] = []
-    if content_blocks:
-        content.extend(b for b in content_blocks if "image" in b)
-    content.append({"text": rephrase_prompt})
-    messages = [{"role": "user", "content": content}]
-    response = converse_func(model_id=model_id, messages=messages)
-    rephrased = []
-    for i in range(1, n + 1):
-        match = re.search(rf"<q{i}>(.*?)</q{i}>", response.answer, re.DOTALL)
-        if match:
-            rephrased.append(match.group(1).strip())
-    while len(rephrased) < n:
+
+    def _generate() -> tuple[list[str], ConverseUsage]:
+        rephrase_prompt = prompt.rephrase.format(n=n, prompt=text)
+        content: list[dict] = []
+        if content_blocks:
+            content.extend(b for b in content_blocks if "image" in b)
+        content.append({"text": rephrase_prompt})
+        messages = [{"role": "user", "content": content}]
+        response = converse_func(model_id=model_id, messages=messages)
+        rephrased = []
+        for i in range(1, n + 1):
+            match = re.search(rf"<q{i}>(.*?)</q{i}>", response.answer, re.DOTALL)
+            if match:
+                rephrased.append(match.group(1).strip())
+        usage = ConverseUsage(
+            inputTokens=response.usage.inputTokens, outputTokens=response.usage.outputTokens
+        )
+        return rephrased, usage
+
+    if cache is None:
+        rephrased, _ = _generate()
+    else:
+        key = rephrase_key(text, model_id, content_blocks)
+        rephrased = list(cache.get_or_generate(key, n, model_id, _generate))
+    if len(rephrased) < n:
         logger.warning(f"LLM produced {len(rephrased)}/{n} rephrasings, padding with original.")
-        rephrased.append(text)
+        rephrased.extend([text] * (n - len(rephrased)))
     return rephrased
 
 
+_character_augmenters: list | None = None
+_character_augmenters_lock = threading.Lock()
+
+
+def _get_character_augmenters() -> list:
+    """nlpaug augmenters shared by every call in this process, built on first use."""
+    global _character_augmenters
+    with _character_augmenters_lock:
+        if _character_augmenters is None:
+            import nlpaug.augmenter.char as nac
+            import nlpaug.augmenter.word as naw
+
+            _character_augmenters = [
+                nac.KeyboardAug(aug_char_p=0.1, aug_word_p=0.1),
+                nac.OcrAug(aug_char_p=0.1, aug_word_p=0.1),
+                nac.RandomCharAug(aug_char_p=0.1, aug_word_p=0.1),
+                naw.SpellingAug(aug_p=0.1),
+            ]
+        return _character_augmenters
+
+
 def augment_character(text: str, n: int) -> list[str]:
     """Apply character-level perturbations using nlpaug."""
-    augmenters = [
-        nac.KeyboardAug(aug_char_p=0.1, aug_word_p=0.1),
-        nac.OcrAug(aug_char_p=0.1, aug_word_p=0.1),
-        nac.RandomCharAug(aug_char_p=0.1, aug_word_p=0.1),
-        naw.SpellingAug(aug_p=0.1),
-    ]
+    augmenters = _get_character_augmenters()
     results = []
     for _ in range(n):
         aug = random.choice(augmenters)
@@ -83,15 +119,37 @@ def augment_character(text: str, n: int) -> list[str]:
 
 def augment_image(image_bytes: bytes) -> bytes:
     """Apply a random visual transformation (rotate, brightness, contrast) to an image."""
+    from PIL import Image
+
     fmt = detect_image_format(image_bytes)
     img = Image.open(io.BytesIO(image_bytes))
+    return _encode_image(_transform_image(img, *_random_transform()), fmt)
+
+
+def _random_transform() -> tuple[str, float]:
     transform = random.choice(["rotate", "brightness", "contrast"])
     if transform == "rotate":
-        img = img.rotate(random.uniform(-15, 15), expand=True)
+        return transform, random.uniform(-15, 15)
+    return transform, random.uniform(0.7, 1.3)
+
+
+def _transform_image(img: "Image.Image", transform: str, amount: float) -> "Image.Image":
+    from PIL import ImageEnhance
+
+    if transform == "rotate":
+        size = img.size
+        img = img.rotate(amount, expand=True)
+        img.thumbnail(size)  # keeps the whole image without growing the canvas
     elif transform == "brightness":
-        img = ImageEnhance.Brightness(img).enhance(random.uniform(0.7, 1.3))
+        img = ImageEnhance.Brightness(img).enhance(amount)
     else:
-        img = ImageEnhance.Contrast(img).enhance(random.uniform(0.7, 1.3))
+        img = ImageEnhance.Contrast(img).enhance(amount)
+    return img
+
+
+def _encode_image(img: "Image.Image", fmt: str) -> bytes:
+    if fmt == "jpeg" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
     buf = io.BytesIO()
     save_fmt = {"png": "PNG", "jpeg": "JPEG", "gif": "GIF", "webp": "WEBP"}[fmt]
     img.save(buf, format=save_fmt)
@@ -99,9 +157,135 @@ def augment_image(image_bytes: bytes) -> bytes:
 
 
 def augment_images_in_content(content: list[dict]) -> list[dict]:
-    """Augment all image blocks in a Converse API content list, preserving text."""
-    new_content = copy.deepcopy(content)
-    for block in new_content:
-        if "image" in block:
-            block["image"]["source"]["bytes"] = augment_image(block["image"]["source"]["bytes"])
-    return new_content
+    """Augment all image blocks in a Converse API content list, preserving text.
+
+    Returns a new list, blocks other than images are shared with `content` rather than copied.
+    """
+    return augment_images_in_content_variants(content, 1, processes=0)[0]
+
+
+def augment_images_in_content_variants(
+    content: list[dict], n: int, processes: int = 0
+) -> list[list[dict]]:
+    """`n` independently augmented copies of `content`, e.g. one per model slot.
+
+    Every image is decoded once. With `processes`, its pixels are shared with a pool of that
+    many worker processes that each render and encode a single variant, the pool is kept for
+    later calls and shut down at exit. By default, or with a single variant to render,
+    everything runs in this process.
+    """
+    positions = [i for i, block in enumerate(content) if "image" in block]
+    if not positions or n < 1:
+        return [list(content) for _ in range(n)]
+
+    # transforms are drawn here so `random.seed` keeps augmentation reproducible
+    transforms = [[_random_transform() for _ in positions] for _ in range(n)]
+    decoded = [_decode_image(content[i]["image"]["source"]["bytes"]) for i in positions]
+    formats = [detect_image_format(content[i]["image"]["source"]["bytes"]) for i in positions]
+    if processes < 1 or n * len(positions) < 2:
+        rendered = [
+            [_encode_image(_transform_image(img, *t), f) for img, t, f in zip(decoded, ts, formats)]
+            for ts in transforms
+        ]
+    else:
+        rendered = _render_in_pool(decoded, formats, transforms, processes)
+
+    variants = []
+    for variant_bytes in rendered:
+        new_content = list(content)
+        for i, image_bytes in zip(positions, variant_bytes):
+            image = content[i]["image"]
+            source = {**image["source"], "bytes": image_bytes}
+            new_content[i] = {**content[i], "image": {**image, "source": source}}
+        variants.append(new_content)
+    return variants
+
+
+def _decode_image(image_bytes: bytes) -> "Image.Image":
+    from PIL import Image
+
+    img: Image.Image = Image.open(io.BytesIO(image_bytes))
+    if img.mode not in ("RGB", "RGBA", "L", "LA"):
+        img = img.convert("RGBA")  # e.g. palette images, whose raw pixels need the palette
+    img.load()
+    return img
+
+
+_pool: concurrent.futures.ProcessPoolExecutor | None = None
+_pool_processes = 0
+_pool_lock = threading.Lock()
+
+
+def _process_pool(processes: int) -> concurrent.futures.ProcessPoolExecutor:
+    global _pool, _pool_processes
+    with _pool_lock:
+        if _pool is None or _pool_processes != processes:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # forkserver workers do not inherit the locks of this (threaded) process
+            method = (
+                "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else None
+            )
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                processes, mp_context=multiprocessing.get_context(method)
+            )
+            _pool_processes = processes
+        return _pool
+
+
+def _shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+atexit.register(_shutdown_pool)
+
+
+def _render_in_pool(
+    decoded: list["Image.Image"],
+    formats: list[str],
+    transforms: list[list[tuple[str, float]]],
+    processes: int,
+) -> list[list[bytes]]:
+    shared = []
+    try:
+        for img in decoded:
+            pixels = img.tobytes()
+            memory = shared_memory.SharedMemory(create=True, size=max(len(pixels), 1))
+            assert memory.buf is not None
+            memory.buf[: len(pixels)] = pixels
+            shared.append(memory)
+        tasks = [
+            (memory.name, img.mode, img.size, fmt, transform)
+            for variant in transforms
+            for memory, img, fmt, transform in zip(shared, decoded, formats, variant)
+        ]
+        try:
+            rendered = list(_process_pool(processes).map(_render_variant, tasks))
+        except concurrent.futures.process.BrokenProcessPool:
+            logger.warning("Visual augmentation pool failed, rendering in this process instead.")
+            _shutdown_pool()
+            rendered = [_render_variant(task) for task in tasks]
+    finally:
+        for memory in shared:
+            memory.close()
+            memory.unlink()
+    n_images = len(decoded)
+    return [rendered[i : i + n_images] for i in range(0, len(rendered), n_images)]
+
+
+def _render_variant(task: tuple) -> bytes:
+    # workers share the resource tracker of this process, so attaching does not own the memory
+    name, mode, size, fmt, (transform, amount) = task
+    from PIL import Image
+
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        assert memory.buf is not None
+        img = Image.frombytes(mode, size, memory.buf)
+    finally:
+        memory.close()
+    return _encode_image(_transform_image(img, transform, amount), fmt)
@@ -0,0 +1,103 @@
+"""
+Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+SPDX-License-Identifier: Apache-2.0
+"""
+
+import dataclasses
+import hashlib
+
+
+def content_hash(blob: bytes) -> str:
+    """Stable key of binary content such as images, used wherever bytes are referenced."""
+    return hashlib.sha256(blob).hexdigest()
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class BlobRef:
+    """Handle to bytes held by a `BlobStore`, stands in for them in Converse content blocks."""
+
+    digest: str
+    size: int
+
+    def __repr__(self) -> str:
+        # keeps logged messages short however large the image
+        return f"BlobRef(sha256={self.digest[:12]}, size={self.size})"
+
+
+class BlobStore:
+    """
+    Content-addressed store of the binary content (images, documents, videos) of a request.
+
+    Messages are interned once when a request starts, replacing every `source.bytes` with a
+    `BlobRef` keyed by the SHA-256 of the content, the same key used by `OutputArchive`.
+    Chat histories, augmentation and logs then only handle the references, and the bytes
+    are put back by `materialise` when a Converse payload or the returned output is built.
+    Both only copy the message dicts leading to binary content, everything else is shared.
+    """
+
+    def __init__(self) -> None:
+        self._blobs: dict[str, bytes] = {}
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    def put(self, blob: bytes) -> BlobRef:
+        digest = content_hash(blob)
+        self._blobs.setdefault(digest, blob)
+        return BlobRef(digest=digest, size=len(blob))
+
+    def get(self, ref: BlobRef) -> bytes:
+        return self._blobs[ref.digest]
+
+    def discard(self, ref: BlobRef) -> None:
+        """Drops bytes no message references any more, e.g. images replaced by preprocessing."""
+        self._blobs.pop(ref.digest, None)
+
+    def intern(self, messages: list[dict]) -> list[dict]:
+        """Messages with their binary content replaced by references."""
+        return [self._map_message(m, self._intern_source) for m in messages]
+
+    def intern_content(self, content: list[dict]) -> list[dict]:
+        return _map_content(content, self._intern_source)
+
+    def materialise(self, messages: list[dict]) -> list[dict]:
+        """Messages with every reference replaced by its bytes, ready to send to Bedrock."""
+        return [self._map_message(m, self._materialise_source) for m in messages]
+
+    def materialise_content(self, content: list[dict]) -> list[dict]:
+        return _map_content(content, self._materialise_source)
+
+    def _intern_source(self, source: dict) -> dict:
+        blob = source.get("bytes")
+        if isinstance(blob, (bytes, bytearray)):
+            return {**source, "bytes": self.put(bytes(blob))}
+        return source
+
+    def _materialise_source(self, source: dict) -> dict:
+        ref = source.get("bytes")
+        if isinstance(ref, BlobRef):
+            return {**source, "bytes": self.get(ref)}
+        return source
+
+    @staticmethod
+    def _map_message(message: dict, map_source) -> dict:
+        content = message.get("content")
+        if not isinstance(content, list):
+            return message
+        new_content = _map_content(content, map_source)
+        return message if new_content is content else {**message, "content": new_content}
+
+
+def _map_content(content: list[dict], map_source) -> list[dict]:
+    # returns `content` itself when nothing changed, so untouched messages stay shared
+    new_content, changed = [], False
+    for block in content:
+        new_block = block
+        for kind, value in block.items():
+            if isinstance(value, dict) and isinstance(value.get("source"), dict):
+                source = map_source(value["source"])
+                if source is not value["source"]:
+                    new_block = {**new_block, kind: {**value, "source": source}}
+        changed = changed or new_block is not block
+        new_content.append(new_block)
+    return new_content if changed else content
@@ -4,9 +4,12 @@ SPDX-License-Identifier: Apache-2.0
 """
 
 import copy
+import dataclasses
+from typing import Callable
 
 import pydantic
 
+from bhive.blobs import BlobStore
 from bhive.cost import ConverseMetrics, ConverseUsage, TotalCost
 
 DEFAULT_CACHING = {"cachePoint": {"type": "default"}}
@@ -21,6 +24,58 @@ class ConverseResponse(pydantic.BaseModel):
     trace: dict[str, dict] = {}
 
 
+class ImagePreprocessingStats(pydantic.BaseModel):
+    """Effect of `HiveConfig.image_preprocessing` on the prompt, tokens follow a rough estimate."""
+
+    n_images: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    estimated_tokens_before: int = 0
+    estimated_tokens_after: int = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+    @property
+    def estimated_tokens_saved(self) -> int:
+        # saved on every call sending the prompt, i.e. each slot in each round
+        return self.estimated_tokens_before - self.estimated_tokens_after
+
+
+class EarlyStopRound(pydantic.BaseModel):
+    """Calls of a round stopped at `HiveConfig.stop_after_tag`, `round` is None for aggregation.
+
+    `min_output_tokens_saved` is a lower bound, crediting each stopped call with the fewest
+    tokens a call of the same request that was not stopped (e.g. an earlier debate round) wrote
+    after the tag. Requests where every call stopped, such as without reflections, have nothing
+    to estimate from and report 0 even though stopping saved tokens.
+    """
+
+    round: int | None
+    n_calls: int = 0
+    n_stopped: int = 0
+    min_output_tokens_saved: int = 0
+
+
+class StructuredOutputRepairs(pydantic.BaseModel):
+    """Answers that did not parse into `HiveConfig.output_model` and how they were repaired.
+
+    `cost` covers the follow-up turns only, which are also included in the output's usage and cost.
+    """
+
+    n_failed: int = 0
+    n_local_repairs: int = 0
+    n_followup_calls: int = 0
+    n_followup_repairs: int = 0
+    n_unrepaired: int = 0
+    cost: float = 0.0
+
+    @property
+    def n_repairs(self) -> int:
+        return self.n_local_repairs + self.n_followup_repairs
+
+
 class HiveOutput(pydantic.BaseModel):
     response: str | list[str]
     parsed_response: pydantic.BaseModel | list[pydantic.BaseModel] | None
@@ -31,6 +86,9 @@ class HiveOutput(pydantic.BaseModel):
     cost: TotalCost
     stopReason: str
     trace: dict[str, dict]
+    image_preprocessing: ImagePreprocessingStats | None = None
+    early_stopping: list[EarlyStopRound] | None = None
+    structured_output_repairs: StructuredOutputRepairs | None = None
 
 
 class ModelChatLog(pydantic.BaseModel):
@@ -39,33 +97,185 @@ class ModelChatLog(pydantic.BaseModel):
     thinking_history: list[str]
 
 
+# Lightweight records used while a request runs, the pydantic models above are only built
+# once for the returned HiveOutput as validating them on every call shows up under load.
+
+
+@dataclasses.dataclass(slots=True)
+class UsageRecord:
+    inputTokens: int = 0
+    outputTokens: int = 0
+    cacheReadInputTokens: int = 0
+    cacheWriteInputTokens: int = 0
+
+    def to_model(self) -> ConverseUsage:
+        return ConverseUsage.model_construct(
+            inputTokens=self.inputTokens,
+            outputTokens=self.outputTokens,
+            cacheReadInputTokens=self.cacheReadInputTokens,
+            cacheWriteInputTokens=self.cacheWriteInputTokens,
+        )
+
+
+@dataclasses.dataclass(slots=True)
+class MetricsRecord:
+    latencyMs: int = 0
+
+    def to_model(self) -> ConverseMetrics:
+        return ConverseMetrics.model_construct(latencyMs=self.latencyMs)
+
+
+@dataclasses.dataclass(slots=True)
+class ConverseRecord:
+    """Parsed Converse API response, read through the same attributes as `ConverseResponse`."""
+
+    answer: str
+    thinking: str = ""
+    usage: UsageRecord = dataclasses.field(default_factory=UsageRecord)
+    metrics: MetricsRecord = dataclasses.field(default_factory=MetricsRecord)
+    stopReason: str = ""
+    trace: dict[str, dict] = dataclasses.field(default_factory=dict)
+
+    @classmethod
+    def from_bedrock(cls, response: dict, answer: str, thinking: str) -> "ConverseRecord":
+        usage = response["usage"]
+        return cls(
+            answer=answer,
+            thinking=thinking,
+            usage=UsageRecord(
+                inputTokens=usage.get("inputTokens", 0),
+                outputTokens=usage.get("outputTokens", 0),
+                cacheReadInputTokens=usage.get("cacheReadInputTokens", 0),
+                cacheWriteInputTokens=usage.get("cacheWriteInputTokens", 0),
+            ),
+            metrics=MetricsRecord(latencyMs=response["metrics"].get("latencyMs", 0)),
+            stopReason=response["stopReason"],
+            trace=response.get("trace", {}),
+        )
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class StopRecord:
+    round: int | None
+    stopped: bool
+    tail_tokens: float | None  # output tokens written after the tag by a call that was not stopped
+
+
+@dataclasses.dataclass(slots=True)
+class SlotLog:
+    modelid: str
+    chat_history: list[dict]
+    thinking_history: list[str]
+
+    def to_model(self, detail: str = "full", blobs: BlobStore | None = None) -> ModelChatLog:
+        """Public copy of the slot, `detail` as in `HiveConfig.output_detail`.
+
+        Binary content referenced in `blobs` is materialised.
+        """
+        if detail == "full":
+            chat_history, thinking_history = self.chat_history, self.thinking_history
+        elif detail == "last_round":
+            # from the last prompt onwards, which also keeps an aggregated answer
+            roles = [m.get("role") for m in self.chat_history]
+            start = len(roles) - 1 - roles[::-1].index("user") if "user" in roles else 0
+            chat_history, thinking_history = self.chat_history[start:], self.thinking_history[-1:]
+        else:
+            chat_history, thinking_history = [], []
+        return ModelChatLog.model_construct(
+            modelid=self.modelid,
+            chat_history=blobs.materialise(chat_history) if blobs else list(chat_history),
+            thinking_history=list(thinking_history),
+        )
+
+
 class ChatLog:
+    """
+    Per model slot chat histories of a single request.
+
+    Slots share the initial prompt messages rather than copying them, so a request holding
+    large images uses the same memory however many slots it has. Recorded messages are never
+    mutated, a slot diverging from the shared prompt (e.g. after augmentation) replaces the
+    message with `replace_prompt_content` instead.
+    """
+
     _USER = "user"
     _ASSISTANT = "assistant"
 
     def __init__(
-        self, model_ids: list[str], messages: list[dict], use_prompt_caching: bool = False
+        self,
+        model_ids: list[str],
+        messages: list[dict],
+        use_prompt_caching: bool = False,
+        blobs: BlobStore | None = None,
     ) -> None:
         self.models = model_ids
+        self.blobs = blobs or BlobStore()  # holds the content of messages interned by the caller
+        self.image_stats: ImagePreprocessingStats | None = None
+        # blocks a slot's first call until its prompt is ready, e.g. while it is being rephrased
+        self.prompt_gate: Callable[[int], None] | None = None
         if use_prompt_caching:
             messages[-1]["content"].append(DEFAULT_CACHING)  # cache initial prompt
-        self.history: list[ModelChatLog] = [
-            ModelChatLog(modelid=m, chat_history=copy.deepcopy(messages), thinking_history=[])
-            for m in self.models
-        ]
-        self.metrics = {m: ConverseMetrics() for m in model_ids}
-        self.usage = {m: ConverseUsage() for m in model_ids}
+        self.history: list[SlotLog] = [SlotLog(m, list(messages), []) for m in self.models]
+        # per slot index of the latest answer, thinking trace and round, updated on every message
+        self._last_answers: list[dict | None] = [None] * len(self.models)
+        self._last_thinking: list[str] = [""] * len(self.models)
+        self._rounds: list[int] = [0] * len(self.models)
+        self._metrics = {m: MetricsRecord() for m in model_ids}
+        self._usage = {m: UsageRecord() for m in model_ids}
+        self._stop_records: list[StopRecord] = []
         self.use_prompt_caching = use_prompt_caching
         self.max_checkpoints = 4
         self.n_cache_checkpoints = 1
 
-    def update_stats(self, modelid: str, stats: ConverseResponse):
-        # update usage
-        self.usage[modelid].inputTokens += stats.usage.inputTokens
-        self.usage[modelid].outputTokens += stats.usage.outputTokens
-        self.usage[modelid].cacheReadInputTokens += stats.usage.cacheReadInputTokens
-        self.usage[modelid].cacheWriteInputTokens += stats.usage.cacheWriteInputTokens
-        self.metrics[modelid].latencyMs += stats.metrics.latencyMs
+    @property
+    def usage(self) -> dict[str, ConverseUsage]:
+        return {m: usage.to_model() for m, usage in self._usage.items()}
+
+    @property
+    def metrics(self) -> dict[str, ConverseMetrics]:
+        return {m: metrics.to_model() for m, metrics in self._metrics.items()}
+
+    @property
+    def early_stopping(self) -> list[EarlyStopRound]:
+        tails = [r.tail_tokens for r in self._stop_records if r.tail_tokens is not None]
+        tail_estimate = min(tails, default=0.0)
+        rounds: dict[int | None, EarlyStopRound] = {}
+        saved: dict[int | None, float] = {}
+        for record in self._stop_records:
+            stats = rounds.setdefault(record.round, EarlyStopRound(round=record.round))
+            stats.n_calls += 1
+            if record.stopped:
+                stats.n_stopped += 1
+                saved[record.round] = saved.get(record.round, 0.0) + tail_estimate
+        for key, tokens in saved.items():
+            rounds[key].min_output_tokens_saved = round(tokens)
+        return list(rounds.values())
+
+    def add_stop_record(
+        self,
+        n_round: int | None,
+        response: ConverseRecord | ConverseResponse,
+        tag: str,
+        stop_requested: bool,
+    ) -> None:
+        """Tracks whether a call stopped at `tag`, or how much it wrote after it otherwise."""
+        stopped = stop_requested and response.stopReason == "stop_sequence"
+        tail_tokens = None
+        end = response.answer.find(tag)
+        if not stopped and end != -1:
+            tail = len(response.answer) - end - len(tag)
+            written = len(response.answer) + len(response.thinking)
+            tail_tokens = response.usage.outputTokens * tail / written
+        self._stop_records.append(StopRecord(n_round, stopped, tail_tokens))
+
+    def update_stats(self, modelid: str, stats: ConverseRecord | ConverseResponse):
+        # update usage, models outside of the slots (e.g. aggregators) are added on first use
+        usage = self._usage.setdefault(modelid, UsageRecord())
+        usage.inputTokens += stats.usage.inputTokens
+        usage.outputTokens += stats.usage.outputTokens
+        usage.cacheReadInputTokens += stats.usage.cacheReadInputTokens
+        usage.cacheWriteInputTokens += stats.usage.cacheWriteInputTokens
+        self._metrics.setdefault(modelid, MetricsRecord()).latencyMs += stats.metrics.latencyMs
 
     def add_assistant_msg(self, message: str, invoke_index: int):
         self._add_msg(message, self._ASSISTANT, invoke_index)
@@ -84,9 +294,20 @@ class ChatLog:
     def _add_msg(self, message: str, role: str, invoke_index: int):
         fmt_message = self._wrap_converse_msg(message, role)
         self.history[invoke_index].chat_history.append(fmt_message)
+        if role == self._ASSISTANT:
+            self._last_answers[invoke_index] = fmt_message
+            self._rounds[invoke_index] += 1
+
+    def replace_prompt_content(
+        self, content: list[dict], invoke_index: int, message_index: int = 0
+    ) -> None:
+        """Copy-on-write of a prompt message's content for one slot, leaving other slots as is."""
+        chat_history = self.history[invoke_index].chat_history
+        chat_history[message_index] = {**chat_history[message_index], "content": content}
 
     def add_thinking_trace(self, thinking: str, invoke_index: int):
         self.history[invoke_index].thinking_history.append(thinking)
+        self._last_thinking[invoke_index] = thinking
 
     def wrap_assistant_msg(self, message: str):
         return self._wrap_converse_msg(message, self._ASSISTANT)
@@ -108,27 +329,47 @@ class ChatLog:
             self.n_cache_checkpoints += 1
         return base_msg
 
+    def snapshot(self) -> "ChatLog":
+        """Copy of the current state that can be extended independently of this chatlog.
+
+        Messages are shared rather than copied as they are never mutated once recorded.
+        """
+        clone = copy.copy(self)
+        clone.history = [
+            SlotLog(m.modelid, list(m.chat_history), list(m.thinking_history)) for m in self.history
+        ]
+        clone._last_answers = list(self._last_answers)
+        clone._last_thinking = list(self._last_thinking)
+        clone._rounds = list(self._rounds)
+        clone._stop_records = list(self._stop_records)
+        clone._usage = {m: dataclasses.replace(usage) for m, usage in self._usage.items()}
+        clone._metrics = {m: dataclasses.replace(metrics) for m, metrics in self._metrics.items()}
+        return clone
+
+    def get_round(self, invoke_index: int) -> int:
+        """Number of answers recorded for a slot."""
+        return self._rounds[invoke_index]
+
     def get_recent_other_answers(self, invoke_index: int) -> list[dict]:
         other_model_answers = []
-        for index, model_log in enumerate(self.history):
+        for index, last_answer in enumerate(self._last_answers):
             if index == invoke_index:
                 continue
-            assistant_msgs = [
-                msg for msg in model_log.chat_history if msg.get("role") == self._ASSISTANT
-            ]
-            other_model_answers.append(assistant_msgs[-1])
+            if last_answer is None:
+                raise IndexError(f"Model slot {index} has not answered yet")
+            other_model_answers.append(last_answer)
         return other_model_answers
 
     def get_last_answer(self) -> list[str] | str:
-        last_answers = [m.chat_history[-1]["content"][0]["text"] for m in self.history]
+        last_answers = [
+            (answer or m.chat_history[-1])["content"][0]["text"]
+            for answer, m in zip(self._last_answers, self.history)
+        ]
         if 1 < len(last_answers):
             return last_answers
         return last_answers[0]
 
     def get_last_thinking(self) -> list[str] | str:
-        last_thinking_traces = [
-            m.thinking_history[-1] if m.thinking_history else "" for m in self.history
-        ]
-        if 1 < len(last_thinking_traces):
-            return last_thinking_traces
-        return last_thinking_traces[0]
+        if 1 < len(self._last_thinking):
+            return list(self._last_thinking)
+        return self._last_thinking[0]
@@ -3,14 +3,52 @@ Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 SPDX-License-Identifier: Apache-2.0
 """
 
+import concurrent.futures
+import contextlib
 import functools
-from typing import Callable
-
+import os
+import queue
+import socket
+import threading
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Callable, NamedTuple
+
+import pydantic
 from botocore.config import Config
 
-from bhive import augment, chat, config, cost, inference, logger, struct_output
-from bhive.evaluators import BudgetConfig, GridResults, TrialResult, answer_in_text
-from bhive.utils import create_bedrock_client, parse_bedrock_output
+from bhive import (
+    augment,
+    blobs,
+    chat,
+    config,
+    cost,
+    datasets,
+    inference,
+    journal,
+    logger,
+    preprocess,
+    prompt,
+    search,
+    stream,
+    struct_output,
+    workqueue,
+)
+from bhive.evaluators import (
+    BudgetConfig,
+    EvaluatorRunner,
+    GridResults,
+    SampleResult,
+    TrialResult,
+    answer_in_text,
+)
+from bhive.rephrase_cache import RephraseCache
+from bhive.utils import (
+    ModelConcurrencyLimiter,
+    create_bedrock_client,
+    parallel_map,
+    parse_bedrock_output,
+)
 
 
 class Hive:
@@ -30,13 +68,26 @@ class Hive:
             An existing Boto3 client. If provided, it will be used directly
             instead of creating a new client. Only one of `client_config`
             or `client` should be provided.
+        max_concurrent_calls_per_model (int | dict[str, int] | None):
+            An optional cap on in-flight Bedrock calls per model id, shared across
+            every thread using this Hive (e.g. parallel optimisation workers).
+        rephrase_cache (RephraseCache | None):
+            An optional cache of 'semantic' augmentation rephrasings, reused by every
+            request through this Hive. Its `stats` report the hit rate and saved cost.
 
     Raises:
         ValueError: If both `client_config` and `client` are provided, or if
             neither is provided.
     """
 
-    def __init__(self, client_config: Config | None = None, client=None) -> None:
+    def __init__(
+        self,
+        client_config: Config | None = None,
+        client=None,
+        max_concurrent_calls_per_model: int | dict[str, int] | None = None,
+        rephrase_cache: RephraseCache | None = None,
+        augmentation_processes: int = 0,
+    ) -> None:
         """Initializes a Hive instance connected to a Boto3 client.
 
         This constructor either creates a new Boto3 client using the provided
@@ -45,6 +96,11 @@ class Hive:
         Parameters:
             client_config (botocore.config.Config | None): Configuration for the Boto3 client.
             client (boto3.Client | None): Existing Boto3 client.
+            max_concurrent_calls_per_model (int | dict[str, int] | None): Per-model
+                limit on concurrent Bedrock calls.
+            rephrase_cache (RephraseCache | None): Cache of semantic rephrasings.
+            augmentation_processes (int): Worker processes rendering visual augmentation
+                variants, zero renders them in this process.
 
         Raises:
             ValueError: If both `client_config` and `client` are provided
@@ -59,6 +115,13 @@ class Hive:
             self.runtime_client = client
         else:
             self.runtime_client = create_bedrock_client()
+        self.concurrency_limiter = (
+            ModelConcurrencyLimiter(max_concurrent_calls_per_model)
+            if max_concurrent_calls_per_model
+            else None
+        )
+        self.rephrase_cache = rephrase_cache
+        self.augmentation_processes = augmentation_processes
 
     def converse(
         self, messages: list[dict], config: config.HiveConfig, **converse_kwargs
@@ -78,10 +141,133 @@ class Hive:
         Returns:
             chat.HiveOutput: A response object containing the answer (or answers if not aggregated) and the full chat history.
         """
-        _all_models = config.bedrock_model_ids
-        if config.aggregator_model_id:
-            _all_models += [config.aggregator_model_id]
+        chatlog, _converse_func, message = self._prepare(messages, config, **converse_kwargs)
+        response, chatlog = inference.run_inference(config, chatlog, _converse_func, message)
+        return self._build_output(config, chatlog, response, _converse_func)
+
+    def converse_stream(
+        self, messages: list[dict], config: config.HiveConfig, **converse_kwargs
+    ) -> Iterator[stream.StreamEvent]:
+        """Runs `converse`, streaming every call and yielding progress events as they happen.
+
+        Yields `stream.RoundStarted` at the start of each round, `stream.SlotDelta` text deltas
+        and a `stream.SlotCompleted` answer per slot, `stream.AggregationDelta` text deltas of
+        the aggregator and finally a `stream.FinalOutput` holding the same `HiveOutput` as
+        `converse`. Deltas of concurrent slots are interleaved. Requires a client with
+        Bedrock's `converse_stream`, and exceptions of the run are raised from the iterator.
+        Once the iterator is closed or discarded, the run makes no further calls.
+
+        Parameters:
+            messages (list[dict]): A list of messages to be processed by the models.
+            config (config.HiveConfig): The inference configuration, as for `converse`.
+            converse_kwargs (dict): Additional keyword arguments to be passed to the converse method.
+
+        Returns:
+            Iterator[stream.StreamEvent]: The events of the run, ending with its output.
+        """
+        if not hasattr(self.runtime_client, "converse_stream"):
+            raise ValueError("Provided client does not have a 'converse_stream' method.")
+        events: queue.Queue = queue.Queue()
+        done = object()
+        cancelled = threading.Event()
+
+        def _run() -> None:
+            try:
+                chatlog, converse_func, message = self._prepare(messages, config, **converse_kwargs)
+
+                def _converse_func(*args, **kwargs) -> chat.ConverseRecord:
+                    # checked before every call, so slots and rounds after cancelling never start
+                    if cancelled.is_set():
+                        raise _StreamCancelled()
+                    return converse_func(*args, **kwargs)
+
+                chatlog = inference.run_rounds(
+                    config, chatlog, _converse_func, message, emit=events.put
+                )
+                if config.aggregator_model_id:
+                    chatlog = inference.aggregate_last_responses(
+                        config, chatlog, _converse_func, message, emit=events.put
+                    )
+                response = chatlog.get_last_answer()
+                events.put(
+                    stream.FinalOutput(
+                        self._build_output(config, chatlog, response, _converse_func)
+                    )
+                )
+            except _StreamCancelled:
+                logger.info("Stopped a cancelled converse_stream before its next call")
+            except BaseException as e:
+                events.put(e)
+            finally:
+                events.put(done)
+
+        threading.Thread(target=_run, name="bhive-converse-stream", daemon=True).start()
+        try:
+            while (event := events.get()) is not done:
+                if isinstance(event, BaseException):
+                    raise event
+                yield event
+        finally:
+            cancelled.set()
+
+    def _converse_shared(
+        self, messages: list[dict], configs: list[config.HiveConfig], **converse_kwargs
+    ) -> list["_SharedDebateOutput"]:
+        """Runs the debate shared by `configs` once and derives the output of every config from it.
+
+        Configs must only differ in `num_reflections` and, for configs without reflections,
+        `verifier` (see `config.group_shared_debates`). The rounds are run once at the deepest
+        reflection level, each config is answered from a snapshot of its final round followed
+        by its aggregation call, if any, so every output matches a standalone `converse`.
+        """
+        if len(config.group_shared_debates(configs)) > 1:
+            raise ValueError("Configs cannot share a debate, see `config.group_shared_debates`.")
+        depths = {c.num_reflections for c in configs}
+        debate_verifier = next((c.verifier for c in configs if c.num_reflections), None)
+        debate_config = configs[0].model_copy(
+            update={"num_reflections": max(depths), "verifier": debate_verifier}, deep=True
+        )
+        chatlog, _converse_func, message = self._prepare(messages, debate_config, **converse_kwargs)
+
+        snapshots: dict[int, chat.ChatLog] = {}
+
+        def _on_round_end(n_reflect: int, _chatlog: chat.ChatLog) -> None:
+            if n_reflect in depths:
+                snapshots[n_reflect] = _chatlog.snapshot()
+
+        chatlog = inference.run_rounds(
+            debate_config, chatlog, _converse_func, message, _on_round_end
+        )
+
+        outputs = []
+        for _config in configs:
+            # rounds skipped by max_reasoning_seconds fall back to the last completed one
+            debate = snapshots.get(_config.num_reflections) or chatlog.snapshot()
+            slot_answers = debate.get_last_answer()
+            answer: str | None
+            if _config.aggregator_model_id:
+                final = inference.aggregate_last_responses(
+                    _config, debate.snapshot(), _converse_func, message
+                )
+                answer = inference.get_aggregated_answer(final)
+            else:
+                final = debate
+                answer = slot_answers if isinstance(slot_answers, str) else None
+            output = self._build_output(_config, final, final.get_last_answer(), _converse_func)
+            outputs.append(
+                _SharedDebateOutput(
+                    output=output,
+                    answer=answer,
+                    debate_usage=debate.usage,
+                    slot_answers=[slot_answers] if isinstance(slot_answers, str) else slot_answers,
+                )
+            )
+        return outputs
 
+    def _prepare(
+        self, messages: list[dict], config: config.HiveConfig, **converse_kwargs
+    ) -> tuple[chat.ChatLog, Callable, str]:
+        """Builds the chatlog and converse function for a request, applying augmentation."""
         # NOTE assumes first message holds the user prompt
         message = messages[0].get("content", [{}])[0].get("text", "")
         if config.output_model and message:
@@ -93,45 +279,179 @@ class Hive:
         if system_prompt and config.use_prompt_caching:
             converse_kwargs["system"].append(chat.DEFAULT_CACHING)
 
-        chatlog = chat.ChatLog(_all_models, messages, config.use_prompt_caching)
-        _converse_func = functools.partial(self._converse, **converse_kwargs)
+        # images are hashed once and only referenced until a payload is sent
+        blob_store = blobs.BlobStore()
+        messages = blob_store.intern(messages)
+        image_stats = None
+        if config.image_preprocessing:
+            messages, image_stats = preprocess.preprocess_messages(
+                messages, blob_store, config.image_preprocessing
+            )
+
+        # the aggregator takes part in the debate as an extra slot before summarising it
+        slot_models = [*config.bedrock_model_ids]
+        if config.aggregator_model_id:
+            slot_models.append(config.aggregator_model_id)
+        chatlog = chat.ChatLog(slot_models, messages, config.use_prompt_caching, blob_store)
+        chatlog.image_stats = image_stats
+        _converse_func = functools.partial(
+            self._converse,
+            inference_parameters=config.inference_parameters,
+            blob_store=blob_store,
+            **converse_kwargs,
+        )
         logger.info(f"Starting inference with {config=} and {converse_kwargs=}")
 
         # Augmenting input
         if config.augmentation_method:
-            self._apply_augmentation(config, chatlog, _converse_func)
-        response, chatlog = inference.run_inference(config, chatlog, _converse_func, message)
+            self._apply_augmentation(config, chatlog, _converse_func, overlap=True)
+        return chatlog, _converse_func, message
 
+    def _build_output(
+        self,
+        config: config.HiveConfig,
+        chatlog: chat.ChatLog,
+        response: str | list[str],
+        converse_func: Callable,
+    ) -> chat.HiveOutput:
         # parsing structured outputs
         parsed_response = None
+        repairs = None
         if config.output_model:
+            repairs = chat.StructuredOutputRepairs()
+            followups: list[tuple[str, chat.ConverseRecord]] = []
+            parse = functools.partial(
+                self._parse_structured, config, chatlog, converse_func, repairs, followups
+            )
             if isinstance(response, list):
-                parsed_response = [struct_output.parse(r, config.output_model) for r in response]
+                # the aggregated answer is recorded against the first slot
+                slots = [
+                    None if i == 0 and config.aggregator_model_id else i
+                    for i in range(len(response))
+                ]
+                parsed_response = [parse(r, slot) for r, slot in zip(response, slots)]
             else:
-                parsed_response = struct_output.parse(response, config.output_model)
+                parsed_response = parse(response, 0)
+            if followups:
+                # the chatlog may be shared with other outputs, e.g. in optimise
+                chatlog = chatlog.snapshot()
+                for model_id, record in followups:
+                    chatlog.update_stats(model_id, record)
 
         logger.info(f"Generated final {response=} and {parsed_response=}")
-        return chat.HiveOutput(
+        # the chatlog's records are trusted, so the output is built without validating them again
+        usage = chatlog.usage
+        return chat.HiveOutput.model_construct(
             response=response,
             parsed_response=parsed_response,
             thinking=chatlog.get_last_thinking(),
-            chat_history=chatlog.history,
-            usage=chatlog.usage,
+            chat_history=[
+                slot.to_model(config.output_detail, chatlog.blobs) for slot in chatlog.history
+            ],
+            usage=usage,
             metrics=chatlog.metrics,
             stopReason=chatlog.stopReason,
             trace=chatlog.trace,
-            cost=cost.TotalCost(value=cost.calculate_cost(chatlog.usage)),
+            image_preprocessing=chatlog.image_stats,
+            early_stopping=chatlog.early_stopping if config.stop_after_tag else None,
+            structured_output_repairs=repairs,
+            cost=cost.TotalCost(value=cost.calculate_cost(usage)),
         )
 
+    def _parse_structured(
+        self,
+        config: config.HiveConfig,
+        chatlog: chat.ChatLog,
+        converse_func: Callable,
+        repairs: chat.StructuredOutputRepairs,
+        followups: list[tuple[str, chat.ConverseRecord]],
+        answer: str,
+        slot: int | None,
+    ) -> pydantic.BaseModel | None:
+        """Parses the answer of a slot, or of the aggregator when `slot` is None, into the
+        output model. Invalid answers are repaired locally, then with one follow-up turn
+        showing the model its answer and the error, which is appended to `followups`."""
+        assert config.output_model is not None
+        parsed, error = struct_output.parse_with_error(answer, config.output_model)
+        if parsed is not None or not config.repair_structured_output:
+            if error:
+                logger.error(f"Error parsing structured outputs: {error}")
+            return parsed
+
+        repairs.n_failed += 1
+        parsed = struct_output.repair(answer, config.output_model)
+        if parsed is not None:
+            repairs.n_local_repairs += 1
+            return parsed
+
+        model_id = config.aggregator_model_id if slot is None else chatlog.history[slot].modelid
+        assert model_id is not None
+        logger.warning(f"Asking {model_id} to repair its structured output: {error}")
+        messages = [
+            chatlog.history[slot or 0].chat_history[0],  # the prompt, with the output model
+            {"role": "assistant", "content": [{"text": answer}]},
+            {"role": "user", "content": [{"text": prompt.repair.format(error=error)}]},
+        ]
+        record = converse_func(model_id, messages)
+        followups.append((model_id, record))
+        repairs.n_followup_calls += 1
+        repairs.cost += cost.calculate_cost({model_id: record.usage.to_model()})
+
+        parsed, error = struct_output.parse_with_error(record.answer, config.output_model)
+        if parsed is None:
+            parsed = struct_output.repair(record.answer, config.output_model)
+        if parsed is None:
+            repairs.n_unrepaired += 1
+            logger.error(f"Error parsing structured outputs after a repair turn: {error}")
+        else:
+            repairs.n_followup_repairs += 1
+        return parsed
+
     def _converse(
-        self, model_id: str, messages: list[dict], **runtime_kwargs
-    ) -> chat.ConverseResponse:
-        try:
-            response = self.runtime_client.converse(
-                messages=messages,
-                modelId=model_id,
+        self,
+        model_id: str,
+        messages: list[dict],
+        inference_parameters: dict[str, config.InferenceParameters] | None = None,
+        blob_store: blobs.BlobStore | None = None,
+        on_delta: Callable[[str], None] | None = None,
+        stop_after: str | None = None,
+        **runtime_kwargs,
+    ) -> chat.ConverseRecord:
+        """Calls Bedrock, through `converse_stream` passing text deltas to `on_delta` if given.
+
+        With `stop_after`, generation stops at that closing tag, which is added back to the answer.
+        """
+        if inference_parameters and model_id in inference_parameters:
+            runtime_kwargs = inference_parameters[model_id].apply(runtime_kwargs)
+        if stop_after:
+            inference_config = runtime_kwargs.get("inferenceConfig", {})
+            stop_sequences = [*inference_config.get("stopSequences", []), stop_after]
+            runtime_kwargs = {
                 **runtime_kwargs,
-            )
+                "inferenceConfig": {**inference_config, "stopSequences": stop_sequences},
+            }
+        payload = blob_store.materialise(messages) if blob_store else messages
+        limiter = (
+            self.concurrency_limiter.limit(model_id)
+            if self.concurrency_limiter
+            else contextlib.nullcontext()
+        )
+        try:
+            with limiter:
+                if on_delta is None:
+                    response = self.runtime_client.converse(
+                        messages=payload,
+                        modelId=model_id,
+                        **runtime_kwargs,
+                    )
+                else:
+                    response = self.runtime_client.converse_stream(
+                        messages=payload,
+                        modelId=model_id,
+                        **runtime_kwargs,
+                    )
+                    # the stream is read while holding the limiter, as the call is still running
+                    streamed = stream.collect_stream(response["stream"], on_delta)
         except Exception as e:
             logger.error(
                 f"Converse call failed for {model_id=} with {messages=} and {runtime_kwargs=}"
@@ -140,17 +460,16 @@ class Hive:
         status_code = response["ResponseMetadata"]["HTTPStatusCode"]
         if status_code != 200:
             logger.error(f"Converse call failed for {model_id=} with {status_code=}")
-            converse_response = chat.ConverseResponse(answer="Failed to provide a response.")
-        answer, thinking = parse_bedrock_output(response)
-        converse_response = chat.ConverseResponse(
-            answer=answer,
-            thinking=thinking,
-            usage=response["usage"],
-            metrics=response["metrics"],
-            stopReason=response["stopReason"],
-            trace=response.get("trace", {}),
-        )
-        logger.debug(f"Received answer from {model_id}:\n{answer}")
+            converse_response = chat.ConverseRecord(answer="Failed to provide a response.")
+        if on_delta is not None:
+            converse_response = streamed
+        else:
+            answer, thinking = parse_bedrock_output(response)
+            converse_response = chat.ConverseRecord.from_bedrock(response, answer, thinking)
+        if stop_after and converse_response.stopReason == "stop_sequence":
+            # Bedrock leaves the matched stop sequence out of the answer
+            converse_response.answer = struct_output.close_tag(converse_response.answer, stop_after)
+        logger.debug(f"Received answer from {model_id}:\n{converse_response.answer}")
         return converse_response
 
     def _apply_augmentation(
@@ -158,8 +477,13 @@ class Hive:
         hive_config: config.HiveConfig,
         chatlog: chat.ChatLog,
         converse_func: Callable,
+        overlap: bool = False,
     ) -> None:
-        """Mutate chatlog in-place so each model slot (except index 0) gets an augmented input."""
+        """Mutate chatlog in-place so each model slot (except index 0) gets an augmented input.
+
+        With `overlap`, semantic rephrasing runs in the background while slot 0, which keeps
+        the original input, starts its first call. The other slots wait on `chatlog.prompt_gate`.
+        """
         num_augment_slots = len(chatlog.history) - 1
         if num_augment_slots < 1:
             return
@@ -174,42 +498,55 @@ class Hive:
 
         if method == "semantic":
             assert hive_config.augmentation_model_id is not None
-            variants = augment.augment_llm(
+            rephrase = functools.partial(
+                augment.augment_llm,
                 original_text,
                 num_augment_slots,
                 converse_func,
                 hive_config.augmentation_model_id,
                 content_blocks=first_msg["content"],
+                cache=self.rephrase_cache,
             )
+            if overlap:
+                chatlog.prompt_gate = _prepare_in_background(
+                    lambda: _apply_text_variants(chatlog, rephrase(), method)
+                )
+                return
+            variants = rephrase()
         elif method == "lexical":
             variants = augment.augment_character(original_text, num_augment_slots)
         elif method == "visual":
             if not any("image" in b for b in first_msg["content"]):
                 logger.warning("Visual augmentation requested but no images in input, skipping.")
                 return
-            for i in range(1, num_augment_slots + 1):
-                chatlog.history[i].chat_history[0]["content"] = augment.augment_images_in_content(
-                    chatlog.history[i].chat_history[0]["content"]
-                )
+            content = chatlog.blobs.materialise_content(first_msg["content"])
+            interned = content is not first_msg["content"]
+            content_variants = augment.augment_images_in_content_variants(
+                content, num_augment_slots, processes=self.augmentation_processes
+            )
+            for i, augmented in enumerate(content_variants, start=1):
+                if interned:
+                    augmented = chatlog.blobs.intern_content(augmented)
+                chatlog.replace_prompt_content(augmented, i)
             logger.info(f"Applied 'visual' augmentation to {num_augment_slots} model slot(s).")
             return
         else:
             raise ValueError(f"Unknown augmentation method: {method}")
 
-        for i, variant in enumerate(variants, start=1):
-            for block in chatlog.history[i].chat_history[0]["content"]:
-                if "text" in block:
-                    block["text"] = variant
-                    break
-
-        logger.info(f"Applied '{method}' augmentation to {num_augment_slots} model slot(s).")
+        _apply_text_variants(chatlog, variants, method)
 
     def optimise(
         self,
-        dataset: list[tuple[str, str]],
+        dataset: Iterable[datasets.Sample],
         trial_config: config.TrialConfig,
         budget_config: BudgetConfig | None = None,
         evaluator: Callable[[str, str], bool] = answer_in_text,
+        max_workers: int = 1,
+        search_strategy: search.SuccessiveHalving | search.EarlyStopping | None = None,
+        share_reflection_rounds: bool = True,
+        journal_path: str | os.PathLike | None = None,
+        resume_from: str | os.PathLike | None = None,
+        work_queue: workqueue.WorkQueue | None = None,
         **converse_kwargs,
     ) -> GridResults:
         """
@@ -217,19 +554,45 @@ class Hive:
 
         This method performs a grid search over possible hyperparameter configurations
         defined in the provided `trial_config` and evaluates each configuration's
-        performance using the specified `evaluator`. It tracks the best configuration
-        based on a score and resource usage, and considers a budget constraint if provided.
+        performance using the specified `evaluator`. The best configuration is the highest
+        score within the budget (if provided), with ties going to lower cost then latency.
+        Use `GridResults.pareto_front` and `GridResults.best_within` to explore other trade-offs.
 
         Parameters:
-            dataset (list[tuple[str, str]]): A list of (input, expected_output) pairs
-                                            used for evaluating the model.
+            dataset (Iterable[datasets.Sample]): (input, expected_output) pairs used for
+                                            evaluating the model, the input is either text or
+                                            Converse content blocks. Use a
+                                            `datasets.JsonlDataset` to stream large datasets.
             trial_config (config.TrialConfig): Configuration containing the possible
                                             hyperparameter settings to try.
             budget_config (BudgetConfig | None, optional): Optional configuration that
                                                         constrains the inference budget.
             evaluator (Callable[[str, str], bool], optional): A function that takes
                                                             a model's output and the expected
-                                                            output to assess performance.
+                                                            output to assess performance. Wrap
+                                                            it in an `EvaluatorRunner` for
+                                                            timeouts, memoisation or batching.
+            max_workers (int, optional): Number of (config, sample) pairs evaluated concurrently.
+                                        Defaults to 1 (serial). Combine with the Hive's
+                                        `max_concurrent_calls_per_model` to respect rate limits.
+            search_strategy (search.SuccessiveHalving | search.EarlyStopping | None, optional):
+                                        Prunes weak configurations on growing subsets of the
+                                        dataset instead of evaluating the full grid, only the
+                                        final survivors can be `best`.
+            share_reflection_rounds (bool, optional): Configs only differing in `num_reflections`,
+                                        `aggregator_model_id` (or `verifier` without reflections)
+                                        share one debate per sample, run at the deepest level and
+                                        scored at every depth and aggregator. Defaults to True.
+            journal_path (str | os.PathLike | None, optional): Append-only JSON lines file that
+                                        every completed (config, sample) outcome is written to
+                                        as soon as it is scored.
+            resume_from (str | os.PathLike | None, optional): Journal of a previous run, outcomes
+                                        recorded there are re-scored with `evaluator` instead of
+                                        re-running inference. New outcomes are appended to it
+                                        unless a different `journal_path` is given.
+            work_queue (workqueue.WorkQueue | None, optional): Runs as the coordinator of a
+                                        distributed sweep, (config, sample) work is submitted to
+                                        this queue and run by `Hive.work` processes on any host.
             **converse_kwargs: Additional keyword arguments passed to the conversation
                             evaluation process (e.g., specific model parameters).
 
@@ -237,6 +600,7 @@ class Hive:
             GridResults: An object containing the results of the grid search, including the best performing configuration and its evaluation score.
         """
         logger.info("Starting optimisation ...")
+        dataset = datasets.as_sequence(dataset)
         configs = trial_config._all_configuration_options()
         logger.info(f"Optimising over {len(configs)} configurations")
         results = GridResults()
@@ -246,60 +610,358 @@ class Hive:
             logger.warning("Using built-in cost dictionary, which may be out of date")
             cost_dict = cost.MODELID_COSTS_PER_TOKEN
 
-        for _config in configs:
-            # TODO implement smarter stateful pruning of configs
-            ## e.g. if a model is too expensive at 1 round of reflection, exclude anymore
-            try:
-                candidate = self._objective(
-                    dataset, _config, evaluator, cost_dict, **converse_kwargs
+        completed = journal.OptimisationJournal(resume_from).load() if resume_from else {}
+        journal_path = journal_path or resume_from
+        run_journal = journal.OptimisationJournal(journal_path) if journal_path else None
+        if (
+            run_journal
+            and resume_from
+            and os.path.abspath(run_journal.path) != os.path.abspath(resume_from)
+        ):
+            run_journal.record_many(completed)
+
+        evaluate: Callable[[list[tuple[int, int]]], list[SampleResult]] = functools.partial(
+            self._evaluate_pairs,
+            dataset,
+            configs,
+            evaluator=evaluator,
+            cost_dictionary=cost_dict,
+            max_workers=max_workers,
+            share_reflection_rounds=share_reflection_rounds,
+            run_journal=run_journal,
+            completed=completed,
+            work_queue=work_queue,
+            **converse_kwargs,
+        )
+        if work_queue is not None:
+            work_queue.initialise([c.fingerprint() for c in configs])
+        try:
+            if search_strategy:
+                sample_results, finalists = search_strategy.run(
+                    configs, len(dataset), evaluate, budget_config
                 )
-                results.individual_results.append(candidate)
-
-                if (
-                    not results.best
-                    or results.best_score(candidate)
-                    or results.better_resource_usage(candidate)
-                ):
-                    # good candidate
-                    if budget_config and not budget_config.check_budget(candidate):
-                        continue
-                    results.best = candidate
-
+            else:
+                pairs = [(ci, si) for ci in range(len(configs)) for si in range(len(dataset))]
+                outcomes = evaluate(pairs)
+                sample_results = [
+                    outcomes[i : i + len(dataset)] for i in range(0, len(pairs), len(dataset))
+                ]
+                finalists = list(range(len(configs)))
+        finally:
+            if work_queue is not None:
+                work_queue.close()
+
+        finalist_results = GridResults()
+        for index, (_config, samples) in enumerate(zip(configs, sample_results)):
+            try:
+                candidate = TrialResult.from_samples(_config, samples)
             except Exception as e:
                 logger.error(f"Error during optimisation: {e}")
                 continue
+            candidate.n_samples_skipped = len(dataset) - len(samples)
+            results.individual_results.append(candidate)
+            if index in finalists:
+                # pruned configs are scored on fewer samples, so they are not comparable
+                finalist_results.individual_results.append(candidate)
+
+        # the best candidate always lies on the (score, cost, latency) Pareto front
+        if budget_config:
+            results.best = budget_config.best_within_budget(finalist_results)
+        else:
+            results.best = finalist_results.best_within()
         return results
 
+    def work(
+        self,
+        work_queue: workqueue.WorkQueue,
+        dataset: Iterable[datasets.Sample],
+        trial_config: config.TrialConfig,
+        budget_config: BudgetConfig | None = None,
+        evaluator: Callable[[str, str], bool] = answer_in_text,
+        max_workers: int = 1,
+        **converse_kwargs,
+    ) -> int:
+        """
+        Runs as a worker of a distributed `optimise`, until its coordinator closes `work_queue`.
+
+        Every worker must be given the same dataset and trial config as the coordinator, which
+        is checked through config fingerprints and sample keys.
+
+        Parameters:
+            work_queue (workqueue.WorkQueue): The queue shared with the coordinator.
+            dataset (Iterable[datasets.Sample]): The coordinator's dataset.
+            trial_config (config.TrialConfig): The coordinator's trial config.
+            budget_config (BudgetConfig | None, optional): Provides the cost dictionary.
+            evaluator (Callable[[str, str], bool], optional): Scores answers, as in `optimise`.
+            max_workers (int, optional): Number of work items run concurrently. Defaults to 1.
+            **converse_kwargs: Additional keyword arguments passed to the conversation.
+
+        Returns:
+            int: The number of work items completed by this worker.
+        """
+        dataset = datasets.as_sequence(dataset)
+        configs = trial_config._all_configuration_options()
+        while (fingerprints := work_queue.config_fingerprints()) is None:
+            logger.info(f"Waiting for a coordinator to initialise {work_queue.path}")
+            time.sleep(work_queue.poll_interval_seconds)
+        if fingerprints != [c.fingerprint() for c in configs]:
+            raise ValueError("Worker configurations do not match the coordinator's trial config")
+        cost_dict = budget_config.cost_dictionary if budget_config else cost.MODELID_COSTS_PER_TOKEN
+
+        def _work_loop(thread_index: int) -> int:
+            worker = f"{socket.gethostname()}:{os.getpid()}:{thread_index}"
+            n_completed = 0
+            while True:
+                item = work_queue.claim(worker)
+                if item is None:
+                    if work_queue.closed:
+                        return n_completed
+                    time.sleep(work_queue.poll_interval_seconds)
+                    continue
+                sample = dataset[item.sample_index]
+                if journal.sample_key(item.sample_index, sample) != item.sample_key:
+                    raise ValueError("Worker dataset does not match the coordinator's dataset")
+                results = self._evaluate_unit(
+                    sample,
+                    [configs[ci] for ci in item.config_indices],
+                    evaluator,
+                    cost_dict,
+                    **converse_kwargs,
+                )
+                n_completed += work_queue.complete(item, results)
+
+        n_completed = sum(parallel_map(_work_loop, range(max_workers), max_workers=max_workers))
+        logger.info(f"Worker completed {n_completed} work items from {work_queue.path}")
+        return n_completed
+
+    def _evaluate_pairs(
+        self,
+        dataset: Sequence[datasets.Sample],
+        configs: list[config.HiveConfig],
+        pairs: list[tuple[int, int]],
+        evaluator: Callable[[str, str], bool],
+        cost_dictionary: dict[str, cost.TokenPrices],
+        max_workers: int = 1,
+        share_reflection_rounds: bool = True,
+        run_journal: journal.OptimisationJournal | None = None,
+        completed: dict[tuple[str, str], SampleResult] | None = None,
+        work_queue: workqueue.WorkQueue | None = None,
+        **converse_kwargs,
+    ) -> list[SampleResult]:
+        """Evaluates (config index, sample index) pairs, returning results in the same order.
+
+        Pairs for the same sample whose configs can share their debate rounds are run
+        together as a single unit, see `config.group_shared_debates`. Pairs found in
+        `completed` are only re-scored, new outcomes are written to `run_journal`.
+        Units are handed to the workers of `work_queue` instead of run locally, if given.
+        """
+        fingerprints = [c.fingerprint() for c in configs]
+        # samples are read (and their images hashed) once, rather than for every config
+        sample_keys: dict[int, str] = {}
+        expected_responses: dict[int, str] = {}
+        if completed or run_journal or work_queue is not None:
+            for si in dict.fromkeys(si for _, si in pairs):
+                sample = dataset[si]
+                sample_keys[si] = journal.sample_key(si, sample)
+                expected_responses[si] = sample[1]
+        outcomes = {}
+        for ci, si in pairs:
+            if not completed:
+                break
+            previous = completed.get((fingerprints[ci], sample_keys[si]))
+            if previous is not None:
+                outcomes[(ci, si)] = previous.model_copy(update={"score": 0.0, "error": None})
+        _apply_evaluators(
+            list(outcomes.values()), [expected_responses[si] for _, si in outcomes], evaluator
+        )
+        if outcomes:
+            logger.info(f"Reusing {len(outcomes)} of {len(pairs)} outcomes from the journal")
+
+        remaining = [pair for pair in pairs if pair not in outcomes]
+        units = _plan_units(configs, remaining, share_reflection_rounds)
+        if work_queue is not None:
+            batch = work_queue.submit(units, [sample_keys[si] for si, _ in units])
+            queued = work_queue.wait(batch)
+            if run_journal:
+                run_journal.record_many(
+                    {
+                        (fingerprints[ci], sample_keys[si]): result
+                        for (ci, si), result in queued.items()
+                    }
+                )
+            outcomes.update(queued)
+            return [outcomes[pair] for pair in pairs]
+
+        def _run_unit(unit: tuple[int, list[int]]) -> list[SampleResult]:
+            si, config_indices = unit
+            results = self._evaluate_unit(
+                dataset[si],
+                [configs[ci] for ci in config_indices],
+                evaluator,
+                cost_dictionary,
+                **converse_kwargs,
+            )
+            if run_journal:
+                key = sample_keys[si]
+                run_journal.record_many(
+                    {(fingerprints[ci], key): r for ci, r in zip(config_indices, results)}
+                )
+            return results
+
+        unit_results = parallel_map(_run_unit, units, max_workers=max_workers)
+        for (si, config_indices), results in zip(units, unit_results):
+            for ci, result in zip(config_indices, results):
+                outcomes[(ci, si)] = result
+        return [outcomes[pair] for pair in pairs]
+
     def _objective(
         self,
-        dataset: list[tuple[str, str]],
+        dataset: Sequence[datasets.Sample],
         hive_config: config.HiveConfig,
         evaluator: Callable[[str, str], bool],
         cost_dictionary: dict[str, cost.TokenPrices],
         **converse_kwargs,
     ) -> TrialResult:
         """Objective function to optimize the inference method."""
-        cumulative_eval_score = 0
-        costs = []
-        latencies = []
-        for message, expected_response in dataset:
-            try:
-                messages = [{"role": "user", "content": [{"text": message}]}]
-                output = self.converse(messages, hive_config, **converse_kwargs)
-                answer = output.response
-                costs.append(cost.calculate_cost(output.usage, cost_dictionary, strict=True))
-                latencies.append(cost.average_latency(output.metrics))
-                if not isinstance(answer, str):
-                    raise TypeError("Optimisation must be performed with single responses.")
-                eval_score = evaluator(expected_response, answer)
-                if eval_score:
-                    cumulative_eval_score += eval_score
-            except Exception as e:
-                logger.error(f"Error during sample inference: {e}")
-                continue
-        return TrialResult(
-            score=cumulative_eval_score / len(dataset),
-            config=hive_config,
-            avg_latency_seconds=sum(latencies) / len(latencies),
-            avg_cost_dollars=sum(costs) / len(costs),
-        )
+        samples = [
+            self._evaluate_unit(
+                sample, [hive_config], evaluator, cost_dictionary, **converse_kwargs
+            )[0]
+            for sample in dataset
+        ]
+        return TrialResult.from_samples(hive_config, samples)
+
+    def _evaluate_unit(
+        self,
+        sample: datasets.Sample,
+        hive_configs: list[config.HiveConfig],
+        evaluator: Callable[[str, str], bool],
+        cost_dictionary: dict[str, cost.TokenPrices],
+        **converse_kwargs,
+    ) -> list[SampleResult]:
+        """Runs and scores a sample for configs sharing a debate, see `_converse_shared`.
+
+        Failures are captured per sample rather than raised.
+        """
+        message, expected_response = sample
+        try:
+            # blocks are copied as the prompt text may be extended in place
+            content = (
+                [dict(b) for b in message] if isinstance(message, list) else [{"text": message}]
+            )
+            messages = [{"role": "user", "content": content}]
+            outputs = self._converse_shared(messages, hive_configs, **converse_kwargs)
+        except Exception as e:
+            logger.error(f"Error during sample inference: {e}")
+            return [SampleResult(error=str(e)) for _ in hive_configs]
+        results = [self._record_output(shared, cost_dictionary) for shared in outputs]
+        return _apply_evaluators(results, [expected_response] * len(results), evaluator)
+
+    def _record_output(
+        self, shared: "_SharedDebateOutput", cost_dictionary: dict[str, cost.TokenPrices]
+    ) -> SampleResult:
+        output = shared.output
+        answer = shared.answer
+        try:
+            if not isinstance(answer, str):
+                raise TypeError("Optimisation must be performed with single responses.")
+            total_cost = cost.calculate_cost(output.usage, cost_dictionary, strict=True)
+            debate_cost = cost.calculate_cost(shared.debate_usage, cost_dictionary, strict=True)
+            result = SampleResult(
+                answer=answer,
+                slot_answers=shared.slot_answers,
+                cost_dollars=total_cost,
+                aggregation_cost_dollars=max(0.0, total_cost - debate_cost),
+                latency_seconds=cost.average_latency(output.metrics),
+                usage=output.usage,
+            )
+        except Exception as e:
+            logger.error(f"Error during sample inference: {e}")
+            return SampleResult(error=str(e))
+        return result
+
+
+def _apply_text_variants(chatlog: chat.ChatLog, variants: list[str], method: str) -> None:
+    """Gives slot i the i-th variant of slot 0's prompt text."""
+    first_content = chatlog.history[0].chat_history[0]["content"]
+    text_index = next(i for i, b in enumerate(first_content) if "text" in b)
+    for i, variant in enumerate(variants, start=1):
+        content = list(first_content)
+        content[text_index] = {**content[text_index], "text": variant}
+        chatlog.replace_prompt_content(content, i)
+    logger.info(f"Applied '{method}' augmentation to {len(variants)} model slot(s).")
+
+
+def _prepare_in_background(prepare: Callable[[], None]) -> Callable[[int], None]:
+    """Starts `prepare` on another thread, returning a gate that only lets slot 0 through
+    until it finishes, after which every slot passes or sees its exception."""
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(prepare)
+    executor.shutdown(wait=False)
+
+    def _gate(index: int) -> None:
+        if index:
+            future.result()
+
+    return _gate
+
+
+def _plan_units(
+    configs: list[config.HiveConfig], pairs: list[tuple[int, int]], share_reflection_rounds: bool
+) -> list[tuple[int, list[int]]]:
+    """Groups (config index, sample index) pairs into (sample index, config indices) units."""
+    by_sample: dict[int, list[int]] = {}
+    for ci, si in pairs:
+        by_sample.setdefault(si, []).append(ci)
+    units: list[tuple[int, list[int]]] = []
+    for si, config_indices in by_sample.items():
+        if share_reflection_rounds:
+            groups = config.group_shared_debates([configs[ci] for ci in config_indices])
+        else:
+            groups = [[i] for i in range(len(config_indices))]
+        units.extend((si, [config_indices[i] for i in group]) for group in groups)
+    return units
+
+
+def _apply_evaluators(
+    results: list[SampleResult],
+    expected_responses: list[str],
+    evaluator: Callable[[str, str], bool] | EvaluatorRunner,
+) -> list[SampleResult]:
+    """Scores completed samples in place, evaluator failures are captured on the results.
+
+    An `EvaluatorRunner` scores all the samples together, e.g. in a single batch call.
+    """
+    scorable = [
+        (r, e, r.answer) for r, e in zip(results, expected_responses) if r.answer is not None
+    ]
+    if isinstance(evaluator, EvaluatorRunner):
+        outcomes = evaluator.evaluate_many([(e, answer) for _, e, answer in scorable])
+    else:
+        outcomes = [_evaluate_one(evaluator, e, answer) for _, e, answer in scorable]
+    for (result, _, _), (score, error) in zip(scorable, outcomes):
+        result.score = score
+        if error is not None:
+            logger.error(f"Error during sample evaluation: {error}")
+            result.error = error
+    return results
+
+
+def _evaluate_one(
+    evaluator: Callable[[str, str], bool], expected_response: str, answer: str
+) -> tuple[float, str | None]:
+    try:
+        return float(evaluator(expected_response, answer) or 0), None
+    except Exception as e:
+        return 0.0, str(e)
+
+
+class _StreamCancelled(Exception):
+    """Stops the run of a `converse_stream` whose consumer stopped iterating."""
+
+
+class _SharedDebateOutput(NamedTuple):
+    output: chat.HiveOutput
+    answer: str | None  # the aggregated or single answer scored by optimise, if any
+    debate_usage: dict[str, cost.ConverseUsage]  # usage before aggregation
+    slot_answers: list[str]  # final round answers of every slot
@@ -3,12 +3,84 @@ Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 SPDX-License-Identifier: Apache-2.0
 """
 
-from typing import Callable, Literal
+import hashlib
+import itertools
+import json
+import math
+import random
+from typing import Callable, Iterable, Iterator, Literal
 
 import pydantic
 from bhive import logger
 
 AugmentationMethod = Literal["semantic", "lexical", "visual"]
+OutputDetail = Literal["final", "last_round", "full"]
+
+# fields changing what is returned but not how it is generated, ignored when comparing configs
+_OUTPUT_ONLY_FIELDS = {"output_detail"}
+# random draws per requested config before subsampling gives up on finding new ones
+_MAX_DRAWS_PER_CONFIG = 20
+
+
+class InferenceParameters(pydantic.BaseModel):
+    """
+    Per-model Converse inference parameters, unset fields keep the request defaults.
+
+    Attributes:
+        max_tokens (int | None): Maximum number of generated tokens, `inferenceConfig.maxTokens`.
+        temperature (float | None): Sampling temperature, `inferenceConfig.temperature`.
+        thinking_budget_tokens (int | None): Enables extended thinking with this token budget,
+            `additionalModelRequestFields.thinking.budget_tokens`.
+    """
+
+    model_config = pydantic.ConfigDict(frozen=True)
+
+    max_tokens: int | None = pydantic.Field(default=None, ge=1)
+    temperature: float | None = pydantic.Field(default=None, ge=0.0, le=1.0)
+    thinking_budget_tokens: int | None = pydantic.Field(default=None, ge=1)
+
+    @pydantic.model_validator(mode="after")
+    def validate_thinking_budget(self: "InferenceParameters") -> "InferenceParameters":
+        if self.thinking_budget_tokens and self.max_tokens:
+            if self.max_tokens <= self.thinking_budget_tokens:
+                raise ValueError("max_tokens must be greater than thinking_budget_tokens.")
+        return self
+
+    def apply(self, converse_kwargs: dict) -> dict:
+        """Returns a copy of `converse_kwargs` overridden with these parameters."""
+        kwargs = dict(converse_kwargs)
+        inference_config = dict(kwargs.get("inferenceConfig", {}))
+        if self.max_tokens is not None:
+            inference_config["maxTokens"] = self.max_tokens
+        if self.temperature is not None:
+            inference_config["temperature"] = self.temperature
+        if inference_config:
+            kwargs["inferenceConfig"] = inference_config
+        if self.thinking_budget_tokens is not None:
+            kwargs["additionalModelRequestFields"] = {
+                **kwargs.get("additionalModelRequestFields", {}),
+                "thinking": {"type": "enabled", "budget_tokens": self.thinking_budget_tokens},
+            }
+        return kwargs
+
+
+class ImagePreprocessing(pydantic.BaseModel):
+    """
+    Shrinks request images once before inference, as every round sends them again.
+
+    Attributes:
+        max_edge_pixels (int | None): Images with a longer edge are downscaled, keeping their aspect ratio.
+        format (str | None): Re-encode to 'png', 'jpeg' or 'webp', None keeps each image's format.
+        quality (int): Encoder quality for 'jpeg' and 'webp', from 1 to 100.
+        strip_metadata (bool): Drop EXIF and other metadata, which also re-encodes untouched images.
+    """
+
+    model_config = pydantic.ConfigDict(frozen=True)
+
+    max_edge_pixels: int | None = pydantic.Field(default=1568, ge=1)
+    format: Literal["png", "jpeg", "webp"] | None = None
+    quality: int = pydantic.Field(default=85, ge=1, le=100)
+    strip_metadata: bool = True
 
 
 class HiveConfig(pydantic.BaseModel):
@@ -25,6 +97,11 @@ class HiveConfig(pydantic.BaseModel):
         max_reasoning_seconds (type[int]): An optional maximum reasoning time in seconds before returning a response.
         augmentation_method (str | None): Input augmentation strategy: 'semantic', 'lexical', or 'visual'.
         augmentation_model_id (str | None): Model used for 'semantic' augmentation. Defaults to first model if not provided.
+        inference_parameters (dict[str, InferenceParameters]): Optional inference parameters per model id, including the aggregator.
+        output_detail (str): Chat history kept in the output: 'final' (answer and stats only), 'last_round' or 'full'.
+        image_preprocessing (ImagePreprocessing | None): Optional resizing and re-encoding of images before inference.
+        stop_after_tag (str | None): Closing tag ending the answer, e.g. '</answer>' or '</json>' with an output_model. Final-round and aggregator calls stop generating once it is written.
+        repair_structured_output (bool): Answers failing to parse into the output_model are repaired locally, then with one follow-up turn to the model that wrote them.
     """
 
     bedrock_model_ids: list[str]
@@ -36,6 +113,11 @@ class HiveConfig(pydantic.BaseModel):
     max_reasoning_seconds: float | None = pydantic.Field(default=None, gt=0)
     augmentation_method: AugmentationMethod | None = None
     augmentation_model_id: str | None = None
+    inference_parameters: dict[str, InferenceParameters] = pydantic.Field(default={})
+    output_detail: OutputDetail = "full"
+    image_preprocessing: ImagePreprocessing | None = None
+    stop_after_tag: str | None = pydantic.Field(default=None, pattern=r"^</[^<>\s]+>$")
+    repair_structured_output: bool = True
 
     @pydantic.field_validator("bedrock_model_ids")
     @classmethod
@@ -64,6 +146,33 @@ class HiveConfig(pydantic.BaseModel):
             self.augmentation_model_id = self.bedrock_model_ids[0]
         return self
 
+    def fingerprint(self) -> str:
+        """Stable identifier of this config across processes, callables are named by import path."""
+
+        def _stable(value):
+            if isinstance(value, pydantic.BaseModel):
+                return value.model_dump()
+            if isinstance(value, dict):
+                return {k: _stable(v) for k, v in value.items()}
+            if callable(value):
+                return f"{value.__module__}.{value.__qualname__}"
+            return value
+
+        fields = {name: _stable(value) for name, value in self if name not in _OUTPUT_ONLY_FIELDS}
+        encoded = json.dumps(fields, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+    def _shared_prefix_key(self, exclude_verifier: bool = False) -> tuple:
+        """Configs with equal keys only differ in `num_reflections`, so share their debate
+        rounds. The verifier only matters once reflections are run. With `stop_after_tag` only
+        the last round stops at the tag, so rounds are not shared across depths."""
+        excluded = set(_OUTPUT_ONLY_FIELDS)
+        if not self.stop_after_tag:
+            excluded.add("num_reflections")
+        if exclude_verifier:
+            excluded.add("verifier")
+        return tuple((name, _hashable(value)) for name, value in self if name not in excluded)
+
     @property
     def n_models(self) -> int:
         return len(self.bedrock_model_ids)
@@ -73,8 +182,52 @@ class HiveConfig(pydantic.BaseModel):
         return self.num_reflections == 0
 
 
+def _hashable(value):
+    if isinstance(value, list):
+        return tuple(value)
+    if isinstance(value, dict):
+        return tuple(sorted(value.items()))
+    return value
+
+
+def group_shared_debates(configs: list[HiveConfig]) -> list[list[int]]:
+    """Groups the indices of configs whose debate rounds can be run once and shared.
+
+    Configs in a group only differ in their reflection depth, configs without reflections
+    never call their verifier during the debate so join any group matching the rest. The
+    aggregator takes part in the debate, so configs with different aggregators never share,
+    and neither do depths of configs stopping at a `stop_after_tag`.
+    """
+    groups: dict[tuple, list[int]] = {}
+    verifier_free: dict[tuple, tuple] = {}
+    for i, _config in enumerate(configs):
+        if _config.num_reflections:
+            key = _config._shared_prefix_key()
+            groups.setdefault(key, []).append(i)
+            verifier_free.setdefault(_config._shared_prefix_key(exclude_verifier=True), key)
+    for i, _config in enumerate(configs):
+        if not _config.num_reflections:
+            key = _config._shared_prefix_key(exclude_verifier=True)
+            groups.setdefault(verifier_free.get(key, key), []).append(i)
+    return list(groups.values())
+
+
 class TrialConfig(pydantic.BaseModel):
-    """Configuration class for Hive trials, managing trial settings and validation."""
+    """
+    Configuration class for Hive trials, managing trial settings and validation.
+
+    The grid is enumerated lazily and canonicalised, so configs that behave identically (e.g.
+    augmentation of a lone model slot, or a verifier that is never called) are only tried once.
+
+    Attributes:
+        inference_parameter_options (dict[str, list[InferenceParameters]]): Candidate inference
+            parameters per model id, swept independently for every model used by a config.
+        constraints (list[Callable[[HiveConfig], bool]]): Predicates every tried config must pass.
+        max_configurations (int | None): Optional number of configs to subsample from the grid.
+        sampling (Literal["random", "latin_hypercube"]): Subsampling method, Latin hypercube
+            sampling spreads the configs evenly over the values of every hyperparameter.
+        seed (int | None): Optional seed for the subsampling.
+    """
 
     bedrock_model_combinations: list[list[str]]
     reflection_range: list[int] = pydantic.Field(default=[0])
@@ -82,27 +235,127 @@ class TrialConfig(pydantic.BaseModel):
     verifier_functions: list[Callable[[str], str] | None] | None = pydantic.Field(default=[None])
     use_prompt_caching: bool = False
     augmentation_methods: list[AugmentationMethod | None] = pydantic.Field(default=[None])
+    inference_parameter_options: dict[str, list[InferenceParameters]] = pydantic.Field(default={})
+    constraints: list[Callable[[HiveConfig], bool]] = pydantic.Field(default=[])
+    max_configurations: int | None = pydantic.Field(default=None, ge=1)
+    sampling: Literal["random", "latin_hypercube"] = "random"
+    seed: int | None = None
+
+    @property
+    def _dimensions(self) -> list[list]:
+        return [
+            self.bedrock_model_combinations,
+            self.reflection_range,
+            self.verifier_functions or [None],
+            self.aggregator_model_ids or [None],
+            self.augmentation_methods or [None],
+            self._inference_parameter_choices(),
+        ]
+
+    def _inference_parameter_choices(self) -> list[dict[str, InferenceParameters]]:
+        model_ids = list(self.inference_parameter_options)
+        return [
+            dict(zip(model_ids, choice))
+            for choice in itertools.product(
+                *(self.inference_parameter_options[m] for m in model_ids)
+            )
+        ]
+
+    @property
+    def grid_size(self) -> int:
+        """Number of raw grid points, before canonicalisation and constraints."""
+        return math.prod(len(values) for values in self._dimensions)
+
+    def iter_configurations(self) -> Iterator[HiveConfig]:
+        """Lazily yields every distinct valid config of the grid that meets the constraints."""
+        yield from self._build_distinct(itertools.product(*self._dimensions))
+
+    def sample_configurations(
+        self,
+        n: int,
+        method: Literal["random", "latin_hypercube"] = "random",
+        seed: int | None = None,
+    ) -> list[HiveConfig]:
+        """Draws up to `n` distinct configs without enumerating the whole grid.
+
+        Duplicates and invalid draws are topped up with at most `_MAX_DRAWS_PER_CONFIG * n`
+        random draws, or with the whole grid in random order when it is not much larger, so
+        fewer than `n` configs are returned when the grid holds few distinct configs.
+        """
+        rng = random.Random(seed)
+        dimensions = self._dimensions
+        if method == "latin_hypercube":
+            strata = [rng.sample(range(n), n) for _ in dimensions]
+            first = [
+                tuple(
+                    values[int((stratum[i] + rng.random()) / n * len(values))]
+                    for values, stratum in zip(dimensions, strata)
+                )
+                for i in range(n)
+            ]
+        else:
+            first = []
+        points = self._random_points(rng, dimensions, _MAX_DRAWS_PER_CONFIG * n)
+        return list(itertools.islice(self._build_distinct(itertools.chain(first, points)), n))
+
+    def _random_points(
+        self, rng: random.Random, dimensions: list[list], max_draws: int
+    ) -> Iterator[tuple]:
+        """Draws up to `max_draws` grid points without replacement, only remembering the indices
+        drawn so far. Grids less than twice that size are shuffled and drawn in full instead."""
+        grid_size = math.prod(len(values) for values in dimensions)
+        if grid_size < 2 * max_draws:
+            for index in rng.sample(range(grid_size), grid_size):
+                yield self._grid_point(index, dimensions)
+            return
+        drawn: set[int] = set()
+        while len(drawn) < max_draws:
+            index = rng.randrange(grid_size)
+            if index not in drawn:
+                drawn.add(index)
+                yield self._grid_point(index, dimensions)
 
     def _all_configuration_options(self) -> list[HiveConfig]:
-        """Captures all valid combinations for the grid search"""
-        config_params = []
-        verifiers = self.verifier_functions if self.verifier_functions else [None]
-        aggregators = self.aggregator_model_ids if self.aggregator_model_ids else [None]
-        for model_ids in self.bedrock_model_combinations:
-            for reflection_val in self.reflection_range:
-                for verifier in verifiers:
-                    for aggregator in aggregators:
-                        for aug_method in self.augmentation_methods:
-                            try:
-                                _config = HiveConfig(
-                                    bedrock_model_ids=model_ids,
-                                    num_reflections=reflection_val,
-                                    aggregator_model_id=aggregator,
-                                    verifier=verifier,
-                                    use_prompt_caching=self.use_prompt_caching,
-                                    augmentation_method=aug_method,
-                                )
-                                config_params.append(_config)
-                            except Exception as e:
-                                logger.warning(f"Skipping invalid configuration, error:{e}")
-        return config_params
+        """Captures all valid combinations for the grid search, subsampled if requested"""
+        if self.max_configurations is not None:
+            return self.sample_configurations(self.max_configurations, self.sampling, self.seed)
+        return list(self.iter_configurations())
+
+    @staticmethod
+    def _grid_point(index: int, dimensions: list[list]) -> tuple:
+        """Decodes a flat grid index, the last dimension varying fastest as in `itertools.product`."""
+        point = []
+        for values in reversed(dimensions):
+            index, position = divmod(index, len(values))
+            point.append(values[position])
+        return tuple(reversed(point))
+
+    def _build_distinct(self, points: Iterable[tuple]) -> Iterator[HiveConfig]:
+        seen = set()
+        for model_ids, num_reflections, verifier, aggregator, aug_method, parameters in points:
+            if len(model_ids) == 1 and aggregator is None:
+                aug_method = None  # augmentation skips slot 0, the aggregator is a debate slot
+            if num_reflections == 0 and aggregator is None:
+                verifier = None  # only called on reflections and aggregation
+            used_models = {*model_ids, aggregator}
+            parameters = {m: p for m, p in parameters.items() if m in used_models}
+            params = dict(
+                bedrock_model_ids=model_ids,
+                num_reflections=num_reflections,
+                aggregator_model_id=aggregator,
+                verifier=verifier,
+                use_prompt_caching=self.use_prompt_caching,
+                augmentation_method=aug_method,
+                inference_parameters=parameters,
+            )
+            key = tuple(_hashable(value) for value in params.values())
+            if key in seen:
+                continue
+            seen.add(key)
+            try:
+                _config = HiveConfig(**params)
+            except Exception as e:
+                logger.warning(f"Skipping invalid configuration, error:{e}")
+                continue
+            if all(constraint(_config) for constraint in self.constraints):
+                yield _config
@@ -0,0 +1,125 @@
+"""
+Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+SPDX-License-Identifier: Apache-2.0
+"""
+
+import json
+import mmap
+import os
+import random
+from collections.abc import Iterable, Sequence
+
+import numpy as np
+
+from bhive import logger
+
+Sample = tuple[str | list[dict], str]
+
+_CHUNK_BYTES = 1 << 26
+_IMAGE_FORMATS = {".png": "png", ".jpg": "jpeg", ".jpeg": "jpeg", ".gif": "gif", ".webp": "webp"}
+
+
+def as_sequence(dataset: Iterable[Sample]) -> Sequence[Sample]:
+    """Random access view of `dataset`, iterators and generators are read into memory once."""
+    if isinstance(dataset, Sequence):
+        return dataset
+    logger.info("Materialising the dataset iterable, use a JsonlDataset to stream from disk")
+    return list(dataset)
+
+
+class JsonlDataset(Sequence):
+    """
+    Read-only dataset over a JSON lines file that only keeps the line offsets in memory.
+
+    The file is memory-mapped and every sample is parsed when accessed, so large datasets
+    can be evaluated and randomly subsampled without loading them. Samples with images
+    become Converse content blocks, the image files are only read when the sample is used.
+
+    Parameters:
+        path (str | os.PathLike): The JSON lines file, one object per line.
+        question_key (str): Key of the question text.
+        answer_key (str): Key of the expected answer.
+        image_key (str): Key of an optional list of image paths, relative to the file's directory.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        question_key: str = "q",
+        answer_key: str = "a",
+        image_key: str = "images",
+    ) -> None:
+        self.path = os.fspath(path)
+        self.question_key = question_key
+        self.answer_key = answer_key
+        self.image_key = image_key
+        self._mmap: mmap.mmap | None = None
+        self._starts, self._ends = self._index_lines()
+
+    def _buffer(self) -> mmap.mmap:
+        # opened lazily so datasets can be pickled to worker processes
+        if self._mmap is None:
+            with open(self.path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def _index_lines(self) -> tuple[np.ndarray, np.ndarray]:
+        size = os.path.getsize(self.path)
+        if size == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        buffer = self._buffer()
+        newlines = [
+            np.flatnonzero(
+                np.frombuffer(
+                    buffer, dtype=np.uint8, count=min(_CHUNK_BYTES, size - offset), offset=offset
+                )
+                == ord("\n")
+            )
+            + offset
+            for offset in range(0, size, _CHUNK_BYTES)
+        ]
+        ends = np.concatenate([*newlines, [size]]).astype(np.int64)
+        starts = np.concatenate([[0], ends[:-1] + 1]).astype(np.int64)
+        non_empty = ends > starts
+        return starts[non_empty], ends[non_empty]
+
+    def __getstate__(self) -> dict:
+        return {**self.__dict__, "_mmap": None}
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._view(np.arange(len(self))[index])
+        start, end = self._starts[index], self._ends[index]
+        record = json.loads(self._buffer()[start:end])
+        answer = str(record[self.answer_key])
+        image_paths = record.get(self.image_key)
+        if not image_paths:
+            return record[self.question_key], answer
+        content = [{"text": record[self.question_key]}]
+        content.extend(self._image_block(image_path) for image_path in image_paths)
+        return content, answer
+
+    def _image_block(self, image_path: str) -> dict:
+        path = os.path.join(os.path.dirname(self.path), image_path)
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in _IMAGE_FORMATS:
+            raise ValueError(
+                f"Unsupported image format for {path}, use one of {list(_IMAGE_FORMATS)}"
+            )
+        with open(path, "rb") as f:
+            image_bytes = f.read()
+        return {"image": {"format": _IMAGE_FORMATS[extension], "source": {"bytes": image_bytes}}}
+
+    def _view(self, positions: np.ndarray) -> "JsonlDataset":
+        view = object.__new__(JsonlDataset)
+        view.__dict__.update(self.__dict__)
+        view._starts, view._ends = self._starts[positions], self._ends[positions]
+        return view
+
+    def sample(self, n: int, seed: int | None = None) -> "JsonlDataset":
+        """Random subset of `n` samples, reading nothing but the line offsets."""
+        positions = random.Random(seed).sample(range(len(self)), min(n, len(self)))
+        return self._view(np.asarray(positions, dtype=np.int64))
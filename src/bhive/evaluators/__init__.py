@@ -3,14 +3,28 @@ Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 SPDX-License-Identifier: Apache-2.0
 """
 
-from .string import answer_in_tags, answer_in_text, answers_equal
-from .budget import BudgetConfig, GridResults, TrialResult
+from .string import (
+    answer_in_tags,
+    answer_in_tags_batch,
+    answer_in_text,
+    answer_in_text_batch,
+    answers_equal,
+    answers_equal_batch,
+)
+from .budget import BudgetConfig, GridResults, SampleResult, TrialResult
+from .runner import EvaluatorRunner, EvaluatorTimeoutError
 
 __all__ = [
     "answer_in_tags",
+    "answer_in_tags_batch",
     "answer_in_text",
+    "answer_in_text_batch",
     "answers_equal",
+    "answers_equal_batch",
     "BudgetConfig",
+    "EvaluatorRunner",
+    "EvaluatorTimeoutError",
     "GridResults",
+    "SampleResult",
     "TrialResult",
 ]
@@ -3,10 +3,13 @@ Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 SPDX-License-Identifier: Apache-2.0
 """
 
+import numpy as np
 import pydantic
 from loguru import logger
 
 from bhive import config, cost
+from bhive.config import HiveConfig
+from bhive.evaluators import pareto
 
 
 class BudgetConfig(pydantic.BaseModel):
@@ -32,24 +35,97 @@ class BudgetConfig(pydantic.BaseModel):
             and result.avg_latency_seconds < self.max_seconds_per_sample
         )
 
+    def best_within_budget(self, results: "GridResults") -> "TrialResult | None":
+        """Best scoring result on the Pareto front that meets this budget, if any.
+
+        The front is ordered by score then cost and latency, so ties go to the cheaper result.
+        """
+        return next((r for r in results.pareto_front() if self.check_budget(r)), None)
+
+
+class SampleResult(pydantic.BaseModel):
+    """Outcome of evaluating a single dataset sample with a single configuration."""
+
+    answer: str | None = None
+    # final round answers of every slot, before aggregation
+    slot_answers: list[str] = pydantic.Field(default_factory=list)
+    score: float = 0.0
+    cost_dollars: float = pydantic.Field(default=0.0, ge=0.0)
+    aggregation_cost_dollars: float = pydantic.Field(default=0.0, ge=0.0)  # part of cost_dollars
+    latency_seconds: float = pydantic.Field(default=0.0, ge=0.0)
+    usage: dict[str, cost.ConverseUsage] = pydantic.Field(default_factory=dict)
+    error: str | None = None
+
+    @property
+    def completed(self) -> bool:
+        # an answer was generated, even if the evaluation itself failed
+        return self.answer is not None
+
 
 class TrialResult(pydantic.BaseModel):
     config: config.HiveConfig
     score: float
     avg_cost_dollars: float = pydantic.Field(ge=0.0)
     avg_latency_seconds: float = pydantic.Field(ge=0.0)
+    n_samples: int = pydantic.Field(default=0, ge=0)
+    n_samples_skipped: int = pydantic.Field(default=0, ge=0)  # pruned or stopped early
+    # share of avg_cost_dollars spent by the aggregator rather than the debate
+    avg_aggregation_cost_dollars: float = pydantic.Field(default=0.0, ge=0.0)
+    # summed over every model, output tokens include any thinking tokens
+    avg_input_tokens: float = pydantic.Field(default=0.0, ge=0.0)
+    avg_output_tokens: float = pydantic.Field(default=0.0, ge=0.0)
+
+    @classmethod
+    def from_samples(cls, hive_config: HiveConfig, samples: list[SampleResult]) -> "TrialResult":
+        """Aggregates per-sample outcomes, failed samples score zero but are excluded from averages."""
+        completed = [s for s in samples if s.completed]
+        if not completed:
+            raise ValueError(f"No samples completed successfully for {hive_config=}")
+        return cls(
+            score=sum(s.score for s in samples) / len(samples),
+            config=hive_config,
+            avg_latency_seconds=sum(s.latency_seconds for s in completed) / len(completed),
+            avg_cost_dollars=sum(s.cost_dollars for s in completed) / len(completed),
+            n_samples=len(samples),
+            avg_aggregation_cost_dollars=sum(s.aggregation_cost_dollars for s in completed)
+            / len(completed),
+            avg_input_tokens=sum(u.inputTokens for s in completed for u in s.usage.values())
+            / len(completed),
+            avg_output_tokens=sum(u.outputTokens for s in completed for u in s.usage.values())
+            / len(completed),
+        )
 
 
 class GridResults(pydantic.BaseModel):
-    best: TrialResult = pydantic.Field(default=None)
+    best: TrialResult | None = None
     individual_results: list[TrialResult] = pydantic.Field(default=[])
 
-    def best_score(self, candidate: TrialResult):
-        return self.best.score < candidate.score
-
-    def better_resource_usage(self, candidate: TrialResult):
+    def _objective_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        results = self.individual_results
         return (
-            candidate.score == self.best.score
-            and candidate.avg_cost_dollars < self.best.avg_cost_dollars
-            and candidate.avg_latency_seconds < self.best.avg_latency_seconds
+            np.fromiter((r.score for r in results), dtype=float, count=len(results)),
+            np.fromiter((r.avg_cost_dollars for r in results), dtype=float, count=len(results)),
+            np.fromiter((r.avg_latency_seconds for r in results), dtype=float, count=len(results)),
         )
+
+    def pareto_front(self) -> list[TrialResult]:
+        """Results not dominated on (score, cost, latency), sorted by descending score."""
+        if not self.individual_results:
+            return []
+        scores, costs, latencies = self._objective_arrays()
+        mask = pareto.pareto_mask(np.column_stack((-scores, costs, latencies)))
+        indices = np.flatnonzero(mask)
+        order = np.lexsort((latencies[indices], costs[indices], -scores[indices]))
+        return [self.individual_results[i] for i in indices[order]]
+
+    def best_within(
+        self, max_dollars: float | None = None, max_seconds: float | None = None
+    ) -> TrialResult | None:
+        """Best score with average cost and latency strictly under the limits, if any.
+
+        The answer always lies on the Pareto front, ties go to the cheaper then faster result.
+        """
+        if not self.individual_results:
+            return None
+        index = pareto.best_within(*self._objective_arrays(), max_dollars, max_seconds)
+        return None if index is None else self.individual_results[index]
@@ -0,0 +1,47 @@
+"""
+Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+SPDX-License-Identifier: Apache-2.0
+"""
+
+import numpy as np
+
+
+def pareto_mask(objectives: np.ndarray) -> np.ndarray:
+    """Returns a boolean mask of the non-dominated rows of an (n_points, n_objectives) array.
+
+    All objectives are minimised. A point is dominated when another point is no worse in every
+    objective and strictly better in at least one, so identical points are all kept.
+    """
+    objectives = np.asarray(objectives, dtype=float)
+    candidates = np.arange(objectives.shape[0])
+    remaining = objectives
+    position = 0
+    while position < len(remaining):
+        point = remaining[position]
+        keep = np.any(remaining < point, axis=1) | np.all(remaining == point, axis=1)
+        candidates, remaining = candidates[keep], remaining[keep]
+        position = int(np.sum(keep[:position])) + 1
+    mask = np.zeros(objectives.shape[0], dtype=bool)
+    mask[candidates] = True
+    return mask
+
+
+def best_within(
+    scores: np.ndarray,
+    costs: np.ndarray,
+    latencies: np.ndarray,
+    max_cost: float | None = None,
+    max_latency: float | None = None,
+) -> int | None:
+    """Index of the highest score strictly within the limits, ties go to lower cost then latency."""
+    within = np.ones(len(scores), dtype=bool)
+    if max_cost is not None:
+        within &= costs < max_cost
+    if max_latency is not None:
+        within &= latencies < max_latency
+    if not within.any():
+        return None
+    indices = np.flatnonzero(within)
+    # lexsort uses the last key as the primary one
+    order = np.lexsort((latencies[indices], costs[indices], -scores[indices]))
+    return int(indices[order[0]])
@@ -0,0 +1,214 @@
+"""
+Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+SPDX-License-Identifier: Apache-2.0
+"""
+
+import collections
+import functools
+import multiprocessing
+import multiprocessing.pool
+import pickle
+import threading
+import time
+from typing import Callable, Sequence, cast
+
+from loguru import logger
+
+Evaluator = Callable[[str, str], bool | float]
+BatchEvaluator = Callable[[Sequence[str], Sequence[str]], Sequence[bool | float]]
+
+_POLL_SECONDS = 0.05
+
+
+class EvaluatorTimeoutError(TimeoutError):
+    pass
+
+
+class EvaluatorRunner:
+    """
+    Execution layer for evaluators, usable anywhere `Hive.optimise` takes an `evaluator`.
+
+    Evaluators run in a pool of `processes` worker processes, so a call exceeding
+    `timeout_seconds` can be killed (by restarting the pool) instead of blocking the sweep.
+    Other calls running in the pool at the time are resubmitted, with a new timeout.
+    Scores are memoised by (expected, answer), so configs giving the same answer are only
+    evaluated once, while timed out or failed pairs are evaluated again when seen again. Batch evaluators score many pairs in a single call, see
+    `bhive.evaluators.string` for vectorised versions of the built-in evaluators.
+
+    Parameters:
+        evaluator (Evaluator | BatchEvaluator): Must be picklable (e.g. a module-level function)
+            unless `processes=0`.
+        batch (bool): Whether `evaluator` takes lists of expected and generated answers.
+        processes (int): Pool size, at most this many calls are submitted at once so the
+            timeout never counts time queued for a free process. Zero runs inline, without
+            timeouts.
+        timeout_seconds (float | None): Per-call limit, timed out pairs score zero with an error.
+        memoise (bool): Reuse scores of (expected, answer) pairs seen before.
+        mp_context (str | None): Multiprocessing start method, defaults to the platform's.
+    """
+
+    def __init__(
+        self,
+        evaluator: Evaluator | BatchEvaluator,
+        batch: bool = False,
+        processes: int = 1,
+        timeout_seconds: float | None = None,
+        memoise: bool = True,
+        mp_context: str | None = None,
+    ) -> None:
+        if processes < 0:
+            raise ValueError(f"processes must be zero or positive, found {processes=}")
+        if timeout_seconds is not None and timeout_seconds <= 0:
+            raise ValueError(f"timeout_seconds must be positive, found {timeout_seconds=}")
+        if processes and timeout_seconds is None:
+            logger.warning("Evaluators run in a process pool without timeout_seconds can hang.")
+        if processes:
+            try:
+                pickle.dumps(evaluator)
+            except Exception as e:
+                raise ValueError(
+                    "Evaluators run in a process pool must be picklable, e.g. module-level "
+                    "functions, or use processes=0"
+                ) from e
+        self.evaluator = evaluator
+        self.batch = batch
+        self.processes = processes
+        self.timeout_seconds = timeout_seconds
+        self.memoise = memoise
+        self.mp_context = mp_context
+        self.n_cache_hits = 0
+        self.n_timeouts = 0
+        self._memo: dict[tuple[str, str], tuple[float, str | None]] = {}
+        self._lock = threading.Lock()
+        self._pool: multiprocessing.pool.Pool | None = None
+        self._slots = threading.BoundedSemaphore(max(processes, 1))
+        self._generation = 0
+
+    def __call__(self, expected_response: str, generated_response: str) -> float:
+        score, error = self.evaluate_many([(expected_response, generated_response)])[0]
+        if error is not None:
+            raise RuntimeError(error)
+        return score
+
+    def evaluate_many(self, pairs: Sequence[tuple[str, str]]) -> list[tuple[float, str | None]]:
+        """Scores (expected, answer) pairs, returning a (score, error) tuple for each."""
+        outcomes: dict[tuple[str, str], tuple[float, str | None]] = {}
+        with self._lock:
+            for pair in pairs:
+                if self.memoise and pair in self._memo:
+                    outcomes[pair] = self._memo[pair]
+        missing = list(dict.fromkeys(pair for pair in pairs if pair not in outcomes))
+        with self._lock:
+            self.n_cache_hits += len(pairs) - len(missing)
+        if missing:
+            computed = self._run_batch(missing) if self.batch else self._run_each(missing)
+            outcomes.update(computed)
+            if self.memoise:
+                with self._lock:
+                    self._memo.update(
+                        (pair, outcome) for pair, outcome in computed.items() if outcome[1] is None
+                    )
+        return [outcomes[pair] for pair in pairs]
+
+    def _run_each(self, pairs: list[tuple[str, str]]) -> dict:
+        evaluator = cast(Evaluator, self.evaluator)
+        if not self.processes:
+            return {pair: _outcome(functools.partial(evaluator, *pair)) for pair in pairs}
+        outcomes: dict[tuple[str, str], tuple[float, str | None]] = {}
+        in_flight: collections.deque = collections.deque()
+        for pair in pairs:
+            # only block for a free slot once this call's own submissions are collected
+            while not self._slots.acquire(blocking=not in_flight):
+                self._collect_oldest(in_flight, outcomes)
+            try:
+                in_flight.append((pair, self._submit(evaluator, pair)))
+            except BaseException:
+                self._slots.release()
+                raise
+        while in_flight:
+            self._collect_oldest(in_flight, outcomes)
+        return outcomes
+
+    def _collect_oldest(self, in_flight: collections.deque, outcomes: dict) -> None:
+        pair, submitted = in_flight.popleft()
+        try:
+            outcomes[pair] = _outcome(functools.partial(self._collect, *submitted))
+        finally:
+            self._slots.release()
+
+    def _run_batch(self, pairs: list[tuple[str, str]]) -> dict:
+        expected, generated = [p[0] for p in pairs], [p[1] for p in pairs]
+        evaluator = cast(BatchEvaluator, self.evaluator)
+        try:
+            if self.processes:
+                with self._slots:
+                    scores = self._collect(*self._submit(evaluator, (expected, generated)))
+            else:
+                scores = evaluator(expected, generated)
+            if len(scores) != len(pairs):
+                raise ValueError(f"Batch evaluator returned {len(scores)} scores for {len(pairs)}")
+        except Exception as e:
+            error = _error_message(e)
+            return {pair: (0.0, error) for pair in pairs}
+        return {pair: (float(score or 0), None) for pair, score in zip(pairs, scores)}
+
+    def _submit(self, func: Callable, args: tuple) -> tuple:
+        with self._lock:
+            if self._pool is None:
+                self._pool = multiprocessing.get_context(self.mp_context).Pool(self.processes)
+            async_result = self._pool.apply_async(func, args)
+            return func, args, async_result, self._generation, time.monotonic()
+
+    def _collect(
+        self,
+        func: Callable,
+        args: tuple,
+        async_result: multiprocessing.pool.AsyncResult,
+        generation: int,
+        submitted_at: float,
+    ):
+        deadline = None if self.timeout_seconds is None else submitted_at + self.timeout_seconds
+        while True:
+            try:
+                return async_result.get(_POLL_SECONDS)
+            except multiprocessing.TimeoutError:
+                pass
+            if generation != self._generation:
+                # another call restarted the pool and killed this one, so it is resubmitted
+                return self._collect(*self._submit(func, args))
+            if deadline is not None and time.monotonic() >= deadline:
+                self._restart_pool(generation)
+                raise EvaluatorTimeoutError(f"Evaluator timed out after {self.timeout_seconds}s")
+
+    def _restart_pool(self, generation: int) -> None:
+        with self._lock:
+            self.n_timeouts += 1
+            if generation != self._generation or self._pool is None:
+                return
+            logger.warning("Restarting the evaluator pool to stop a timed out evaluation")
+            self._pool.terminate()
+            self._pool = None
+            self._generation += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool = None
+
+    def __enter__(self) -> "EvaluatorRunner":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _outcome(evaluate: Callable[[], bool | float]) -> tuple[float, str | None]:
+    try:
+        return float(evaluate() or 0), None
+    except Exception as e:
+        return 0.0, _error_message(e)
+
+
+def _error_message(error: Exception) -> str:
+    return f"{type(error).__name__}: {error}"
@@ -3,6 +3,10 @@ Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 SPDX-License-Identifier: Apache-2.0
 """
 
+from typing import Sequence
+
+import numpy as np
+
 
 def answers_equal(expected_response: str, generated_response: str) -> bool:
     """Compares the string responses directly"""
@@ -20,3 +24,32 @@ def answer_in_tags(expected_response: str, generated_response: str, tag: str = "
     back_tag = tag.replace("<", "</")
     generated_response = generated_response.split(back_tag)[0]
     return answers_equal(expected_response, generated_response)
+
+
+def _normalise(responses: Sequence[str] | np.ndarray) -> np.ndarray:
+    return np.char.lower(np.char.strip(np.asarray(responses, dtype=str)))
+
+
+def answers_equal_batch(
+    expected_responses: Sequence[str], generated_responses: Sequence[str]
+) -> np.ndarray:
+    """Vectorised `answers_equal` over aligned sequences of responses."""
+    return _normalise(expected_responses) == _normalise(generated_responses)
+
+
+def answer_in_text_batch(
+    expected_responses: Sequence[str], generated_responses: Sequence[str]
+) -> np.ndarray:
+    """Vectorised `answer_in_text` over aligned sequences of responses."""
+    return np.char.find(_normalise(generated_responses), _normalise(expected_responses)) >= 0
+
+
+def answer_in_tags_batch(
+    expected_responses: Sequence[str], generated_responses: Sequence[str], tag: str = "<answer>"
+) -> np.ndarray:
+    """Vectorised `answer_in_tags`, responses without the tag are wrong rather than raising."""
+    generated = np.asarray(generated_responses, dtype=str)
+    has_tag = np.char.find(generated, tag) >= 0
+    inside = np.char.partition(generated, tag)[..., 2]
+    inside = np.char.partition(inside, tag.replace("<", "</"))[..., 0]
+    return has_tag & (_normalise(expected_responses) == _normalise(inside))
@@ -3,12 +3,13 @@ Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 SPDX-License-Identifier: Apache-2.0
 """
 
+import functools
 import time
-from typing import Callable
+from typing import Any, Callable
 
 from loguru import logger
 
-from bhive import chat, prompt
+from bhive import chat, prompt, stream
 from bhive.config import HiveConfig
 from bhive.utils import parallel_bedrock_exec
 
@@ -16,7 +17,35 @@ from bhive.utils import parallel_bedrock_exec
 def run_inference(
     config: HiveConfig, chatlog: chat.ChatLog, _converse_func: Callable, message: str | None = None
 ) -> tuple[str | list[str], chat.ChatLog]:
-    is_single = config.n_models == 1
+    chatlog = run_rounds(config, chatlog, _converse_func, message)
+    if config.aggregator_model_id:
+        chatlog = aggregate_last_responses(config, chatlog, _converse_func, message)
+
+    return chatlog.get_last_answer(), chatlog
+
+
+def get_aggregated_answer(chatlog: chat.ChatLog) -> str:
+    # the aggregated response is recorded against the first model slot
+    return chatlog.history[0].chat_history[-1]["content"][0]["text"]
+
+
+def run_rounds(
+    config: HiveConfig,
+    chatlog: chat.ChatLog,
+    _converse_func: Callable,
+    message: str | None = None,
+    on_round_end: Callable[[int, chat.ChatLog], None] | None = None,
+    emit: Callable[[stream.StreamEvent], None] | None = None,
+) -> chat.ChatLog:
+    """Runs the initial round and every reflection / debate round, without aggregation.
+
+    `on_round_end` is called with the round number and chatlog after each completed round.
+    With `emit`, calls are streamed and round, answer delta and completed answer events are
+    passed to it while the rounds run.
+    """
+    # the chatlog's slots include the aggregator, which takes part in the debate
+    n_slots = len(chatlog.history)
+    is_single = n_slots == 1
     start_time = time.monotonic()
 
     for n_reflect in range(config.num_reflections + 1):
@@ -39,7 +68,7 @@ def run_inference(
                     reflect_msg += f"\nAs a reminder, the original question is {message}"
                 chatlog.add_user_msg(reflect_msg, invoke_index=0)
             else:
-                for index in range(config.n_models):
+                for index in range(n_slots):
                     recent_other_answers = chatlog.get_recent_other_answers(index)
                     debate_msg = prompt.debate
                     for recent_ans in recent_other_answers:
@@ -52,23 +81,64 @@ def run_inference(
                         debate_msg += f"\nAs a reminder, the original question is {message}"
                     chatlog.add_user_msg(debate_msg, index)
 
+        # only final answers stop at the closing tag, earlier rounds are debated in full
+        call_kwargs = {}
+        if config.stop_after_tag and n_reflect == config.num_reflections:
+            call_kwargs["stop_after"] = config.stop_after_tag
+        streaming, on_result = None, None
+        if emit is not None:
+            emit(stream.RoundStarted(n_reflect))
+            streaming, on_result = _slot_streaming(n_reflect, chatlog, emit)
+
+        slot_kwargs = functools.partial(_slot_call_kwargs, call_kwargs, streaming)
         if is_single:
-            modelid = config.bedrock_model_ids[0]
-            response = _converse_func(model_id=modelid, messages=chatlog.history[0].chat_history)
-            _record_response(chatlog, 0, modelid, response)
+            modelid = chatlog.history[0].modelid
+            response = _converse_func(
+                model_id=modelid, messages=chatlog.history[0].chat_history, **slot_kwargs(0)
+            )
+            if on_result:
+                on_result(0, modelid, response)
+            responses = {(0, modelid): response}
         else:
-            responses = parallel_bedrock_exec(_converse_func, chathistory=chatlog.history)
-            for (index, modelid), response in responses.items():
-                _record_response(chatlog, index, modelid, response)
+            gate = chatlog.prompt_gate if n_reflect == 0 else None
+            responses = parallel_bedrock_exec(
+                _converse_func, chatlog.history, gate, slot_kwargs, on_result
+            )
+        for (index, modelid), response in responses.items():
+            _record_response(chatlog, index, modelid, response)
+            if config.stop_after_tag:
+                chatlog.add_stop_record(
+                    n_reflect, response, config.stop_after_tag, "stop_after" in call_kwargs
+                )
+        if on_round_end:
+            on_round_end(n_reflect, chatlog)
 
-    if config.aggregator_model_id:
-        chatlog = aggregate_last_responses(config, chatlog, _converse_func, message)
+    return chatlog
 
-    return chatlog.get_last_answer(), chatlog
+
+def _slot_call_kwargs(
+    call_kwargs: dict, streaming: Callable[[int], dict] | None, index: int
+) -> dict:
+    return {**call_kwargs, **streaming(index)} if streaming else call_kwargs
+
+
+def _slot_streaming(
+    n_reflect: int, chatlog: chat.ChatLog, emit: Callable[[stream.StreamEvent], None]
+) -> tuple[Callable[[int], dict], Callable[[int, str, chat.ConverseRecord], None]]:
+    """Per-slot call arguments streaming deltas to `emit`, and the callback of completed calls."""
+
+    def _slot_kwargs(index: int) -> dict:
+        modelid = chatlog.history[index].modelid
+        return {"on_delta": lambda text: emit(stream.SlotDelta(n_reflect, index, modelid, text))}
+
+    def _on_result(index: int, modelid: str, response: chat.ConverseRecord) -> None:
+        emit(stream.SlotCompleted(n_reflect, index, modelid, response.answer))
+
+    return _slot_kwargs, _on_result
 
 
 def _record_response(
-    chatlog: chat.ChatLog, index: int, modelid: str, response: chat.ConverseResponse
+    chatlog: chat.ChatLog, index: int, modelid: str, response: chat.ConverseRecord
 ):
     chatlog.add_assistant_msg(response.answer, index)
     if response.thinking:
@@ -79,7 +149,11 @@ def _record_response(
 
 
 def aggregate_last_responses(
-    config: HiveConfig, chatlog: chat.ChatLog, _converse_func: Callable, message: str | None = None
+    config: HiveConfig,
+    chatlog: chat.ChatLog,
+    _converse_func: Callable,
+    message: str | None = None,
+    emit: Callable[[stream.StreamEvent], None] | None = None,
 ) -> chat.ChatLog:
     assert isinstance(config.aggregator_model_id, str), (
         f"Must have a valid model id to aggregate responses, found {config.aggregator_model_id=} "
@@ -94,9 +168,17 @@ def aggregate_last_responses(
         agg_msg += f"\nAs a reminder, the original question is {message}"
     fmt_msg = chatlog.wrap_user_msg(agg_msg)
     logger.info(f"Aggregating a final response using {config.aggregator_model_id=}")
-    response: chat.ConverseResponse = _converse_func(config.aggregator_model_id, [fmt_msg])
-
-    _record_response(chatlog, 0, config.aggregator_model_id, response)
+    aggregator = config.aggregator_model_id
+    kwargs: dict[str, Any] = {}
+    if config.stop_after_tag:
+        kwargs["stop_after"] = config.stop_after_tag
+    if emit is not None:
+        kwargs["on_delta"] = lambda text: emit(stream.AggregationDelta(aggregator, text))
+    response: chat.ConverseRecord = _converse_func(aggregator, [fmt_msg], **kwargs)
+
+    _record_response(chatlog, 0, aggregator, response)
+    if config.stop_after_tag:
+        chatlog.add_stop_record(None, response, config.stop_after_tag, stop_requested=True)
 
     return chatlog
 
@@ -0,0 +1,85 @@
+"""
+Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+SPDX-License-Identifier: Apache-2.0
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import pydantic
+
+from bhive import logger
+from bhive.evaluators import SampleResult
+
+
+class JournalEntry(pydantic.BaseModel):
+    """A single completed (config, sample) outcome of `Hive.optimise`."""
+
+    config_fingerprint: str
+    sample_key: str
+    result: SampleResult
+
+
+def sample_key(index: int, sample: tuple[str | list[dict], str]) -> str:
+    """Identifies a dataset sample by position and content, so edited datasets are re-run."""
+    encoded = json.dumps(list(sample), default=_bytes_digest).encode()
+    digest = hashlib.sha256(encoded).hexdigest()[:16]
+    return f"{index}:{digest}"
+
+
+def _bytes_digest(value):
+    if isinstance(value, bytes):
+        return hashlib.sha256(value).hexdigest()  # e.g. images of multimodal samples
+    raise TypeError(f"Cannot key samples containing {type(value).__name__}")
+
+
+class OptimisationJournal:
+    """
+    Append-only JSON lines journal of the outcomes of `Hive.optimise`.
+
+    Every completed (config, sample) pair is written as soon as it is scored, so an
+    interrupted sweep can be resumed and old answers re-scored with a new evaluator.
+    Samples whose inference failed are not recorded and are retried on resume.
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> dict[tuple[str, str], SampleResult]:
+        """Reads recorded outcomes keyed by (config fingerprint, sample key), later entries win."""
+        entries: dict[tuple[str, str], SampleResult] = {}
+        if not os.path.exists(self.path):
+            logger.warning(f"No journal found at {self.path}, starting from scratch")
+            return entries
+        with open(self.path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = JournalEntry.model_validate_json(line)
+                except pydantic.ValidationError:
+                    # most likely a partial write from an interrupted run
+                    logger.warning(f"Skipping unreadable journal line {line_number} in {self.path}")
+                    continue
+                entries[(entry.config_fingerprint, entry.sample_key)] = entry.result
+        logger.info(f"Loaded {len(entries)} completed outcomes from {self.path}")
+        return entries
+
+    def record_many(self, results: dict[tuple[str, str], SampleResult]) -> None:
+        """Appends completed outcomes keyed by (config fingerprint, sample key)."""
+        lines = [
+            JournalEntry(
+                config_fingerprint=fingerprint, sample_key=key, result=result
+            ).model_dump_json()
+            + "\n"
+            for (fingerprint, key), result in results.items()
+            if result.completed
+        ]
+        if not lines:
+            return
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
@@ -0,0 +1,203 @@
+"""
+Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+SPDX-License-Identifier: Apache-2.0
+"""
+
+import collections
+import dataclasses
+import io
+import math
+import threading
+
+from bhive import logger
+from bhive.augment import detect_image_format
+from bhive.blobs import BlobRef, BlobStore
+from bhive.chat import ImagePreprocessingStats
+from bhive.config import ImagePreprocessing
+
+_PIL_FORMATS = {"png": "PNG", "jpeg": "JPEG", "gif": "GIF", "webp": "WEBP"}
+# approximate image tokens of Anthropic models, other providers tile images differently
+_PIXELS_PER_TOKEN = 750
+_DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class _PreprocessedImage:
+    image_bytes: bytes
+    image_format: str
+    tokens_before: int
+    tokens_after: int
+
+
+class _PreprocessedCache:
+    """LRU of preprocessed images bounded by the total size of their bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self._entries: collections.OrderedDict[tuple, _PreprocessedImage] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple) -> _PreprocessedImage | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: tuple, entry: _PreprocessedImage) -> None:
+        with self._lock:
+            if key in self._entries or len(entry.image_bytes) > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self.n_bytes += len(entry.image_bytes)
+            self._evict()
+
+    def resize(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.n_bytes = 0
+
+    def _evict(self) -> None:
+        while self.n_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.n_bytes -= len(evicted.image_bytes)
+
+
+_cache = _PreprocessedCache(_DEFAULT_CACHE_BYTES)
+
+
+def set_cache_size(max_bytes: int) -> None:
+    """Bounds the image bytes kept by the process-wide cache of preprocessed images, evicting
+    the least recently used ones first. Zero disables the cache."""
+    if max_bytes < 0:
+        raise ValueError(f"max_bytes must be zero or positive, found {max_bytes=}")
+    _cache.resize(max_bytes)
+
+
+def clear_cache() -> None:
+    """Drops every cached preprocessed image."""
+    _cache.clear()
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    return math.ceil(width * height / _PIXELS_PER_TOKEN)
+
+
+def preprocess_image(image_bytes: bytes, settings: ImagePreprocessing) -> tuple[bytes, str]:
+    """Downscales and re-encodes an image, returning the new bytes and Converse format."""
+    processed = _preprocess(image_bytes, settings)
+    return processed.image_bytes, processed.image_format
+
+
+def _preprocess(image_bytes: bytes, settings: ImagePreprocessing) -> _PreprocessedImage:
+    from PIL import Image  # only loaded once images are preprocessed
+
+    original_format = detect_image_format(image_bytes)
+    img: Image.Image = Image.open(io.BytesIO(image_bytes))
+    tokens_before = estimate_image_tokens(*img.size)
+    unchanged = _PreprocessedImage(image_bytes, original_format, tokens_before, tokens_before)
+    if getattr(img, "is_animated", False):
+        return unchanged  # frames would be lost
+
+    target_format = settings.format or original_format
+    max_edge = settings.max_edge_pixels
+    too_large = max_edge is not None and max(img.size) > max_edge
+    if not (too_large or settings.strip_metadata or target_format != original_format):
+        return unchanged
+
+    if max_edge is not None and too_large:
+        img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    save_kwargs: dict = {"optimize": True}
+    if target_format in ("jpeg", "webp"):
+        save_kwargs["quality"] = settings.quality
+    if not settings.strip_metadata and "exif" in img.info:
+        save_kwargs["exif"] = img.info["exif"]
+    if target_format == "jpeg" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format=_PIL_FORMATS[target_format], **save_kwargs)
+    re_encoded_only = (
+        not (too_large or settings.strip_metadata) and target_format == original_format
+    )
+    if re_encoded_only and buf.tell() >= len(image_bytes):
+        return unchanged  # re-encoding alone did not help
+    return _PreprocessedImage(
+        buf.getvalue(), target_format, tokens_before, estimate_image_tokens(*img.size)
+    )
+
+
+def _cached_preprocess(
+    ref: BlobRef, blob_store: BlobStore, settings: ImagePreprocessing
+) -> _PreprocessedImage:
+    key = (ref.digest, settings)
+    processed = _cache.get(key)
+    if processed is None:
+        processed = _preprocess(blob_store.get(ref), settings)
+        _cache.put(key, processed)
+    return processed
+
+
+def preprocess_messages(
+    messages: list[dict], blob_store: BlobStore, settings: ImagePreprocessing
+) -> tuple[list[dict], ImagePreprocessingStats]:
+    """Preprocesses the interned images of `messages`, each distinct image once per process.
+
+    Returns the updated messages, with other blocks shared, and the bytes and tokens saved.
+    Originals replaced everywhere are dropped from `blob_store`, which only keeps sent bytes.
+    """
+    stats = ImagePreprocessingStats()
+    new_messages = []
+    replaced: dict[str, BlobRef] = {}
+    sent: set[str] = set()
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, list):
+            new_messages.append(message)
+            continue
+        new_content = []
+        for block in content:
+            image = block.get("image")
+            ref = image["source"].get("bytes") if isinstance(image, dict) else None
+            if isinstance(ref, BlobRef):
+                try:
+                    processed = _cached_preprocess(ref, blob_store, settings)
+                except Exception as e:
+                    logger.warning(f"Could not preprocess image {ref}, sending it as is: {e}")
+                    sent.add(ref.digest)
+                    new_content.append(block)
+                    continue
+                new_ref = blob_store.put(processed.image_bytes)
+                replaced[ref.digest] = ref
+                sent.add(new_ref.digest)
+                stats.n_images += 1
+                stats.bytes_before += ref.size
+                stats.bytes_after += new_ref.size
+                stats.estimated_tokens_before += processed.tokens_before
+                stats.estimated_tokens_after += processed.tokens_after
+                source = {**image["source"], "bytes": new_ref}
+                block = {
+                    **block,
+                    "image": {**image, "format": processed.image_format, "source": source},
+                }
+            new_content.append(block)
+        new_messages.append({**message, "content": new_content})
+    for digest, ref in replaced.items():
+        if digest not in sent:
+            blob_store.discard(ref)
+    if stats.n_images:
+        logger.info(
+            f"Preprocessed {stats.n_images} image(s), saving {stats.bytes_saved} bytes and "
+            f"about {stats.estimated_tokens_saved} input tokens per call"
+        )
+    return new_messages, stats
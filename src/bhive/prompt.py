@@ -31,3 +31,9 @@ Do not answer the prompt, only rephrase it.
 
 Original Prompt: {prompt}
 """
+
+repair = """
+Your answer could not be parsed into the requested JSON structure, the error was:
+{error}
+Reply with only the corrected JSON representation inside <json></json> tags.
+"""
@@ -0,0 +1,175 @@
+"""
+Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+SPDX-License-Identifier: Apache-2.0
+"""
+
+import collections
+import hashlib
+import json
+import os
+import threading
+from typing import Callable
+
+import pydantic
+
+from bhive import logger, prompt
+from bhive.blobs import BlobRef, content_hash
+from bhive.cost import MODELID_COSTS_PER_TOKEN, ConverseUsage, TokenPrices, calculate_cost
+
+
+class RephraseCacheStats(pydantic.BaseModel):
+    """Lookups served by a `RephraseCache` and the rephrasing calls they saved."""
+
+    hits: int = 0
+    misses: int = 0
+    saved_input_tokens: int = 0
+    saved_output_tokens: int = 0
+    saved_cost: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class _RephraseEntry(pydantic.BaseModel):
+    key: str
+    model_id: str
+    n: int  # rephrasings asked for, `variants` holds fewer when the model returned fewer
+    variants: list[str]
+    usage: ConverseUsage
+    cost: float
+
+
+def rephrase_key(text: str, model_id: str, content_blocks: list[dict] | None = None) -> str:
+    """Identifies a rephrasing request by prompt text, model, images and the rephrase template.
+
+    The number of variants is not part of the key, a generation of n variants serves any
+    request for up to n.
+    """
+    images = [_image_digest(b["image"]) for b in content_blocks or [] if "image" in b]
+    encoded = json.dumps([prompt.rephrase, model_id, text, images]).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _image_digest(image: dict) -> str:
+    blob = image.get("source", {}).get("bytes")
+    if isinstance(blob, BlobRef):
+        return blob.digest
+    if isinstance(blob, (bytes, bytearray)):
+        return content_hash(bytes(blob))
+    return json.dumps(image.get("source"), sort_keys=True)  # e.g. an S3 location
+
+
+class RephraseCache:
+    """
+    LRU cache of the rephrasings generated by 'semantic' augmentation.
+
+    Repeated and templated prompts, e.g. an evaluation set swept over many configurations by
+    `Hive.optimise`, are then only rephrased once per augmentation model. Only the largest
+    generation per prompt is kept, serving requests for fewer variants from its first ones.
+    Concurrent requests for the same prompt wait for a single generation.
+
+    Parameters:
+        path (str | os.PathLike | None): JSON lines file the cache is loaded from and every new
+            generation is appended to, so rephrasings are reused across processes and runs.
+        max_entries (int): Prompts kept in memory, the least recently used are evicted first.
+        cost_dictionary (dict[str, TokenPrices]): Prices used to report the cost saved by hits.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike | None = None,
+        max_entries: int = 10_000,
+        cost_dictionary: dict[str, TokenPrices] = MODELID_COSTS_PER_TOKEN,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.cost_dictionary = cost_dictionary
+        self._entries: collections.OrderedDict[str, _RephraseEntry] = collections.OrderedDict()
+        self._pending: dict[str, threading.Event] = {}
+        self._stats = RephraseCacheStats()
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> RephraseCacheStats:
+        with self._lock:
+            return self._stats.model_copy()
+
+    def get_or_generate(
+        self,
+        key: str,
+        n: int,
+        model_id: str,
+        generate: Callable[[], tuple[list[str], ConverseUsage]],
+    ) -> list[str]:
+        """Up to `n` cached rephrasings for `key`, calling `generate` for them on a miss."""
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.n >= n:
+                    self._entries.move_to_end(key)
+                    self._record_hit(entry)
+                    return entry.variants[:n]
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    self._stats.misses += 1
+                    break
+            pending.wait()  # another thread is rephrasing the same prompt
+
+        try:
+            variants, usage = generate()
+            cost = calculate_cost({model_id: usage}, self.cost_dictionary)
+            entry = _RephraseEntry(
+                key=key, model_id=model_id, n=n, variants=variants, usage=usage, cost=cost
+            )
+            with self._lock:
+                self._insert(entry)
+            self._append(entry)
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+        return variants
+
+    def _record_hit(self, entry: _RephraseEntry) -> None:
+        self._stats.hits += 1
+        self._stats.saved_input_tokens += entry.usage.inputTokens
+        self._stats.saved_output_tokens += entry.usage.outputTokens
+        self._stats.saved_cost += entry.cost
+
+    def _insert(self, entry: _RephraseEntry) -> None:
+        existing = self._entries.get(entry.key)
+        if existing is not None and existing.n > entry.n:
+            return
+        self._entries[entry.key] = entry
+        self._entries.move_to_end(entry.key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _append(self, entry: _RephraseEntry) -> None:
+        if self.path is None:
+            return
+        line = entry.model_dump_json() + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def _load(self) -> None:
+        with open(self.path, encoding="utf-8") as f:  # type: ignore[arg-type]
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = _RephraseEntry.model_validate_json(line)
+                except pydantic.ValidationError:
+                    # most likely a partial write from an interrupted run
+                    logger.warning(f"Skipping unreadable cache line {line_number} in {self.path}")
+                    continue
+                self._insert(entry)
+        logger.info(f"Loaded {len(self._entries)} cached rephrasings from {self.path}")
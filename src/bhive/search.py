@@ -0,0 +1,190 @@
+"""
+Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+SPDX-License-Identifier: Apache-2.0
+"""
+
+import math
+import random
+import statistics
+from typing import Callable, Literal
+
+import pydantic
+
+from bhive import config, logger
+from bhive.evaluators import BudgetConfig, SampleResult, TrialResult
+
+
+class SuccessiveHalving(pydantic.BaseModel):
+    """
+    Successive halving search strategy for `Hive.optimise`.
+
+    Every configuration is first scored on a small subset of the dataset, then only the
+    best 1/`reduction_factor` survive to the next rung where the number of samples grows
+    by `reduction_factor`. This repeats until the whole dataset has been used.
+
+    Attributes:
+        initial_samples (int): Number of samples every configuration sees in the first rung.
+        reduction_factor (int): Fraction of configurations dropped per rung (2 halves them)
+            and growth factor of the number of samples.
+        min_configs (int): Never prune below this many surviving configurations.
+        seed (int | None): Optional seed used to shuffle the dataset before the first rung.
+    """
+
+    initial_samples: int = pydantic.Field(default=4, ge=1)
+    reduction_factor: int = pydantic.Field(default=2, ge=2)
+    min_configs: int = pydantic.Field(default=1, ge=1)
+    seed: int | None = None
+
+    def run(
+        self,
+        configs: list[config.HiveConfig],
+        n_samples: int,
+        evaluate: Callable[[list[tuple[int, int]]], list[SampleResult]],
+        budget_config: BudgetConfig | None = None,
+    ) -> tuple[list[list[SampleResult]], list[int]]:
+        """Runs the rungs using `evaluate` on (config index, sample index) pairs.
+
+        Returns the sample results seen by each config and the indices of the final survivors.
+        """
+        order = list(range(n_samples))
+        if self.seed is not None:
+            random.Random(self.seed).shuffle(order)
+
+        seen: list[list[SampleResult]] = [[] for _ in configs]
+        active = list(range(len(configs)))
+        n_done, n_rung = 0, min(self.initial_samples, n_samples)
+        while n_done < n_samples:
+            new_samples = order[n_done:n_rung]
+            pairs = [(ci, si) for ci in active for si in new_samples]
+            for (ci, _), outcome in zip(pairs, evaluate(pairs)):
+                seen[ci].append(outcome)
+            logger.info(f"Evaluated {len(active)} configurations on {n_rung} samples")
+            n_done, n_rung = n_rung, min(n_samples, n_rung * self.reduction_factor)
+            if n_done < n_samples:
+                active = self._survivors(configs, active, seen, budget_config)
+        return seen, active
+
+    def _survivors(
+        self,
+        configs: list[config.HiveConfig],
+        active: list[int],
+        seen: list[list[SampleResult]],
+        budget_config: BudgetConfig | None,
+    ) -> list[int]:
+        n_keep = max(self.min_configs, math.ceil(len(active) / self.reduction_factor))
+        ranked = sorted(active, key=lambda ci: _rank_key(configs[ci], seen[ci], budget_config))
+        return sorted(ranked[:n_keep])
+
+
+class EarlyStopping(pydantic.BaseModel):
+    """
+    Sequential early stopping search strategy for `Hive.optimise`.
+
+    Every configuration is evaluated on the dataset in batches of `batch_size` samples. After
+    each batch a confidence interval is computed on the score of every configuration, and a
+    configuration stops once its upper bound is more than `margin` below the best lower bound,
+    or once its average cost or latency is confidently above the `BudgetConfig` limits.
+
+    Attributes:
+        batch_size (int): Number of samples evaluated between stopping decisions.
+        min_samples (int): Never stop a configuration before it has seen this many samples.
+        confidence (float): Two-sided confidence level of the intervals.
+        margin (float): Score margin by which a configuration must be provably worse to stop.
+        bound (Literal["wilson", "hoeffding"]): Wilson intervals assume 0/1 scores, Hoeffding
+            bounds hold for any score in [0, 1] but need more samples.
+        seed (int | None): Optional seed used to shuffle the dataset before the first batch.
+    """
+
+    batch_size: int = pydantic.Field(default=5, ge=1)
+    min_samples: int = pydantic.Field(default=10, ge=1)
+    confidence: float = pydantic.Field(default=0.95, gt=0.0, lt=1.0)
+    margin: float = pydantic.Field(default=0.0, ge=0.0)
+    bound: Literal["wilson", "hoeffding"] = "wilson"
+    seed: int | None = None
+
+    def run(
+        self,
+        configs: list[config.HiveConfig],
+        n_samples: int,
+        evaluate: Callable[[list[tuple[int, int]]], list[SampleResult]],
+        budget_config: BudgetConfig | None = None,
+    ) -> tuple[list[list[SampleResult]], list[int]]:
+        """Runs the batches using `evaluate` on (config index, sample index) pairs.
+
+        Returns the sample results seen by each config and the indices of the configs that
+        were never stopped.
+        """
+        order = list(range(n_samples))
+        if self.seed is not None:
+            random.Random(self.seed).shuffle(order)
+
+        seen: list[list[SampleResult]] = [[] for _ in configs]
+        active = list(range(len(configs)))
+        for n_done in range(0, n_samples, self.batch_size):
+            if not active:
+                break
+            new_samples = order[n_done : n_done + self.batch_size]
+            pairs = [(ci, si) for ci in active for si in new_samples]
+            for (ci, _), outcome in zip(pairs, evaluate(pairs)):
+                seen[ci].append(outcome)
+            n_seen = n_done + len(new_samples)
+            if self.min_samples <= n_seen < n_samples:
+                survivors = self._survivors(active, seen, budget_config)
+                if len(survivors) < len(active):
+                    logger.info(
+                        f"Stopped {len(active) - len(survivors)} configs after {n_seen} samples"
+                    )
+                active = survivors
+        return seen, active
+
+    def _survivors(
+        self,
+        active: list[int],
+        seen: list[list[SampleResult]],
+        budget_config: BudgetConfig | None,
+    ) -> list[int]:
+        z = statistics.NormalDist().inv_cdf(1 - (1 - self.confidence) / 2)
+        if budget_config is not None:
+            active = [ci for ci in active if not _over_budget(seen[ci], budget_config, z)]
+        intervals = {ci: self._score_interval([s.score for s in seen[ci]], z) for ci in active}
+        best_lower = max((lower for lower, _ in intervals.values()), default=0.0)
+        return [ci for ci in active if intervals[ci][1] + self.margin >= best_lower]
+
+    def _score_interval(self, scores: list[float], z: float) -> tuple[float, float]:
+        n = len(scores)
+        mean = min(1.0, max(0.0, sum(scores) / n))
+        if self.bound == "hoeffding":
+            half_width = math.sqrt(math.log(2 / (1 - self.confidence)) / (2 * n))
+            return max(0.0, mean - half_width), min(1.0, mean + half_width)
+        centre = (mean + z**2 / (2 * n)) / (1 + z**2 / n)
+        half_width = z / (1 + z**2 / n) * math.sqrt(mean * (1 - mean) / n + z**2 / (4 * n**2))
+        return centre - half_width, centre + half_width
+
+
+def _over_budget(samples: list[SampleResult], budget_config: BudgetConfig, z: float) -> bool:
+    """Whether the lower confidence bound on average cost or latency exceeds the budget."""
+    completed = [s for s in samples if s.completed]
+    if len(completed) < 2:
+        return False
+    for values, limit in (
+        ([s.cost_dollars for s in completed], budget_config.max_dollar_per_sample),
+        ([s.latency_seconds for s in completed], budget_config.max_seconds_per_sample),
+    ):
+        lower = statistics.fmean(values) - z * statistics.stdev(values) / math.sqrt(len(values))
+        if lower >= limit:
+            return True
+    return False
+
+
+def _rank_key(
+    hive_config: config.HiveConfig,
+    samples: list[SampleResult],
+    budget_config: BudgetConfig | None,
+) -> tuple:
+    """Sort key placing within-budget, high scoring and cheap configurations first."""
+    try:
+        trial = TrialResult.from_samples(hive_config, samples)
+    except ValueError:
+        return (True, True, 0.0, 0.0, 0.0)  # nothing completed, always pruned first
+    over_budget = budget_config is not None and not budget_config.check_budget(trial)
+    return (False, over_budget, -trial.score, trial.avg_cost_dollars, trial.avg_latency_seconds)
@@ -0,0 +1,110 @@
+"""
+Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+SPDX-License-Identifier: Apache-2.0
+"""
+
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Callable
+
+
+def _default_responder(model_id: str, messages: list[dict]) -> str:
+    return f"Simulated answer from {model_id}"
+
+
+class SimulatedBedrockClient:
+    """
+    A local stand-in for the Bedrock runtime client that returns Converse API shaped responses.
+
+    Useful for exercising scheduling, concurrency and bookkeeping without network access
+    or cost. Each call sleeps for `latency_seconds` to imitate network I/O, and
+    `converse_stream` streams the same answers word by word. Answers end before the first
+    of `inferenceConfig.stopSequences` they contain, as with Bedrock.
+
+    Parameters:
+        responder (Callable[[str, list[dict]], str] | None): Produces the answer text from the
+            model id and messages, raising inside it simulates a failed call.
+        latency_seconds (float): Artificial wall-clock delay per call.
+        input_tokens (int): Input tokens reported per call.
+        output_tokens (int): Output tokens reported per call, plus the whole thinking budget
+            when thinking is enabled and capped by `inferenceConfig.maxTokens`.
+    """
+
+    def __init__(
+        self,
+        responder: Callable[[str, list[dict]], str] | None = None,
+        latency_seconds: float = 0.0,
+        input_tokens: int = 10,
+        output_tokens: int = 20,
+    ) -> None:
+        self.responder = responder or _default_responder
+        self.latency_seconds = latency_seconds
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.calls: dict[str, int] = defaultdict(int)
+        self.peak_concurrency: dict[str, int] = defaultdict(int)
+        self._active: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def converse(self, modelId: str, messages: list[dict], **kwargs) -> dict:
+        answer, usage, stop_reason = self._respond(modelId, messages, kwargs)
+        return {
+            "ResponseMetadata": {"HTTPStatusCode": 200},
+            "output": {"message": {"role": "assistant", "content": [{"text": answer}]}},
+            "usage": usage,
+            "metrics": {"latencyMs": int(self.latency_seconds * 1000)},
+            "trace": {},
+            "stopReason": stop_reason,
+        }
+
+    def converse_stream(self, modelId: str, messages: list[dict], **kwargs) -> dict:
+        """Like `converse`, with the answer streamed as `converse_stream` events, word by word."""
+        answer, usage, stop_reason = self._respond(modelId, messages, kwargs)
+
+        def _events():
+            yield {"messageStart": {"role": "assistant"}}
+            for chunk in re.findall(r"\s*\S+\s*|\s+", answer):
+                yield {"contentBlockDelta": {"delta": {"text": chunk}, "contentBlockIndex": 0}}
+            yield {"contentBlockStop": {"contentBlockIndex": 0}}
+            yield {"messageStop": {"stopReason": stop_reason}}
+            yield {
+                "metadata": {
+                    "usage": usage,
+                    "metrics": {"latencyMs": int(self.latency_seconds * 1000)},
+                }
+            }
+
+        return {"ResponseMetadata": {"HTTPStatusCode": 200}, "stream": _events()}
+
+    def _respond(self, modelId: str, messages: list[dict], kwargs: dict) -> tuple[str, dict, str]:
+        with self._lock:
+            self.calls[modelId] += 1
+            self._active[modelId] += 1
+            self.peak_concurrency[modelId] = max(
+                self.peak_concurrency[modelId], self._active[modelId]
+            )
+        try:
+            time.sleep(self.latency_seconds)
+            answer = self.responder(modelId, messages)
+        finally:
+            with self._lock:
+                self._active[modelId] -= 1
+        output_tokens = self.output_tokens
+        thinking = kwargs.get("additionalModelRequestFields", {}).get("thinking", {})
+        if thinking.get("type") == "enabled":
+            output_tokens += thinking["budget_tokens"]
+        inference_config = kwargs.get("inferenceConfig", {})
+        stop_reason = "end_turn"
+        for stop_sequence in inference_config.get("stopSequences", []):
+            if stop_sequence in answer:
+                # output tokens are cut in proportion to the text left out
+                stopped = answer[: answer.index(stop_sequence)]
+                output_tokens = max(1, output_tokens * len(stopped) // max(1, len(answer)))
+                answer, stop_reason = stopped, "stop_sequence"
+        max_tokens = inference_config.get("maxTokens")
+        if max_tokens is not None:
+            output_tokens = min(output_tokens, max_tokens)
+        usage = {"inputTokens": self.input_tokens, "outputTokens": output_tokens}
+        return answer, usage, stop_reason
@@ -0,0 +1,93 @@
+"""
+Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+SPDX-License-Identifier: Apache-2.0
+"""
+
+import dataclasses
+from typing import Callable, Iterable, Union
+
+from bhive.chat import ConverseRecord, HiveOutput, MetricsRecord, UsageRecord
+
+# Events yielded by `Hive.converse_stream`, in order: each round starts, its slots stream their
+# answers concurrently, then the aggregator streams its answer and the final output follows.
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class RoundStarted:
+    round: int
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class SlotDelta:
+    round: int
+    slot: int
+    model_id: str
+    text: str
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class SlotCompleted:
+    round: int
+    slot: int
+    model_id: str
+    answer: str
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class AggregationDelta:
+    model_id: str
+    text: str
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class FinalOutput:
+    output: HiveOutput
+
+
+StreamEvent = Union[RoundStarted, SlotDelta, SlotCompleted, AggregationDelta, FinalOutput]
+
+
+def collect_stream(
+    events: Iterable[dict], on_delta: Callable[[str], None] | None = None
+) -> ConverseRecord:
+    """Assembles the events of a Bedrock `converse_stream` response, passing on text deltas.
+
+    As in `utils.parse_bedrock_output`, the answer and thinking are their first content blocks.
+    """
+    text: list[str] = []
+    thinking: list[str] = []
+    text_block, thinking_block = None, None
+    record = ConverseRecord(answer="")
+    for event in events:
+        if "contentBlockDelta" in event:
+            delta = event["contentBlockDelta"]["delta"]
+            index = event["contentBlockDelta"].get("contentBlockIndex", 0)
+            if "text" in delta:
+                text_block = index if text_block is None else text_block
+                if index != text_block:
+                    continue
+                text.append(delta["text"])
+                if on_delta is not None:
+                    on_delta(delta["text"])
+            elif "reasoningContent" in delta:
+                thinking_block = index if thinking_block is None else thinking_block
+                if index == thinking_block:
+                    thinking.append(delta["reasoningContent"].get("text", ""))
+        elif "messageStop" in event:
+            record.stopReason = event["messageStop"]["stopReason"]
+        elif "metadata" in event:
+            metadata = event["metadata"]
+            usage = metadata.get("usage", {})
+            record.usage = UsageRecord(
+                inputTokens=usage.get("inputTokens", 0),
+                outputTokens=usage.get("outputTokens", 0),
+                cacheReadInputTokens=usage.get("cacheReadInputTokens", 0),
+                cacheWriteInputTokens=usage.get("cacheWriteInputTokens", 0),
+            )
+            record.metrics = MetricsRecord(
+                latencyMs=metadata.get("metrics", {}).get("latencyMs", 0)
+            )
+            record.trace = metadata.get("trace", {})
+    record.answer = "".join(text)
+    record.thinking = "".join(thinking)
+    return record
@@ -1,6 +1,7 @@
 from bhive import logger
 import pydantic
 import inspect
+import re
 
 BASE_PROMPT = """
 Execute these steps to complete your task:
@@ -38,11 +39,46 @@ As a reminder, if setting any properties to None you should use the JSON null va
 
 def parse(text: str, parsing_model: type[pydantic.BaseModel]) -> pydantic.BaseModel | None:
     """Parses the text and validate into the Pydantic model."""
+    parsed, error = parse_with_error(text, parsing_model)
+    if error:
+        logger.error(f"Error parsing structured outputs: {error}")
+    return parsed
+
+
+def parse_with_error(
+    text: str, parsing_model: type[pydantic.BaseModel]
+) -> tuple[pydantic.BaseModel | None, str | None]:
+    """Like `parse`, returning why the text could not be parsed instead of logging it."""
+    if "<json>" not in text:
+        return None, "No <json></json> block found in the response."
     try:
-        parsed_text = parsing_function(text)
-        return parsing_model.model_validate_json(parsed_text)
+        return parsing_model.model_validate_json(parsing_function(text)), None
     except Exception as e:
-        logger.error(f"Error parsing structured outputs: {e}")
+        return None, str(e)
+
+
+def repair(text: str, parsing_model: type[pydantic.BaseModel]) -> pydantic.BaseModel | None:
+    """Local best-effort repair of a malformed answer, without calling a model.
+
+    Looks for the JSON object in an unclosed <json> block, a markdown code block or the bare
+    text, and removes trailing commas and Python literals before validating it.
+    """
+    text = close_tag(text, "</json>")
+    if "<json>" in text:
+        candidate = parsing_function(text)
+    else:
+        fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+        candidate = fenced.group(1) if fenced else text
+    start, end = candidate.find("{"), candidate.rfind("}")
+    if start == -1 or end < start:
+        return None
+    candidate = candidate[start : end + 1]
+    candidate = re.sub(r",\s*([}\]])", r"\1", candidate)
+    for python_literal, json_literal in (("None", "null"), ("True", "true"), ("False", "false")):
+        candidate = re.sub(rf"([:\[,]\s*){python_literal}\b", rf"\g<1>{json_literal}", candidate)
+    try:
+        return parsing_model.model_validate_json(candidate)
+    except pydantic.ValidationError:
         return None
 
 
@@ -55,3 +91,12 @@ def prompt(parsing_model: type[pydantic.BaseModel]) -> str:
 def parsing_function(text: str) -> str:
     """Extracts the JSON from <json> tags in the model's response"""
     return text.split("<json>")[1].split("</json>")[0].strip()
+
+
+def close_tag(text: str, closing_tag: str) -> str:
+    """Appends `closing_tag` when its opening tag was left open, e.g. by a stop sequence."""
+    name = closing_tag[2:-1]
+    opened = [m.start() for m in re.finditer(rf"<{re.escape(name)}[\s>]", text)]
+    if opened and opened[-1] > text.rfind(closing_tag):
+        return text + closing_tag
+    return text
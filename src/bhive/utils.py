@@ -4,12 +4,14 @@ SPDX-License-Identifier: Apache-2.0
 """
 
 import concurrent.futures
-from typing import Callable
+import contextlib
+import threading
+from typing import Any, Callable, Iterable, TypeVar
 
 import boto3
 import botocore
 from bhive import logger
-from bhive.chat import ModelChatLog
+from bhive.chat import SlotLog
 
 _RUNTIME_CLIENT_NAME = "bedrock-runtime"
 _DEFAULT_CONFIG = botocore.config.Config(
@@ -18,6 +20,9 @@ _DEFAULT_CONFIG = botocore.config.Config(
     retries={"max_attempts": 10, "mode": "adaptive"},
 )
 
+T = TypeVar("T")
+R = TypeVar("R")
+
 
 def parse_bedrock_output(response: dict) -> tuple[str, str]:
     replies = response["output"]["message"]["content"]
@@ -35,12 +40,29 @@ def parse_bedrock_output(response: dict) -> tuple[str, str]:
     return text_answer, thinking
 
 
-def parallel_bedrock_exec(func: Callable, chathistory: list[ModelChatLog]) -> dict:
+def parallel_bedrock_exec(
+    func: Callable,
+    chathistory: list[SlotLog],
+    gate: Callable[[int], None] | None = None,
+    slot_kwargs: Callable[[int], dict] | None = None,
+    on_result: Callable[[int, str, Any], None] | None = None,
+) -> dict:
+    """Calls `func` for every slot in parallel, after `gate(slot index)` returns if given.
+
+    `slot_kwargs` adds keyword arguments to a slot's call and `on_result` is called with the
+    slot index, model id and result as soon as each call completes.
+    """
+
+    def _call(index: int, log: SlotLog):
+        if gate is not None:
+            gate(index)
+        kwargs = slot_kwargs(index) if slot_kwargs is not None else {}
+        return func(log.modelid, log.chat_history, **kwargs)
+
     outputs = {}
     with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
         future_to_input = {
-            executor.submit(func, log.modelid, log.chat_history): (i, log.modelid)
-            for i, log in enumerate(chathistory)
+            executor.submit(_call, i, log): (i, log.modelid) for i, log in enumerate(chathistory)
         }
         for future in concurrent.futures.as_completed(future_to_input):
             index, modelid = future_to_input[future]
@@ -49,9 +71,58 @@ def parallel_bedrock_exec(func: Callable, chathistory: list[ModelChatLog]) -> di
                 outputs[(index, modelid)] = data
             except Exception as exc:
                 raise exc
+            if on_result is not None:
+                on_result(index, modelid, data)
     return outputs
 
 
+def parallel_map(func: Callable[[T], R], items: Iterable[T], max_workers: int = 1) -> list[R]:
+    """Applies func to every item using a bounded thread pool, preserving input order."""
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(func, items))
+
+
+class ModelConcurrencyLimiter:
+    """Caps the number of in-flight Bedrock calls per model id across threads.
+
+    Parameters:
+        limits (int | dict[str, int]): Either a single limit applied to every model,
+            or a mapping of model id to limit. Models missing from the mapping are unbounded.
+    """
+
+    def __init__(self, limits: int | dict[str, int]) -> None:
+        self._default = limits if isinstance(limits, int) else None
+        self._limits = {} if isinstance(limits, int) else dict(limits)
+        values = list(self._limits.values())
+        if self._default is not None:
+            values.append(self._default)
+        if any(v < 1 for v in values):
+            raise ValueError("Concurrency limits must be at least 1.")
+        self._semaphores: dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, model_id: str) -> threading.Semaphore | None:
+        limit = self._limits.get(model_id, self._default)
+        if limit is None:
+            return None
+        with self._lock:
+            if model_id not in self._semaphores:
+                self._semaphores[model_id] = threading.BoundedSemaphore(limit)
+            return self._semaphores[model_id]
+
+    @contextlib.contextmanager
+    def limit(self, model_id: str):
+        semaphore = self._semaphore(model_id)
+        if semaphore is None:
+            yield
+            return
+        with semaphore:
+            yield
+
+
 def create_bedrock_client(client_config: dict | None = None):
     config = client_config or _DEFAULT_CONFIG
     logger.info(f"Creating Bedrock client from environment with {config=}.")
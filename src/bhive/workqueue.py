@@ -0,0 +1,239 @@
+"""
+Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+SPDX-License-Identifier: Apache-2.0
+"""
+
+import contextlib
+import json
+import os
+import sqlite3
+import time
+from typing import Iterator
+
+import pydantic
+
+from bhive import logger
+from bhive.evaluators import SampleResult
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS configs (config_index INTEGER PRIMARY KEY, fingerprint TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS items (
+    item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch INTEGER NOT NULL,
+    sample_index INTEGER NOT NULL,
+    sample_key TEXT NOT NULL,
+    config_indices TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    results TEXT
+);
+CREATE INDEX IF NOT EXISTS items_by_status ON items (status, item_id);
+"""
+
+
+class WorkItem(pydantic.BaseModel):
+    """A sample to run with configs sharing a debate, leased to a single worker at a time."""
+
+    item_id: int
+    sample_index: int
+    sample_key: str
+    config_indices: list[int]
+    worker: str
+
+
+class WorkQueue:
+    """
+    SQLite-backed queue distributing `Hive.optimise` work across processes and hosts.
+
+    The coordinator (`Hive.optimise(work_queue=...)`) submits batches of work items and waits
+    for them, while any number of workers (`Hive.work`) lease items, run them and write the
+    results back. A leased item whose worker does not complete it within `lease_seconds`,
+    e.g. because the worker crashed, is handed to another worker. Items whose lease expires
+    `max_attempts` times are completed with failed samples rather than retried forever.
+
+    Hosts must share the file through a filesystem with working POSIX locks.
+
+    Parameters:
+        path (str | os.PathLike): Location of the SQLite file, created if missing.
+        lease_seconds (float): How long a worker may hold an item, must exceed a sample's runtime.
+        poll_interval_seconds (float): Sleep between polls while waiting for work or results.
+        max_attempts (int): Number of leases granted per item before it is failed.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        lease_seconds: float = 600.0,
+        poll_interval_seconds: float = 1.0,
+        max_attempts: int = 3,
+    ) -> None:
+        if lease_seconds <= 0 or poll_interval_seconds <= 0 or max_attempts < 1:
+            raise ValueError(
+                "lease_seconds, poll_interval_seconds and max_attempts must be positive"
+            )
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.max_attempts = max_attempts
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # a connection per transaction keeps the queue safe to share across threads
+        conn = sqlite3.connect(self.path, timeout=60.0, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    # --- coordinator ---
+
+    def initialise(self, config_fingerprints: list[str]) -> None:
+        """Creates an empty queue for the given configs, refusing to reuse a queue with items."""
+        # executescript manages its own transaction
+        conn = sqlite3.connect(self.path, timeout=60.0)
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+        with self._transaction() as conn:
+            if conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]:
+                raise ValueError(
+                    f"Work queue {self.path} already holds items, use a new path per run "
+                    "and resume interrupted runs from a journal instead"
+                )
+            conn.execute("DELETE FROM configs")
+            conn.executemany(
+                "INSERT INTO configs (config_index, fingerprint) VALUES (?, ?)",
+                list(enumerate(config_fingerprints)),
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('closed', '0')")
+
+    def submit(self, units: list[tuple[int, list[int]]], sample_keys: list[str]) -> int:
+        """Adds a batch of (sample index, config indices) units, returning the batch id."""
+        with self._transaction() as conn:
+            batch = conn.execute("SELECT COALESCE(MAX(batch), -1) + 1 FROM items").fetchone()[0]
+            conn.executemany(
+                "INSERT INTO items (batch, sample_index, sample_key, config_indices) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (batch, si, key, json.dumps(config_indices))
+                    for (si, config_indices), key in zip(units, sample_keys)
+                ],
+            )
+        logger.info(f"Submitted {len(units)} work items to {self.path} as batch {batch}")
+        return batch
+
+    def wait(self, batch: int) -> dict[tuple[int, int], SampleResult]:
+        """Blocks until every item of `batch` is done, returning results by (config, sample)."""
+        while True:
+            self._fail_exhausted_items()
+            with self._transaction() as conn:
+                rows = conn.execute(
+                    "SELECT status, sample_index, config_indices, results FROM items WHERE batch = ?",
+                    (batch,),
+                ).fetchall()
+            n_done = sum(status == "done" for status, *_ in rows)
+            if n_done == len(rows):
+                break
+            logger.debug(f"Waiting on {len(rows) - n_done} of {len(rows)} work items")
+            time.sleep(self.poll_interval_seconds)
+
+        outcomes = {}
+        for _, si, config_indices, results in rows:
+            for ci, result in zip(json.loads(config_indices), json.loads(results)):
+                outcomes[(ci, si)] = SampleResult.model_validate(result)
+        return outcomes
+
+    def close(self) -> None:
+        """Tells idle workers that no more work will be submitted."""
+        with self._transaction() as conn:
+            conn.execute("UPDATE meta SET value = '1' WHERE key = 'closed'")
+
+    # --- workers ---
+
+    def config_fingerprints(self) -> list[str] | None:
+        """Fingerprints of the coordinator's configs, None until the queue is initialised."""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with self._transaction() as conn:
+                rows = conn.execute(
+                    "SELECT fingerprint FROM configs ORDER BY config_index"
+                ).fetchall()
+        except sqlite3.OperationalError:
+            return None  # tables not created yet
+        return [fingerprint for (fingerprint,) in rows] or None
+
+    @property
+    def closed(self) -> bool:
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'closed'").fetchone()
+        return row is not None and row[0] == "1"
+
+    def claim(self, worker: str) -> WorkItem | None:
+        """Leases the oldest pending or expired item to `worker`, if any."""
+        self._fail_exhausted_items()
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT item_id, sample_index, sample_key, config_indices FROM items "
+                "WHERE status = 'pending' "
+                "OR (status = 'leased' AND lease_expires < ? AND attempts < ?) "
+                "ORDER BY item_id LIMIT 1",
+                (now, self.max_attempts),
+            ).fetchone()
+            if row is None:
+                return None
+            item_id, si, key, config_indices = row
+            conn.execute(
+                "UPDATE items SET status = 'leased', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE item_id = ?",
+                (worker, now + self.lease_seconds, item_id),
+            )
+        return WorkItem(
+            item_id=item_id,
+            sample_index=si,
+            sample_key=key,
+            config_indices=json.loads(config_indices),
+            worker=worker,
+        )
+
+    def complete(self, item: WorkItem, results: list[SampleResult]) -> bool:
+        """Stores the results of a leased item, returns False if another worker finished first."""
+        payload = json.dumps([r.model_dump(mode="json") for r in results])
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE items SET status = 'done', results = ?, lease_expires = NULL "
+                "WHERE item_id = ? AND status != 'done'",
+                (payload, item.item_id),
+            ).rowcount
+        if not updated:
+            logger.warning(f"Work item {item.item_id} was already completed by another worker")
+        return bool(updated)
+
+    def _fail_exhausted_items(self) -> None:
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT item_id, config_indices, worker FROM items "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (time.time(), self.max_attempts),
+            ).fetchall()
+            for item_id, config_indices, worker in rows:
+                error = f"Lease expired {self.max_attempts} times, last held by {worker}"
+                logger.error(f"Giving up on work item {item_id}: {error}")
+                failed = [SampleResult(error=error).model_dump(mode="json")] * len(
+                    json.loads(config_indices)
+                )
+                conn.execute(
+                    "UPDATE items SET status = 'done', results = ? WHERE item_id = ?",
+                    (json.dumps(failed), item_id),
+                )
@@ -0,0 +1,16 @@
+"""Simulated model behaviour shared by the tests running `SimulatedBedrockClient` sweeps."""
+
+MODEL_A = "amazon.nova-micro-v1:0"
+MODEL_B = "amazon.nova-lite-v1:0"
+
+
+def question(messages: list[dict]) -> str:
+    return messages[0]["content"][0]["text"]
+
+
+def echo_responder(model_id: str, messages: list[dict]) -> str:
+    # model a always answers correctly, model b only for even numbers
+    number = int(question(messages).split()[-1])
+    if model_id == MODEL_B and number % 2:
+        return "no idea"
+    return f"the answer is {number}"
@@ -0,0 +1,55 @@
+import json
+
+import pydantic
+
+from bhive import Hive, HiveConfig, OutputArchive
+from bhive.simulator import SimulatedBedrockClient
+
+MODEL_A = "amazon.nova-micro-v1:0"
+IMAGE = b"\x89PNG not really an image"
+
+
+class Answer(pydantic.BaseModel):
+    value: int
+
+
+def _image_messages() -> list[dict]:
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"text": "What is in the image?"},
+                {"image": {"format": "png", "source": {"bytes": IMAGE}}},
+            ],
+        }
+    ]
+
+
+def should_replace_image_bytes_with_hashes(tmp_path):
+    hive_config = HiveConfig(bedrock_model_ids=[MODEL_A] * 3, num_reflections=1)
+    output = Hive(client=SimulatedBedrockClient()).converse(_image_messages(), hive_config)
+    archive = OutputArchive(tmp_path / "outputs.jsonl", blob_dir=tmp_path / "blobs")
+    archive.write(output, request_id="abc")
+    archive.write(output, request_id="def")
+
+    assert IMAGE.hex() not in (tmp_path / "outputs.jsonl").read_text()
+    assert len(list((tmp_path / "blobs").iterdir())) == 1
+    records = list(archive.read())
+    assert [r["metadata"]["request_id"] for r in records] == ["abc", "def"]
+    image = records[0]["output"]["chat_history"][2]["chat_history"][0]["content"][1]["image"]
+    assert list(image["source"]["bytes"]) == ["sha256"]
+
+    restored = next(archive.read(resolve_blobs=True))["output"]
+    assert restored["chat_history"][1]["chat_history"][0]["content"][1]["image"]["source"] == {
+        "bytes": IMAGE
+    }
+
+
+def should_archive_parsed_responses(tmp_path):
+    simulator = SimulatedBedrockClient(lambda *_: f"<json>{json.dumps({'value': 4})}</json>")
+    hive_config = HiveConfig(bedrock_model_ids=[MODEL_A], output_model=Answer)
+    messages = [{"role": "user", "content": [{"text": "What is 2+2?"}]}]
+    output = Hive(client=simulator).converse(messages, hive_config)
+    archive = OutputArchive(tmp_path / "outputs.jsonl")
+    archive.write(output)
+    assert next(archive.read())["output"]["parsed_response"] == {"value": 4}
@@ -1,11 +1,14 @@
 import io
+import random
 from unittest.mock import MagicMock
 
 import pytest
 
+from bhive import augment
 from bhive.augment import (
     augment_image,
     augment_images_in_content,
+    augment_images_in_content_variants,
     augment_llm,
     detect_image_format,
 )
@@ -62,6 +65,27 @@ def should_forward_images_to_llm_rephrase():
     assert any("image" in b for b in content)
 
 
+def should_build_character_augmenters_once(mocker):
+    from bhive import augment
+
+    first = augment._get_character_augmenters()
+    assert augment._get_character_augmenters() is first
+    spy = mocker.spy(first[0], "augment")
+    mocker.patch("random.choice", return_value=first[0])
+    assert len(augment.augment_character("hello there", 3)) == 3
+    assert spy.call_count == 3
+
+
+def should_import_bhive_without_augmentation_dependencies():
+    import os
+    import subprocess
+    import sys
+
+    check = "import sys, bhive; assert not {'nlpaug', 'PIL'} & set(sys.modules)"
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    subprocess.run([sys.executable, "-c", check], check=True, env=env)
+
+
 # --- augment_image ---
 
 
@@ -104,6 +128,36 @@ def should_augment_only_image_blocks_in_content():
     assert len(result[0]["image"]["source"]["bytes"]) > 0
 
 
+@pytest.mark.parametrize("processes", [0, 2])
+def should_render_independent_variants_of_every_image(processes):
+    from PIL import Image
+
+    jpeg = io.BytesIO()
+    Image.effect_noise((64, 48), 50).save(jpeg, format="JPEG")
+    content = [
+        {"image": {"format": "png", "source": {"bytes": _make_png_bytes()}}},
+        {"text": "Compare the images"},
+        {"image": {"format": "jpeg", "source": {"bytes": jpeg.getvalue()}}},
+    ]
+    random.seed(0)
+    variants = augment_images_in_content_variants(content, 4, processes=processes)
+    random.seed(0)
+    assert augment_images_in_content_variants(content, 4, processes=0) == variants
+
+    assert len(variants) == 4
+    for variant in variants:
+        assert variant[1] is content[1]
+        assert variant[0]["image"]["source"]["bytes"][:4] == b"\x89PNG"
+        augmented_jpeg = Image.open(io.BytesIO(variant[2]["image"]["source"]["bytes"]))
+        assert augmented_jpeg.format == "JPEG"
+        assert augmented_jpeg.size[0] <= 64 and augmented_jpeg.size[1] <= 48
+    assert len({v[2]["image"]["source"]["bytes"] for v in variants}) > 1
+    # the pool is only started when asked for, and shut down at exit
+    assert (augment._pool is not None) == bool(processes)
+    augment._shutdown_pool()
+    assert augment._pool is None
+
+
 # --- Hive._apply_augmentation ---
 
 
@@ -214,6 +268,32 @@ def should_apply_image_augmentation_to_chatlog(mocker):
     assert chatlog.history[1].chat_history[0]["content"][1]["text"] == "Describe this image"
 
 
+def should_share_prompt_across_slots_until_augmented(mocker):
+    from bhive import config
+
+    hive = _make_hive(mocker.MagicMock())
+    original_png = _make_png_bytes()
+    content = [
+        {"image": {"format": "png", "source": {"bytes": original_png}}},
+        {"text": "Describe this image"},
+    ]
+    chatlog = _make_chatlog(3, content=content)
+    prompts = [log.chat_history[0] for log in chatlog.history]
+    assert prompts[0] is prompts[1] is prompts[2]
+
+    cfg = config.HiveConfig(
+        bedrock_model_ids=["model-a"] * 3,
+        augmentation_method="visual",
+        aggregator_model_id="model-a",
+    )
+    hive._apply_augmentation(cfg, chatlog, hive._converse)
+    assert chatlog.history[0].chat_history[0] is prompts[0]
+    assert content[0]["image"]["source"]["bytes"] == original_png
+    augmented = chatlog.history[2].chat_history[0]["content"]
+    assert augmented is not content
+    assert augmented[1] is content[1]
+
+
 def should_skip_image_augmentation_without_images(mocker):
     from bhive import config
 
@@ -259,7 +339,7 @@ def should_augment_then_infer_with_mock_client(mocker):
     def side_effect(**kwargs):
         messages = kwargs["messages"]
         last_text = messages[-1]["content"][-1]["text"]
-        if "Rephrase" in last_text:
+        if "Rephrase the following" in last_text:
             return {
                 "ResponseMetadata": {"HTTPStatusCode": 200},
                 "output": {
@@ -293,3 +373,34 @@ def should_augment_then_infer_with_mock_client(mocker):
     result = hive.converse(messages, cfg)
     assert mock_client.converse.call_count >= 3
     assert "42" in result.response
+
+
+def should_start_original_slot_while_rephrasing():
+    """Slot 0 keeps the original prompt, so its first call does not wait for the rephrasing."""
+    import threading
+
+    from bhive import client, config
+    from bhive.simulator import SimulatedBedrockClient
+
+    original_answered = threading.Event()
+    prompts = []
+
+    def responder(model_id, messages):
+        text = messages[-1]["content"][-1]["text"]
+        if "Rephrase the following" in text:
+            # only returns in time if slot 0 was sent before the rephrasing finished
+            assert original_answered.wait(timeout=5)
+            return "<q1>What is two plus two?</q1>"
+        if text.startswith("What is"):
+            prompts.append(text)
+            if text == "What is 2+2?":
+                original_answered.set()
+        return "4"
+
+    hive = client.Hive(client=SimulatedBedrockClient(responder))
+    cfg = config.HiveConfig(
+        bedrock_model_ids=["model-a", "model-a"], augmentation_method="semantic"
+    )
+    result = hive.converse([{"role": "user", "content": [{"text": "What is 2+2?"}]}], cfg)
+    assert prompts == ["What is 2+2?", "What is two plus two?"]
+    assert result.response == ["4", "4"]
@@ -0,0 +1,49 @@
+from bhive import Hive, HiveConfig
+from bhive.blobs import BlobRef, BlobStore
+from bhive.simulator import SimulatedBedrockClient
+
+MODEL_A = "amazon.nova-micro-v1:0"
+IMAGE = b"\x89PNG not really an image"
+
+
+def _image_message(image: bytes = IMAGE) -> dict:
+    return {
+        "role": "user",
+        "content": [
+            {"text": "What is in the image?"},
+            {"image": {"format": "png", "source": {"bytes": image}}},
+        ],
+    }
+
+
+def should_intern_binary_content_once():
+    store = BlobStore()
+    text_message = {"role": "user", "content": [{"text": "hello"}]}
+    messages = [_image_message(), text_message, _image_message(bytearray(IMAGE))]
+    interned = store.intern(messages)
+
+    assert len(store) == 1
+    assert interned[1] is text_message
+    refs = [m["content"][1]["image"]["source"]["bytes"] for m in (interned[0], interned[2])]
+    assert refs[0] == refs[1] == BlobRef(digest=refs[0].digest, size=len(IMAGE))
+    assert interned[0]["content"][0] is messages[0]["content"][0]
+    assert store.materialise(interned) == [_image_message(), text_message, _image_message()]
+    assert messages[0] == _image_message()  # the caller's messages are left untouched
+
+
+def should_only_send_bytes_to_bedrock():
+    received = []
+
+    def responder(model_id: str, messages: list[dict]) -> str:
+        received.append(messages[0]["content"][1]["image"]["source"]["bytes"])
+        return "a cat"
+
+    hive_config = HiveConfig(bedrock_model_ids=[MODEL_A] * 2, num_reflections=1)
+    output = Hive(client=SimulatedBedrockClient(responder)).converse(
+        [_image_message()], hive_config
+    )
+    assert received == [IMAGE] * 4
+    assert all(
+        log.chat_history[0]["content"][1]["image"]["source"]["bytes"] == IMAGE
+        for log in output.chat_history
+    )
@@ -1,5 +1,8 @@
+import threading
+
 import pytest
-from bhive import client, config, utils
+from bhive import chat, client, config, stream, struct_output, utils
+from bhive.simulator import SimulatedBedrockClient
 from botocore.config import Config
 
 
@@ -121,3 +124,165 @@ def should_correctly_count_latency_ms(latency_ms, mock_runtime_client, response_
     messages = [{"role": "user", "content": [{"text": "Hello"}]}]
     response = hive.converse(messages, _config)
     assert response.metrics[model_id].latencyMs == latency_ms
+
+
+def should_return_output_that_passes_validation(mock_runtime_client, response_factory):
+    mock_runtime_client.converse.return_value = response_factory("42")
+    hive = client.Hive(client=mock_runtime_client)
+    _config = config.HiveConfig(
+        bedrock_model_ids=["test"] * 2, num_reflections=1, aggregator_model_id="test"
+    )
+    messages = [{"role": "user", "content": [{"text": "Hello"}]}]
+    response = hive.converse(messages, _config)
+    assert all(isinstance(log, chat.ModelChatLog) for log in response.chat_history)
+    # 3 slots (2 models and the aggregator) * 2 rounds + 1 aggregation
+    assert response.usage["test"].inputTokens == 7 * 5
+    revalidated = chat.HiveOutput.model_validate(response.model_dump())
+    assert revalidated.model_dump() == response.model_dump()
+
+
+@pytest.mark.parametrize(
+    "output_detail, expected_lengths",
+    [("full", [5, 4, 4]), ("last_round", [3, 2, 2]), ("final", [0, 0, 0])],
+)
+def should_trim_chat_history_by_output_detail(
+    output_detail, expected_lengths, mock_runtime_client, response_factory
+):
+    mock_runtime_client.converse.return_value = response_factory("42")
+    hive = client.Hive(client=mock_runtime_client)
+    _config = config.HiveConfig(
+        bedrock_model_ids=["test"] * 2,
+        num_reflections=1,
+        aggregator_model_id="test",
+        output_detail=output_detail,
+    )
+    messages = [{"role": "user", "content": [{"text": "Hello"}]}]
+    response = hive.converse(messages, _config)
+    assert [len(log.chat_history) for log in response.chat_history] == expected_lengths
+    assert response.response == ["42", "42", "42"]
+    assert response.usage["test"].inputTokens == 7 * 5
+
+
+def should_stream_round_and_aggregation_events():
+    def responder(model_id, messages):
+        return f"The answer from {model_id} is 4"
+
+    hive = client.Hive(client=SimulatedBedrockClient(responder))
+    _config = config.HiveConfig(
+        bedrock_model_ids=["a", "b"], num_reflections=1, aggregator_model_id="agg"
+    )
+    messages = [{"role": "user", "content": [{"text": "What is 2+2?"}]}]
+    events = list(hive.converse_stream(messages, _config))
+
+    rounds = [e.round for e in events if isinstance(e, stream.RoundStarted)]
+    assert rounds == [0, 1]
+    completed = [e for e in events if isinstance(e, stream.SlotCompleted)]
+    assert sorted((e.round, e.slot, e.model_id) for e in completed) == [
+        (0, 0, "a"),
+        (0, 1, "b"),
+        (0, 2, "agg"),
+        (1, 0, "a"),
+        (1, 1, "b"),
+        (1, 2, "agg"),
+    ]
+    for done in completed:
+        deltas = [
+            e.text
+            for e in events
+            if isinstance(e, stream.SlotDelta) and (e.round, e.slot) == (done.round, done.slot)
+        ]
+        assert "".join(deltas) == done.answer == f"The answer from {done.model_id} is 4"
+    aggregation = "".join(e.text for e in events if isinstance(e, stream.AggregationDelta))
+    assert aggregation == "The answer from agg is 4"
+
+    assert isinstance(events[-1], stream.FinalOutput)
+    output = events[-1].output
+    assert output.response == [aggregation, "The answer from b is 4", "The answer from agg is 4"]
+    assert output.model_dump() == hive.converse(messages, _config).model_dump()
+
+
+def should_raise_failed_stream_calls_from_the_iterator():
+    def responder(model_id, messages):
+        raise RuntimeError("throttled")
+
+    hive = client.Hive(client=SimulatedBedrockClient(responder))
+    _config = config.HiveConfig(bedrock_model_ids=["a"])
+    with pytest.raises(RuntimeError, match="throttled"):
+        list(hive.converse_stream([{"role": "user", "content": [{"text": "Hi"}]}], _config))
+
+
+def should_stop_calling_models_once_the_stream_is_closed():
+    simulator = SimulatedBedrockClient(lambda model_id, messages: "The answer is 4")
+    hive = client.Hive(client=simulator)
+    _config = config.HiveConfig(
+        bedrock_model_ids=["a", "b"], num_reflections=3, aggregator_model_id="agg"
+    )
+    events = hive.converse_stream([{"role": "user", "content": [{"text": "Hi"}]}], _config)
+    for event in events:
+        if isinstance(event, stream.SlotCompleted):
+            break
+    events.close()
+    for thread in threading.enumerate():
+        if thread.name == "bhive-converse-stream":
+            thread.join(timeout=5)
+
+    # calls of the first round may already be running, no later round is started
+    assert sum(simulator.calls.values()) <= 3
+
+
+def should_collect_the_first_text_block_of_a_stream():
+    def _delta(index, delta):
+        return {"contentBlockDelta": {"delta": delta, "contentBlockIndex": index}}
+
+    events = [
+        _delta(0, {"reasoningContent": {"text": "Let me think"}}),
+        _delta(1, {"text": "The answer "}),
+        _delta(1, {"text": "is 4"}),
+        _delta(2, {"reasoningContent": {"text": "More thoughts"}}),
+        _delta(3, {"text": "Trailing block"}),
+        {"messageStop": {"stopReason": "end_turn"}},
+    ]
+    deltas = []
+    record = stream.collect_stream(events, deltas.append)
+    assert (record.answer, record.thinking) == ("The answer is 4", "Let me think")
+    assert deltas == ["The answer ", "is 4"]
+
+
+def should_stop_final_answers_at_closing_tag():
+    def responder(model_id, messages):
+        return "Reasoning <answer>4</answer> followed by a long explanation nobody reads."
+
+    simulator = SimulatedBedrockClient(responder, output_tokens=100)
+    hive = client.Hive(client=simulator)
+    _config = config.HiveConfig(
+        bedrock_model_ids=["a", "b"],
+        num_reflections=1,
+        aggregator_model_id="agg",
+        stop_after_tag="</answer>",
+    )
+    messages = [{"role": "user", "content": [{"text": "What is 2+2?"}]}]
+    response = hive.converse(messages, _config)
+
+    assert response.response == ["Reasoning <answer>4</answer>"] * 3
+    for log in response.chat_history:
+        first_round, last_round = log.chat_history[1], log.chat_history[3]
+        assert first_round["content"][0]["text"].endswith("nobody reads.")
+        assert last_round["content"][0]["text"] == "Reasoning <answer>4</answer>"
+    stops = [(s.round, s.n_calls, s.n_stopped) for s in response.early_stopping]
+    assert stops == [(0, 3, 0), (1, 3, 3), (None, 1, 1)]
+    saved = [s.min_output_tokens_saved for s in response.early_stopping]
+    assert saved[0] == 0 and saved[1] > saved[2] > 0
+    # agg debates its first round in full, then stops at the tag in the last round and aggregation
+    assert response.usage["agg"].outputTokens < 2 * 100
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('<json>{"a": 1}', '<json>{"a": 1}</json>'),
+        ('<json>{"a": 1}</json>', '<json>{"a": 1}</json>'),
+        ("no tags at all", "no tags at all"),
+    ],
+)
+def should_close_tag_left_open_by_stop_sequence(text, expected):
+    assert struct_output.close_tag(text, "</json>") == expected
@@ -1,6 +1,8 @@
+from typing import Literal
+
 import pytest
 from pydantic_core import ValidationError
-from bhive.config import HiveConfig
+from bhive.config import HiveConfig, InferenceParameters, TrialConfig
 
 
 @pytest.mark.parametrize(
@@ -68,3 +70,162 @@ def should_allow_none_augmentation_method():
     cfg = HiveConfig(bedrock_model_ids=["m1"])
     assert cfg.augmentation_method is None
     assert cfg.augmentation_model_id is None
+
+
+# --- Trial configuration space ---
+
+
+def _verifier(answer: str) -> str:
+    return "checked"
+
+
+def should_deduplicate_equivalent_configurations():
+    trial = TrialConfig(
+        bedrock_model_combinations=[["m1"], ["m1", "m2"]],
+        reflection_range=[0, 1],
+        aggregator_model_ids=[None, "m1"],
+        verifier_functions=[None, _verifier],
+        augmentation_methods=[None, "lexical"],
+    )
+    configs = list(trial.iter_configurations())
+    lone = [c for c in configs if c.n_models == 1 and c.aggregator_model_id is None]
+    # a lone slot: only reflections and (when reflecting) the verifier matter
+    assert [(c.num_reflections, c.verifier, c.augmentation_method) for c in lone] == [
+        (0, None, None),
+        (1, None, None),
+        (1, _verifier, None),
+    ]
+    # the aggregator debates as a second slot, so augmentation matters and so does the
+    # verifier, except without reflections where a single model cannot take one
+    aggregated = [c for c in configs if c.n_models == 1 and c.aggregator_model_id]
+    assert sorted((c.num_reflections, c.verifier is not None) for c in aggregated) == [
+        (0, False),
+        (0, False),
+        (1, False),
+        (1, False),
+        (1, True),
+        (1, True),
+    ]
+    assert {c.augmentation_method for c in aggregated} == {None, "lexical"}
+    # two slots: the verifier is unused without reflections or an aggregator
+    assert len(configs) - len(lone) - len(aggregated) == 2 + 4 + 8
+    assert trial.grid_size == 32
+    assert len({c.fingerprint() for c in configs}) == len(configs)
+
+
+def should_enumerate_configurations_lazily():
+    trial = TrialConfig(
+        bedrock_model_combinations=[["m1", "m2"]],
+        reflection_range=list(range(10_000)),
+        aggregator_model_ids=["m1", "m2"],
+    )
+    first = next(trial.iter_configurations())
+    assert first.num_reflections == 0
+    assert trial.grid_size == 20_000
+
+
+def should_apply_constraints():
+    trial = TrialConfig(
+        bedrock_model_combinations=[["m1"], ["m1", "m2"]],
+        reflection_range=[0, 1, 2],
+        constraints=[lambda c: c.n_models * (c.num_reflections + 1) <= 4],
+    )
+    assert [(c.n_models, c.num_reflections) for c in trial.iter_configurations()] == [
+        (1, 0),
+        (1, 1),
+        (1, 2),
+        (2, 0),
+        (2, 1),
+    ]
+
+
+@pytest.mark.parametrize("method", ["random", "latin_hypercube"])
+def should_subsample_distinct_configurations(method: Literal["random", "latin_hypercube"]):
+    trial = TrialConfig(
+        bedrock_model_combinations=[["m1", "m2"], ["m2", "m3"], ["m1", "m3"]],
+        reflection_range=list(range(1000)),
+        aggregator_model_ids=["m1", "m2", "m3"],
+        max_configurations=12,
+        sampling=method,
+        seed=0,
+    )
+    configs = trial._all_configuration_options()
+    assert len(configs) == 12
+    assert len({c.fingerprint() for c in configs}) == 12
+    assert [c.fingerprint() for c in configs] == [
+        c.fingerprint() for c in trial._all_configuration_options()
+    ]
+
+
+def should_cover_every_value_with_latin_hypercube_sampling():
+    trial = TrialConfig(
+        bedrock_model_combinations=[["m1", "m2"], ["m2", "m3"], ["m1", "m3"]],
+        reflection_range=list(range(6)),
+        aggregator_model_ids=["m1", "m2", "m3"],
+    )
+    configs = trial.sample_configurations(6, method="latin_hypercube", seed=1)
+    assert sorted(c.num_reflections for c in configs) == list(range(6))
+    assert {tuple(c.bedrock_model_ids) for c in configs} == {
+        ("m1", "m2"),
+        ("m2", "m3"),
+        ("m1", "m3"),
+    }
+
+
+def should_return_whole_space_when_sampling_more_than_available():
+    trial = TrialConfig(bedrock_model_combinations=[["m1"]], aggregator_model_ids=["m1", "m2"])
+    assert len(trial.sample_configurations(5, seed=0)) == 2
+
+
+@pytest.mark.parametrize("method", ["random", "latin_hypercube"])
+def should_stop_sampling_when_few_configurations_are_distinct(
+    method: Literal["random", "latin_hypercube"],
+):
+    # parameters of a model no config uses are dropped, so the 40_000 grid points hold 2 configs
+    trial = TrialConfig(
+        bedrock_model_combinations=[["m1"]],
+        reflection_range=[0, 1],
+        inference_parameter_options={
+            "unused": [InferenceParameters(max_tokens=i) for i in range(1, 20_001)]
+        },
+    )
+    configs = trial.sample_configurations(5, method=method, seed=0)
+    assert sorted(c.num_reflections for c in configs) == [0, 1]
+
+
+# --- Inference parameters ---
+
+
+def should_override_converse_kwargs_with_inference_parameters():
+    params = InferenceParameters(max_tokens=8000, temperature=1.0, thinking_budget_tokens=4000)
+    kwargs = {"inferenceConfig": {"maxTokens": 100, "stopSequences": ["</a>"]}, "system": []}
+    assert params.apply(kwargs) == {
+        "inferenceConfig": {"maxTokens": 8000, "stopSequences": ["</a>"], "temperature": 1.0},
+        "additionalModelRequestFields": {"thinking": {"type": "enabled", "budget_tokens": 4000}},
+        "system": [],
+    }
+    assert kwargs["inferenceConfig"]["maxTokens"] == 100
+    assert InferenceParameters().apply(kwargs) == kwargs
+
+
+def should_reject_thinking_budget_above_max_tokens():
+    with pytest.raises(ValidationError):
+        InferenceParameters(max_tokens=1000, thinking_budget_tokens=2000)
+
+
+def should_sweep_inference_parameters_per_model():
+    low, high = InferenceParameters(max_tokens=256), InferenceParameters(max_tokens=4096)
+    trial = TrialConfig(
+        bedrock_model_combinations=[["m1"], ["m1", "m2"]],
+        inference_parameter_options={"m1": [low, high], "m2": [low, high]},
+    )
+    configs = list(trial.iter_configurations())
+    # m2 parameters only matter for the combination that uses it
+    assert [c.inference_parameters for c in configs] == [
+        {"m1": low},
+        {"m1": high},
+        {"m1": low, "m2": low},
+        {"m1": low, "m2": high},
+        {"m1": high, "m2": low},
+        {"m1": high, "m2": high},
+    ]
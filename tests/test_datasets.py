@@ -0,0 +1,94 @@
+import json
+import pickle
+
+import pytest
+
+from bhive import Hive, JsonlDataset, TrialConfig
+from bhive.simulator import SimulatedBedrockClient
+from tests.responders import MODEL_A, echo_responder
+
+
+@pytest.fixture
+def jsonl_path(tmp_path):
+    path = tmp_path / "data.jsonl"
+    lines = [json.dumps({"q": f"Repeat the number {i}", "a": i}) for i in range(10)]
+    path.write_text("\n".join(lines[:5]) + "\n\n" + "\n".join(lines[5:]) + "\n")
+    return path
+
+
+def should_index_lines_without_loading_them(jsonl_path):
+    dataset = JsonlDataset(jsonl_path)
+    assert len(dataset) == 10
+    assert dataset[0] == ("Repeat the number 0", "0")
+    assert dataset[-1] == ("Repeat the number 9", "9")
+    assert [a for _, a in dataset[2:8:3]] == ["2", "5"]
+
+
+def should_handle_missing_trailing_newline_and_empty_files(tmp_path):
+    path = tmp_path / "data.jsonl"
+    path.write_text('{"q": "x", "a": "y"}\n{"q": "z", "a": "w"}')
+    assert list(JsonlDataset(path)) == [("x", "y"), ("z", "w")]
+    empty = tmp_path / "empty.jsonl"
+    empty.write_text("")
+    assert len(JsonlDataset(empty)) == 0
+
+
+def should_subsample_reproducibly(jsonl_path):
+    dataset = JsonlDataset(jsonl_path)
+    subset = dataset.sample(4, seed=3)
+    assert len(subset) == 4
+    assert list(subset) == list(dataset.sample(4, seed=3))
+    assert len({q for q, _ in subset}) == 4
+    assert len(dataset.sample(100)) == 10
+
+
+def should_pickle_without_the_memory_map(jsonl_path):
+    dataset = JsonlDataset(jsonl_path).sample(3, seed=0)
+    dataset[0]  # opens the memory map
+    restored = pickle.loads(pickle.dumps(dataset))
+    assert list(restored) == list(dataset)
+
+
+def should_load_images_lazily(tmp_path):
+    (tmp_path / "cat.png").write_bytes(b"\x89PNG fake")
+    path = tmp_path / "data.jsonl"
+    path.write_text(json.dumps({"q": "What animal?", "a": "cat", "images": ["cat.png"]}) + "\n")
+    dataset = JsonlDataset(path)
+
+    (tmp_path / "cat.png").write_bytes(b"\x89PNG replaced")  # read on access, not on indexing
+    content, answer = dataset[0]
+    assert answer == "cat"
+    assert content == [
+        {"text": "What animal?"},
+        {"image": {"format": "png", "source": {"bytes": b"\x89PNG replaced"}}},
+    ]
+
+
+def should_optimise_over_streamed_and_generated_datasets(jsonl_path):
+    trial_config = TrialConfig(bedrock_model_combinations=[[MODEL_A]])
+    streamed = Hive(client=SimulatedBedrockClient(echo_responder)).optimise(
+        JsonlDataset(jsonl_path), trial_config
+    )
+    generated = Hive(client=SimulatedBedrockClient(echo_responder)).optimise(
+        ((f"Repeat the number {i}", str(i)) for i in range(10)), trial_config
+    )
+    assert streamed.best.score == generated.best.score == 1.0
+    assert streamed.best.n_samples == 10
+
+
+def should_send_multimodal_samples_as_content_blocks(tmp_path):
+    (tmp_path / "cat.jpg").write_bytes(b"jpeg bytes")
+    path = tmp_path / "data.jsonl"
+    path.write_text(json.dumps({"q": "What animal?", "a": "cat", "images": ["cat.jpg"]}) + "\n")
+    received = []
+
+    def responder(model_id: str, messages: list[dict]) -> str:
+        received.append(messages[0]["content"])
+        return "a cat"
+
+    trial_config = TrialConfig(bedrock_model_combinations=[[MODEL_A]])
+    results = Hive(client=SimulatedBedrockClient(responder)).optimise(
+        JsonlDataset(path), trial_config
+    )
+    assert results.best.score == 1.0
+    assert received[0][1] == {"image": {"format": "jpeg", "source": {"bytes": b"jpeg bytes"}}}
@@ -1,6 +1,21 @@
+import time
+
+import numpy as np
 import pytest
 from pydantic import ValidationError
-from bhive import BudgetConfig, TokenPrices
+from bhive import BudgetConfig, HiveConfig, TokenPrices
+from bhive.evaluators import (
+    EvaluatorRunner,
+    GridResults,
+    TrialResult,
+    answer_in_tags,
+    answer_in_tags_batch,
+    answer_in_text,
+    answer_in_text_batch,
+    answers_equal,
+    answers_equal_batch,
+    pareto,
+)
 
 test_costs = {
     "model_a": TokenPrices(input_per_1000=0.1, output_per_1000=0.1),
@@ -54,3 +69,180 @@ def should_raise_validation_error_for_invalid_cost_dictionary():
 def should_raise_validation_error_for_invalid_token_prices():
     with pytest.raises(ValidationError):
         _ = TokenPrices(input_per_1000=-0.1, output_per_1000=0.1)
+
+
+# --- Pareto front ---
+
+
+def _trial(score: float, cost: float, latency: float) -> TrialResult:
+    return TrialResult(
+        config=HiveConfig(bedrock_model_ids=["model_a"]),
+        score=score,
+        avg_cost_dollars=cost,
+        avg_latency_seconds=latency,
+    )
+
+
+@pytest.fixture
+def grid_results():
+    return GridResults(
+        individual_results=[
+            _trial(0.9, 0.10, 5.0),
+            _trial(0.9, 0.05, 6.0),
+            _trial(0.7, 0.01, 1.0),
+            _trial(0.7, 0.02, 2.0),  # dominated by the previous result
+            _trial(0.5, 0.20, 9.0),  # dominated by everything
+            _trial(0.95, 0.30, 8.0),
+        ]
+    )
+
+
+def should_compute_pareto_front(grid_results):
+    front = grid_results.pareto_front()
+    assert [(r.score, r.avg_cost_dollars) for r in front] == [
+        (0.95, 0.30),
+        (0.9, 0.05),
+        (0.9, 0.10),
+        (0.7, 0.01),
+    ]
+
+
+def should_keep_identical_results_on_pareto_front():
+    results = GridResults(individual_results=[_trial(0.5, 0.1, 1.0), _trial(0.5, 0.1, 1.0)])
+    assert len(results.pareto_front()) == 2
+
+
+def should_match_brute_force_pareto_front():
+    rng = np.random.default_rng(0)
+    objectives = rng.integers(0, 5, size=(300, 3)).astype(float)
+    brute_force = [
+        not any(np.all(other <= point) and np.any(other < point) for other in objectives)
+        for point in objectives
+    ]
+    assert pareto.pareto_mask(objectives).tolist() == brute_force
+
+
+@pytest.mark.parametrize(
+    "max_dollars, max_seconds, expected",
+    [
+        (None, None, (0.95, 0.30)),
+        (0.2, None, (0.9, 0.05)),
+        (0.2, 5.5, (0.9, 0.10)),
+        (0.05, 5.0, (0.7, 0.01)),
+        (0.001, None, None),
+    ],
+)
+def should_query_best_within_limits(grid_results, max_dollars, max_seconds, expected):
+    best = grid_results.best_within(max_dollars, max_seconds)
+    if expected is None:
+        assert best is None
+    else:
+        assert (best.score, best.avg_cost_dollars) == expected
+
+
+def should_query_best_within_budget(grid_results, mock_cost):
+    budget_config = BudgetConfig(max_dollar_per_sample=0.2, max_seconds_per_sample=5.5)
+    best = budget_config.best_within_budget(grid_results)
+    assert budget_config.check_budget(best)
+    assert (best.score, best.avg_cost_dollars) == (0.9, 0.10)
+
+
+# --- Batch string evaluators ---
+
+
+@pytest.mark.parametrize(
+    "scalar, batch",
+    [
+        (answers_equal, answers_equal_batch),
+        (answer_in_text, answer_in_text_batch),
+    ],
+)
+def should_match_scalar_evaluators_in_batch(scalar, batch):
+    expected = ["42", " Paris", "x", "blue"]
+    generated = ["42 ", "the capital is paris", "y", "BLUE"]
+    assert list(batch(expected, generated)) == [scalar(e, g) for e, g in zip(expected, generated)]
+
+
+def should_score_answers_in_tags_in_batch():
+    expected = ["42", "7", "3"]
+    generated = ["so <answer> 42 </answer>", "<answer>8</answer>", "no tags, 3"]
+    assert list(answer_in_tags_batch(expected, generated)) == [True, False, False]
+    assert answer_in_tags(expected[0], generated[0])
+
+
+# --- Evaluator runner ---
+
+
+def _slow_evaluator(expected_response: str, generated_response: str) -> bool:
+    if generated_response == "hang":
+        time.sleep(30)
+    if generated_response.startswith("slow"):
+        time.sleep(0.2)
+    return expected_response in generated_response
+
+
+def should_memoise_repeated_pairs():
+    calls = []
+
+    def counting_evaluator(expected_response: str, generated_response: str) -> bool:
+        calls.append(generated_response)
+        return expected_response == generated_response
+
+    runner = EvaluatorRunner(counting_evaluator, processes=0)
+    outcomes = runner.evaluate_many([("a", "a"), ("a", "b"), ("a", "a")])
+    assert outcomes == [(1.0, None), (0.0, None), (1.0, None)]
+    assert runner("a", "b") == 0.0
+    assert calls == ["a", "b"]
+    assert runner.n_cache_hits == 2
+
+
+def should_capture_evaluator_errors():
+    runner = EvaluatorRunner(answer_in_tags, processes=0)
+    score, error = runner.evaluate_many([("42", "no tags")])[0]
+    assert score == 0.0 and error.startswith("IndexError")
+    with pytest.raises(RuntimeError):
+        runner("42", "no tags")
+
+
+def should_time_out_hanging_evaluators_and_recover():
+    with EvaluatorRunner(_slow_evaluator, processes=2, timeout_seconds=0.5) as runner:
+        start = time.monotonic()
+        outcomes = runner.evaluate_many([("1", "hang"), ("1", "the answer is 1")])
+        assert time.monotonic() - start < 5
+        assert outcomes[0][0] == 0.0 and "timed out" in outcomes[0][1]
+        assert outcomes[1] == (1.0, None)
+        assert runner("2", "answer 2") == 1.0
+        assert runner.n_timeouts == 1
+
+
+def should_not_time_out_calls_queued_for_a_free_process():
+    pairs = [("x", f"slow {i}") for i in range(8)]
+    with EvaluatorRunner(_slow_evaluator, processes=1, timeout_seconds=0.5) as runner:
+        assert runner.evaluate_many(pairs) == [(0.0, None)] * 8
+        assert runner.n_timeouts == 0
+
+
+def should_not_memoise_timed_out_pairs():
+    with EvaluatorRunner(_slow_evaluator, processes=1, timeout_seconds=0.3) as runner:
+        for _ in range(2):
+            score, error = runner.evaluate_many([("1", "hang")])[0]
+            assert score == 0.0 and "timed out" in error
+        assert runner.n_timeouts == 2 and runner.n_cache_hits == 0
+
+
+def should_run_batch_evaluators_in_one_call():
+    batches = []
+
+    def batch_evaluator(expected, generated):
+        batches.append(len(expected))
+        return answer_in_text_batch(expected, generated)
+
+    runner = EvaluatorRunner(batch_evaluator, batch=True, processes=0)
+    outcomes = runner.evaluate_many([("1", "1"), ("2", "3"), ("1", "1")])
+    assert [score for score, _ in outcomes] == [1.0, 0.0, 1.0]
+    assert batches == [2]
+
+
+def should_reject_unpicklable_evaluators_in_a_pool():
+    with pytest.raises(ValueError):
+        EvaluatorRunner(lambda expected, generated: True, processes=1, timeout_seconds=1.0)
@@ -1,6 +1,6 @@
 import pytest
 import pydantic
-from bhive import client, config
+from bhive import chat, client, config
 
 
 @pytest.fixture
@@ -211,6 +211,42 @@ def should_parse_structured_output_single_model(mock_runtime_client, response_fa
     assert result.parsed_response.answer == 42
 
 
+def should_repair_malformed_json_locally(mock_runtime_client, response_factory):
+    hive = _make_hive(mock_runtime_client, response_factory('<json>{"answer": 42,}'))
+    cfg = config.HiveConfig(bedrock_model_ids=["model-a"], output_model=MathAnswer)
+    result = hive.converse(_messages(), cfg)
+    assert result.parsed_response.answer == 42
+    assert result.structured_output_repairs.n_local_repairs == 1
+    assert mock_runtime_client.converse.call_count == 1
+
+
+@pytest.mark.parametrize("repair", [True, False])
+def should_repair_missing_json_with_one_followup_turn(
+    repair, mock_runtime_client, response_factory
+):
+    responses = [
+        response_factory("The answer is 42", output_tokens=10),
+        response_factory('<json>{"answer": 42}</json>', output_tokens=7),
+    ]
+    hive = _make_hive(mock_runtime_client, responses)
+    cfg = config.HiveConfig(
+        bedrock_model_ids=["model-a"], output_model=MathAnswer, repair_structured_output=repair
+    )
+    result = hive.converse(_messages(), cfg)
+    repairs = result.structured_output_repairs
+    if not repair:
+        assert result.parsed_response is None
+        assert (repairs.n_failed, mock_runtime_client.converse.call_count) == (0, 1)
+        return
+    assert result.parsed_response.answer == 42
+    assert result.response == "The answer is 42"
+    assert (repairs.n_failed, repairs.n_followup_calls, repairs.n_repairs) == (1, 1, 1)
+    followup = _get_call_messages(mock_runtime_client, 1)
+    assert followup[1]["content"][0]["text"] == "The answer is 42"
+    assert "No <json></json> block found" in _last_user_msg_text(followup)
+    assert result.usage["model-a"].outputTokens == 17
+
+
 # --- Prompt caching ---
 
 
@@ -270,6 +306,25 @@ def should_build_conversation_history_across_reflections(mock_runtime_client, re
     assert history[3]["role"] == "assistant"
 
 
+def should_index_latest_answers_per_slot():
+    chatlog = chat.ChatLog(["model-a", "model-b", "model-c"], _messages("question"))
+    for round_number in range(3):
+        for index in range(3):
+            chatlog.add_assistant_msg(f"answer {round_number} from {index}", index)
+            chatlog.add_user_msg("debate", index)
+    chatlog.add_thinking_trace("hmm", 1)
+    snapshot = chatlog.snapshot()
+    chatlog.add_assistant_msg("final", 0)
+
+    others = chatlog.get_recent_other_answers(1)
+    assert [m["content"][0]["text"] for m in others] == ["final", "answer 2 from 2"]
+    assert chatlog.get_last_answer() == ["final", "answer 2 from 1", "answer 2 from 2"]
+    assert chatlog.get_last_thinking() == ["", "hmm", ""]
+    assert chatlog.get_round(0) == 4
+    assert snapshot.get_round(0) == 3
+    assert snapshot.get_last_answer()[0] == "answer 2 from 0"
+
+
 # --- Validation ---
 
 
@@ -0,0 +1,423 @@
+from collections.abc import Sequence
+
+import pytest
+
+from bhive import (
+    BudgetConfig,
+    EarlyStopping,
+    Hive,
+    HiveConfig,
+    InferenceParameters,
+    SuccessiveHalving,
+    TrialConfig,
+    config,
+)
+from bhive.evaluators import EvaluatorRunner, answer_in_text_batch
+from bhive.simulator import SimulatedBedrockClient
+from tests.responders import MODEL_A, MODEL_B, echo_responder, question
+
+
+@pytest.fixture
+def dataset():
+    return [(f"Repeat the number {i}", str(i)) for i in range(6)]
+
+
+@pytest.fixture
+def trial_config():
+    return TrialConfig(bedrock_model_combinations=[[MODEL_A], [MODEL_B]], reflection_range=[0, 1])
+
+
+def should_match_serial_results_when_parallel(dataset, trial_config):
+    serial = Hive(client=SimulatedBedrockClient(echo_responder)).optimise(dataset, trial_config)
+    parallel = Hive(client=SimulatedBedrockClient(echo_responder)).optimise(
+        dataset, trial_config, max_workers=8
+    )
+    assert [r.model_dump() for r in serial.individual_results] == [
+        r.model_dump() for r in parallel.individual_results
+    ]
+    assert parallel.best.config.bedrock_model_ids == [MODEL_A]
+    assert [r.score for r in parallel.individual_results] == [1.0, 1.0, 0.5, 0.5]
+
+
+def should_isolate_failures_per_sample(dataset, trial_config):
+    def flaky_responder(model_id: str, messages: list[dict]) -> str:
+        if question(messages).endswith(" 3"):
+            raise RuntimeError("throttled")
+        return echo_responder(model_id, messages)
+
+    hive = Hive(client=SimulatedBedrockClient(flaky_responder))
+    results = hive.optimise(dataset, trial_config, max_workers=4)
+    assert len(results.individual_results) == 4
+    assert results.individual_results[0].score == pytest.approx(5 / 6)
+
+
+def should_respect_per_model_concurrency_limit(dataset, trial_config):
+    simulator = SimulatedBedrockClient(echo_responder, latency_seconds=0.01)
+    hive = Hive(client=simulator, max_concurrent_calls_per_model=2)
+    hive.optimise(dataset, trial_config, max_workers=12)
+    assert 0 < simulator.peak_concurrency[MODEL_A] <= 2
+    assert 0 < simulator.peak_concurrency[MODEL_B] <= 2
+
+
+def should_reject_invalid_concurrency_limit():
+    with pytest.raises(ValueError):
+        Hive(client=SimulatedBedrockClient(), max_concurrent_calls_per_model={MODEL_A: 0})
+
+
+# --- Successive halving ---
+
+
+def should_prune_weak_configs_with_successive_halving(trial_config):
+    dataset = [(f"Repeat the number {i}", str(i)) for i in range(16)]
+    simulator = SimulatedBedrockClient(echo_responder)
+    strategy = SuccessiveHalving(initial_samples=4, reduction_factor=2)
+    results = Hive(client=simulator).optimise(dataset, trial_config, search_strategy=strategy)
+
+    assert [r.n_samples for r in results.individual_results] == [16, 8, 4, 4]
+    assert results.best.config.bedrock_model_ids == [MODEL_A]
+    assert results.best.n_samples == 16
+    # model b is pruned after the first rung, where one 2-round run covers both depths
+    assert simulator.calls[MODEL_B] == 4 * 2
+
+
+def should_prune_over_budget_configs_first(trial_config):
+    def reflective_responder(model_id: str, messages: list[dict]) -> str:
+        if model_id == MODEL_A and len(messages) == 1:
+            return "no idea"  # model a only gets it right after reflecting
+        return echo_responder(model_id, messages)
+
+    dataset = [(f"Repeat the number {i}", str(i)) for i in range(8)]
+    # a single call on model b fits the budget but a reflection on model a does not
+    budget = BudgetConfig(max_dollar_per_sample=5.5e-6, max_seconds_per_sample=10.0)
+    strategy = SuccessiveHalving(initial_samples=2, reduction_factor=4)
+    results = Hive(client=SimulatedBedrockClient(reflective_responder)).optimise(
+        dataset, trial_config, budget_config=budget, search_strategy=strategy
+    )
+    assert results.best.config.bedrock_model_ids == [MODEL_B]
+    assert results.best.config.num_reflections == 0
+    assert results.best.n_samples == 8
+
+
+# --- Early stopping ---
+
+
+def _a_only_responder(model_id: str, messages: list[dict]) -> str:
+    return "no idea" if model_id == MODEL_B else echo_responder(model_id, messages)
+
+
+def should_stop_configs_that_are_provably_worse():
+    dataset = [(f"Repeat the number {i}", str(i)) for i in range(30)]
+    trial_config = TrialConfig(bedrock_model_combinations=[[MODEL_A], [MODEL_B]])
+    simulator = SimulatedBedrockClient(_a_only_responder)
+    strategy = EarlyStopping(batch_size=5, min_samples=10)
+    results = Hive(client=simulator).optimise(dataset, trial_config, search_strategy=strategy)
+
+    assert [r.n_samples for r in results.individual_results] == [30, 10]
+    assert [r.n_samples_skipped for r in results.individual_results] == [0, 20]
+    assert simulator.calls[MODEL_B] == 10
+    assert results.best.config.bedrock_model_ids == [MODEL_A]
+
+
+def should_keep_configs_within_the_confidence_interval(dataset):
+    # model b scores 0.5, which 6 samples cannot separate from model a
+    trial_config = TrialConfig(bedrock_model_combinations=[[MODEL_A], [MODEL_B]])
+    strategy = EarlyStopping(batch_size=2, min_samples=2, bound="hoeffding")
+    results = Hive(client=SimulatedBedrockClient(echo_responder)).optimise(
+        dataset, trial_config, search_strategy=strategy
+    )
+    assert [r.n_samples_skipped for r in results.individual_results] == [0, 0]
+
+
+def should_stop_configs_clearly_over_budget():
+    dataset = [(f"Repeat the number {i}", str(i)) for i in range(12)]
+    trial_config = TrialConfig(bedrock_model_combinations=[[MODEL_A]], reflection_range=[0, 1])
+    # a single call fits the budget but a reflection does not
+    budget = BudgetConfig(max_dollar_per_sample=5.5e-6, max_seconds_per_sample=10.0)
+    strategy = EarlyStopping(batch_size=4, min_samples=4)
+    results = Hive(client=SimulatedBedrockClient(echo_responder)).optimise(
+        dataset,
+        trial_config,
+        budget_config=budget,
+        search_strategy=strategy,
+        share_reflection_rounds=False,
+    )
+    assert [r.n_samples for r in results.individual_results] == [12, 4]
+    assert results.best.config.num_reflections == 0
+
+
+# --- Inference parameter sweeps ---
+
+
+def should_record_token_impact_of_inference_parameters(dataset):
+    thinking = InferenceParameters(max_tokens=2000, thinking_budget_tokens=1000)
+    trial_config = TrialConfig(
+        bedrock_model_combinations=[[MODEL_A]],
+        reflection_range=[0, 1],
+        inference_parameter_options={MODEL_A: [InferenceParameters(), thinking]},
+    )
+    simulator = SimulatedBedrockClient(echo_responder)
+    results = Hive(client=simulator).optimise(dataset, trial_config)
+
+    by_config = {
+        (r.config.num_reflections, r.config.inference_parameters[MODEL_A]): r
+        for r in results.individual_results
+    }
+    assert by_config[(0, thinking)].avg_output_tokens == 1000 + simulator.output_tokens
+    assert by_config[(1, InferenceParameters())].avg_output_tokens == 2 * simulator.output_tokens
+    assert by_config[(1, InferenceParameters())].avg_input_tokens == 2 * simulator.input_tokens
+    assert (
+        by_config[(0, thinking)].avg_cost_dollars
+        > by_config[(1, InferenceParameters())].avg_cost_dollars
+    )
+    # the parameters split the debates, each depth still shares its own
+    assert simulator.calls[MODEL_A] == len(dataset) * 2 * 2
+
+
+# --- Reflection prefix sharing ---
+
+
+def should_share_reflection_rounds_across_depths(dataset):
+    def improving_responder(model_id: str, messages: list[dict]) -> str:
+        # only correct from the third round onwards
+        number = int(question(messages).split()[-1])
+        return f"the answer is {number}" if len(messages) >= 5 else "no idea"
+
+    trial_config = TrialConfig(bedrock_model_combinations=[[MODEL_A]], reflection_range=[0, 1, 3])
+    shared_client = SimulatedBedrockClient(improving_responder, latency_seconds=0.001)
+    shared = Hive(client=shared_client).optimise(dataset, trial_config)
+    separate_client = SimulatedBedrockClient(improving_responder, latency_seconds=0.001)
+    separate = Hive(client=separate_client).optimise(
+        dataset, trial_config, share_reflection_rounds=False
+    )
+
+    assert shared_client.calls[MODEL_A] == len(dataset) * 4
+    assert separate_client.calls[MODEL_A] == len(dataset) * (1 + 2 + 4)
+    assert [r.score for r in shared.individual_results] == [0.0, 0.0, 1.0]
+    for shared_result, separate_result in zip(
+        shared.individual_results, separate.individual_results
+    ):
+        assert shared_result.config == separate_result.config
+        assert shared_result.score == separate_result.score
+        assert shared_result.avg_cost_dollars == pytest.approx(separate_result.avg_cost_dollars)
+        assert shared_result.avg_latency_seconds == pytest.approx(
+            separate_result.avg_latency_seconds
+        )
+    costs = [r.avg_cost_dollars for r in shared.individual_results]
+    assert costs == sorted(costs)
+
+
+def should_return_outputs_at_each_reflection_depth():
+    simulator = SimulatedBedrockClient(lambda model_id, messages: f"round {len(messages) // 2}")
+    hive = Hive(client=simulator)
+    configs = [HiveConfig(bedrock_model_ids=[MODEL_A], num_reflections=d) for d in (0, 2, 3)]
+    messages = [{"role": "user", "content": [{"text": "question"}]}]
+    outputs = [shared.output for shared in hive._converse_shared(messages, configs)]
+
+    assert [o.response for o in outputs] == ["round 0", "round 2", "round 3"]
+    assert outputs[1].usage[MODEL_A].inputTokens == 3 * simulator.input_tokens
+    assert len(outputs[1].chat_history[0].chat_history) == 6
+    assert simulator.calls[MODEL_A] == 4
+
+
+# --- Aggregator and verifier sharing ---
+
+
+def _debate_responder(model_id: str, messages: list[dict]) -> str:
+    # the aggregators only get it right for even numbers
+    if "One agent response" in question(messages):
+        number = int(question(messages).split("```")[1].split()[-1])
+        return f"the answer is {number}" if model_id == MODEL_A or number % 2 == 0 else "no idea"
+    return echo_responder(MODEL_A, messages)
+
+
+def should_score_aggregated_answers_with_shared_depths(dataset):
+    trial_config = TrialConfig(
+        bedrock_model_combinations=[[MODEL_A, MODEL_A]],
+        reflection_range=[0, 1],
+        aggregator_model_ids=[MODEL_A, MODEL_B],
+    )
+    shared_client = SimulatedBedrockClient(_debate_responder)
+    shared = Hive(client=shared_client).optimise(dataset, trial_config)
+    separate_client = SimulatedBedrockClient(_debate_responder)
+    separate = Hive(client=separate_client).optimise(
+        dataset, trial_config, share_reflection_rounds=False
+    )
+
+    # the aggregator debates as a third slot, so only the depths of each aggregator share rounds
+    assert shared_client.calls == {
+        MODEL_A: len(dataset) * ((3 * 2 + 2) + 2 * 2),
+        MODEL_B: len(dataset) * (2 + 2),
+    }
+    assert separate_client.calls == {
+        MODEL_A: len(dataset) * ((3 + 1) + (6 + 1) + 2 + 4),
+        MODEL_B: len(dataset) * ((1 + 1) + (2 + 1)),
+    }
+    for shared_result, separate_result in zip(
+        shared.individual_results, separate.individual_results
+    ):
+        assert shared_result.config == separate_result.config
+        assert shared_result.score == separate_result.score
+        assert shared_result.avg_cost_dollars == pytest.approx(separate_result.avg_cost_dollars)
+        assert 0 < shared_result.avg_aggregation_cost_dollars < shared_result.avg_cost_dollars
+    assert {r.config.aggregator_model_id: r.score for r in shared.individual_results} == {
+        MODEL_A: 1.0,
+        MODEL_B: 0.5,
+    }
+
+
+def should_match_standalone_outputs_when_sharing_debates():
+    hive = Hive(client=SimulatedBedrockClient(_debate_responder))
+    configs = [
+        HiveConfig(
+            bedrock_model_ids=[MODEL_A, MODEL_A], num_reflections=d, aggregator_model_id=MODEL_B
+        )
+        for d in (0, 1)
+    ]
+    messages = [{"role": "user", "content": [{"text": "Repeat the number 3"}]}]
+    outputs = hive._converse_shared(messages, configs)
+
+    for shared, _config in zip(outputs, configs):
+        standalone = hive.converse([dict(m) for m in messages], _config)
+        assert shared.output.model_dump() == standalone.model_dump()
+        assert shared.output.response == ["no idea", "the answer is 3", "the answer is 3"]
+        assert shared.answer == "no idea"
+        assert shared.slot_answers == ["the answer is 3"] * 3
+        assert MODEL_B in shared.debate_usage
+
+
+def should_group_verifier_free_configs_with_reflections():
+    def verifier(answer: str) -> str:
+        return "looks fine"
+
+    models = [MODEL_A, MODEL_B]
+    configs = [
+        HiveConfig(bedrock_model_ids=models, num_reflections=1, verifier=verifier),
+        HiveConfig(bedrock_model_ids=models, num_reflections=0),
+        HiveConfig(bedrock_model_ids=models, num_reflections=0, aggregator_model_id=MODEL_A),
+        HiveConfig(bedrock_model_ids=models, num_reflections=1),
+        HiveConfig(bedrock_model_ids=[MODEL_A], num_reflections=1),
+    ]
+    # the aggregator takes part in the debate, so config 2 cannot share it
+    assert config.group_shared_debates(configs) == [[0, 1], [3], [4], [2]]
+
+
+def should_not_share_depths_that_stop_at_a_tag():
+    configs = [
+        HiveConfig(bedrock_model_ids=[MODEL_A], num_reflections=d, stop_after_tag="</answer>")
+        for d in (0, 1)
+    ]
+    assert config.group_shared_debates(configs) == [[1], [0]]
+    hive = Hive(client=SimulatedBedrockClient(echo_responder))
+    with pytest.raises(ValueError, match="cannot share"):
+        hive._converse_shared([{"role": "user", "content": [{"text": "Repeat 1"}]}], configs)
+
+
+# --- Evaluator runner ---
+
+
+def should_score_units_with_batch_evaluator_runner(dataset, trial_config):
+    batches = []
+
+    def batch_evaluator(expected, generated):
+        batches.append(len(expected))
+        return answer_in_text_batch(expected, generated)
+
+    runner = EvaluatorRunner(batch_evaluator, batch=True, processes=0)
+    batched = Hive(client=SimulatedBedrockClient(echo_responder)).optimise(
+        dataset, trial_config, evaluator=runner
+    )
+    default = Hive(client=SimulatedBedrockClient(echo_responder)).optimise(dataset, trial_config)
+    assert [r.score for r in batched.individual_results] == [
+        r.score for r in default.individual_results
+    ]
+    # both depths give the same answer, as do both models on even samples
+    n_unique = len(dataset) + len(dataset) // 2
+    assert batches == [1] * n_unique
+    assert runner.n_cache_hits == len(dataset) * 4 - n_unique
+
+
+# --- Journal ---
+
+
+def should_resume_without_repeating_journaled_work(dataset, trial_config, tmp_path):
+    path = tmp_path / "run.jsonl"
+    first = Hive(client=SimulatedBedrockClient(echo_responder)).optimise(
+        dataset[:3], trial_config, journal_path=path
+    )
+    assert len(path.read_text().splitlines()) == 3 * 4
+
+    simulator = SimulatedBedrockClient(echo_responder)
+    resumed = Hive(client=simulator).optimise(dataset, trial_config, resume_from=path)
+    # only the three new samples are run, one two-round debate per model
+    assert simulator.calls == {MODEL_A: 3 * 2, MODEL_B: 3 * 2}
+    assert len(path.read_text().splitlines()) == 6 * 4
+    assert [r.n_samples for r in resumed.individual_results] == [6, 6, 6, 6]
+    assert first.individual_results[0].avg_cost_dollars == pytest.approx(
+        resumed.individual_results[0].avg_cost_dollars
+    )
+
+
+class _CountingDataset(Sequence):
+    def __init__(self, samples: list[tuple[str, str]]) -> None:
+        self.samples = samples
+        self.reads = [0] * len(samples)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def __getitem__(self, index):
+        self.reads[index] += 1
+        return self.samples[index]
+
+
+def should_read_each_sample_once_when_resuming(dataset, trial_config, tmp_path):
+    path = tmp_path / "run.jsonl"
+    Hive(client=SimulatedBedrockClient(echo_responder)).optimise(
+        dataset, trial_config, journal_path=path
+    )
+    counting = _CountingDataset(dataset)
+    Hive(client=SimulatedBedrockClient(echo_responder)).optimise(
+        counting, trial_config, resume_from=path
+    )
+    assert counting.reads == [1] * len(dataset)
+
+
+def should_rescore_journaled_answers_with_a_new_evaluator(dataset, trial_config, tmp_path):
+    path = tmp_path / "run.jsonl"
+    Hive(client=SimulatedBedrockClient(echo_responder)).optimise(
+        dataset, trial_config, journal_path=path
+    )
+    simulator = SimulatedBedrockClient(echo_responder)
+    rescored = Hive(client=simulator).optimise(
+        dataset, trial_config, resume_from=path, evaluator=lambda expected, answer: "idea" in answer
+    )
+    assert simulator.calls == {}
+    assert [r.score for r in rescored.individual_results] == [0.0, 0.0, 0.5, 0.5]
+    journal_entries = path.read_text().splitlines()
+    assert len(journal_entries) == len(dataset) * 4
+
+
+def should_skip_partially_written_journal_lines(dataset, trial_config, tmp_path):
+    path = tmp_path / "run.jsonl"
+    Hive(client=SimulatedBedrockClient(echo_responder)).optimise(
+        dataset, trial_config, journal_path=path
+    )
+    lines = path.read_text().splitlines()
+    path.write_text("\n".join(lines[:-1]) + "\n" + lines[-1][:20])
+
+    simulator = SimulatedBedrockClient(echo_responder)
+    Hive(client=simulator).optimise(
+        dataset, trial_config, journal_path=tmp_path / "copy.jsonl", resume_from=path
+    )
+    # only the truncated outcome is run again, without its journaled deeper sibling
+    assert sum(simulator.calls.values()) == 1
+    assert len((tmp_path / "copy.jsonl").read_text().splitlines()) == len(lines)
+
+
+def should_fingerprint_configs_stably():
+    def verifier(answer: str) -> str:
+        return answer
+
+    cfg = HiveConfig(bedrock_model_ids=[MODEL_A, MODEL_B], num_reflections=1, verifier=verifier)
+    assert cfg.fingerprint() == cfg.model_copy(deep=True).fingerprint()
+    assert cfg.fingerprint() != cfg.model_copy(update={"num_reflections": 2}).fingerprint()
@@ -0,0 +1,125 @@
+import io
+
+from PIL import Image
+
+from bhive import Hive, HiveConfig, ImagePreprocessing, preprocess
+from bhive.augment import augment_image
+from bhive.blobs import BlobStore
+from bhive.preprocess import preprocess_image
+from bhive.simulator import SimulatedBedrockClient
+
+MODEL_A = "amazon.nova-micro-v1:0"
+
+
+def _make_image_bytes(size=(3000, 1500), fmt="PNG", **save_kwargs) -> bytes:
+    img = Image.effect_noise(size, 64).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **save_kwargs)
+    return buf.getvalue()
+
+
+def _open(image_bytes: bytes) -> Image.Image:
+    return Image.open(io.BytesIO(image_bytes))
+
+
+def should_cap_the_longest_edge_and_strip_metadata():
+    exif = Image.Exif()
+    exif[0x010F] = "Camera maker"
+    original = _make_image_bytes(fmt="JPEG", exif=exif.tobytes())
+    processed, fmt = preprocess_image(original, ImagePreprocessing(max_edge_pixels=1000))
+    assert fmt == "jpeg"
+    assert _open(processed).size == (1000, 500)
+    assert "exif" not in _open(processed).info
+    assert len(processed) < len(original)
+
+
+def should_re_encode_to_the_target_format():
+    original = _make_image_bytes(size=(200, 200))
+    settings = ImagePreprocessing(format="jpeg", quality=50)
+    processed, fmt = preprocess_image(original, settings)
+    assert fmt == "jpeg"
+    assert _open(processed).format == "JPEG"
+    assert _open(processed).size == (200, 200)
+
+
+def should_keep_small_images_that_do_not_shrink():
+    original = _make_image_bytes(size=(20, 20))
+    settings = ImagePreprocessing(strip_metadata=False)
+    assert preprocess_image(original, settings) == (original, "png")
+
+
+def should_strip_metadata_even_when_it_does_not_shrink():
+    exif = Image.Exif()
+    exif[0x010F] = "Camera maker"
+    original = _make_image_bytes(size=(200, 200), fmt="JPEG", exif=exif.tobytes(), quality=50)
+    processed, fmt = preprocess_image(original, ImagePreprocessing(quality=100))
+    assert fmt == "jpeg"
+    assert "exif" not in _open(processed).info
+
+
+def should_only_keep_the_preprocessed_bytes():
+    store = BlobStore()
+    image = {"image": {"format": "png", "source": {"bytes": _make_image_bytes()}}}
+    messages = store.intern([{"role": "user", "content": [image, image]}])
+    settings = ImagePreprocessing(max_edge_pixels=600)
+    processed, _ = preprocess.preprocess_messages(messages, store, settings)
+    refs = {block["image"]["source"]["bytes"] for block in processed[0]["content"]}
+    assert len(refs) == 1 and len(store) == 1
+    assert _open(store.get(refs.pop())).size == (600, 300)
+
+
+def should_not_grow_rotated_images():
+    original = _make_image_bytes(size=(300, 200))
+    for _ in range(10):
+        width, height = _open(augment_image(original)).size
+        assert width <= 300 and height <= 200
+
+
+def should_send_preprocessed_images_and_report_savings():
+    received = []
+
+    def responder(model_id: str, messages: list[dict]) -> str:
+        received.append(messages[0]["content"][1]["image"])
+        return "noise"
+
+    original = _make_image_bytes()
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {"text": "What is in the image?"},
+                {"image": {"format": "png", "source": {"bytes": original}}},
+            ],
+        }
+    ]
+    hive_config = HiveConfig(
+        bedrock_model_ids=[MODEL_A] * 2,
+        num_reflections=1,
+        image_preprocessing=ImagePreprocessing(max_edge_pixels=600, format="webp"),
+    )
+    output = Hive(client=SimulatedBedrockClient(responder)).converse(messages, hive_config)
+
+    assert len(received) == 4
+    assert all(image["format"] == "webp" for image in received)
+    assert _open(received[0]["source"]["bytes"]).size == (600, 300)
+    stats = output.image_preprocessing
+    assert stats.n_images == 1
+    assert stats.bytes_before == len(original)
+    assert stats.bytes_saved > 0
+    assert stats.estimated_tokens_before == 6000
+    assert stats.estimated_tokens_saved == 6000 - 240
+
+
+def should_bound_the_preprocessed_cache_by_bytes():
+    cache = preprocess._PreprocessedCache(max_bytes=10)
+    for i in range(3):
+        cache.put(("digest", i), preprocess._PreprocessedImage(b"four", "png", 1, 1))
+    cache.put(("digest", "large"), preprocess._PreprocessedImage(b"x" * 11, "png", 1, 1))
+    assert (len(cache), cache.n_bytes) == (2, 8)
+    assert cache.get(("digest", 0)) is None
+    assert cache.get(("digest", 2)) is not None
+
+    cache.resize(4)
+    assert cache.get(("digest", 1)) is None and len(cache) == 1
+    cache.clear()
+    assert (len(cache), cache.n_bytes) == (0, 0)
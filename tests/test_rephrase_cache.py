@@ -0,0 +1,99 @@
+import pytest
+
+from bhive import Hive, HiveConfig, RephraseCache, TokenPrices
+from bhive.blobs import BlobStore
+from bhive.cost import ConverseUsage
+from bhive.rephrase_cache import rephrase_key
+from bhive.simulator import SimulatedBedrockClient
+
+MODEL_A = "amazon.nova-micro-v1:0"
+PRICES = {MODEL_A: TokenPrices(input_per_1000=1.0, output_per_1000=2.0)}
+
+
+def _generator(calls: list, n_variants: int):
+    def _generate():
+        calls.append(n_variants)
+        usage = ConverseUsage(inputTokens=1000, outputTokens=500)
+        return [f"variant {i}" for i in range(n_variants)], usage
+
+    return _generate
+
+
+def should_serve_fewer_variants_from_the_largest_generation():
+    cache = RephraseCache(cost_dictionary=PRICES)
+    calls = []
+    key = rephrase_key("What is 2+2?", MODEL_A)
+
+    assert cache.get_or_generate(key, 3, MODEL_A, _generator(calls, 3)) == [
+        "variant 0",
+        "variant 1",
+        "variant 2",
+    ]
+    assert cache.get_or_generate(key, 2, MODEL_A, _generator(calls, 2)) == [
+        "variant 0",
+        "variant 1",
+    ]
+    cache.get_or_generate(key, 4, MODEL_A, _generator(calls, 4))
+    cache.get_or_generate(key, 3, MODEL_A, _generator(calls, 3))
+
+    assert calls == [3, 4]
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.hit_rate) == (2, 2, 0.5)
+    assert stats.saved_input_tokens == 2000
+    assert stats.saved_cost == pytest.approx(4.0)
+
+
+def should_key_rephrasings_by_model_and_images():
+    store = BlobStore()
+    image = {"image": {"format": "png", "source": {"bytes": b"image"}}}
+    other_image = {"image": {"format": "png", "source": {"bytes": b"other image"}}}
+    key = rephrase_key("Describe this", MODEL_A, [{"text": "Describe this"}, image])
+
+    assert key == rephrase_key("Describe this", MODEL_A, store.intern_content([image]))
+    assert key != rephrase_key("Describe this", MODEL_A, [other_image])
+    assert key != rephrase_key("Describe this", "amazon.nova-lite-v1:0", [image])
+
+
+def should_persist_rephrasings_and_evict_least_recently_used(tmp_path):
+    path = tmp_path / "rephrasings.jsonl"
+    cache = RephraseCache(path, max_entries=2)
+    calls = []
+    keys = [rephrase_key(f"prompt {i}", MODEL_A) for i in range(3)]
+    for key in keys:
+        cache.get_or_generate(key, 2, MODEL_A, _generator(calls, 2))
+    assert len(cache) == 2
+    cache.get_or_generate(keys[0], 2, MODEL_A, _generator(calls, 2))
+    assert len(calls) == 4
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "partial')  # interrupted write
+    reloaded = RephraseCache(path)
+    for key in keys:
+        reloaded.get_or_generate(key, 2, MODEL_A, _generator(calls, 2))
+    assert len(calls) == 4
+    assert reloaded.stats.hits == 3
+
+
+def should_rephrase_repeated_prompts_once():
+    rephrase_calls = []
+
+    def responder(model_id, messages):
+        text = messages[-1]["content"][-1]["text"]
+        if "Rephrase the following" in text:
+            rephrase_calls.append(text)
+            return "<q1>What is two plus two?</q1><q2>What does 2+2 equal?</q2>"
+        return "4"
+
+    cache = RephraseCache()
+    hive = Hive(client=SimulatedBedrockClient(responder), rephrase_cache=cache)
+    three_slots = HiveConfig(bedrock_model_ids=[MODEL_A] * 3, augmentation_method="semantic")
+    two_slots = HiveConfig(bedrock_model_ids=[MODEL_A] * 2, augmentation_method="semantic")
+    for hive_config in (three_slots, three_slots, two_slots):
+        output = hive.converse(
+            [{"role": "user", "content": [{"text": "What is 2+2?"}]}], hive_config
+        )
+        prompts = [slot.chat_history[0]["content"][0]["text"] for slot in output.chat_history]
+        assert prompts[1] == "What is two plus two?"
+
+    assert len(rephrase_calls) == 1
+    assert cache.stats.hits == 2
@@ -0,0 +1,89 @@
+import multiprocessing
+import time
+
+import pytest
+
+from bhive import Hive, TrialConfig
+from bhive.evaluators import SampleResult
+from bhive.simulator import SimulatedBedrockClient
+from bhive.workqueue import WorkQueue
+from tests.responders import MODEL_A, MODEL_B, echo_responder
+
+DATASET = [(f"Repeat the number {i}", str(i)) for i in range(8)]
+TRIAL_CONFIG = TrialConfig(
+    bedrock_model_combinations=[[MODEL_A], [MODEL_B]], reflection_range=[0, 1]
+)
+
+
+def _run_worker(path: str) -> None:
+    queue = WorkQueue(path, lease_seconds=30.0, poll_interval_seconds=0.02)
+    hive = Hive(client=SimulatedBedrockClient(echo_responder, latency_seconds=0.005))
+    hive.work(queue, DATASET, TRIAL_CONFIG, max_workers=2)
+
+
+def should_match_local_results_with_worker_processes(tmp_path):
+    path = str(tmp_path / "queue.sqlite")
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_run_worker, args=(path,)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+
+    queue = WorkQueue(path, poll_interval_seconds=0.02)
+    coordinator = Hive(client=SimulatedBedrockClient(lambda *_: pytest.fail("runs locally")))
+    distributed = coordinator.optimise(DATASET, TRIAL_CONFIG, work_queue=queue)
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+    local_client = SimulatedBedrockClient(echo_responder, latency_seconds=0.005)
+    local = Hive(client=local_client).optimise(DATASET, TRIAL_CONFIG)
+    assert [r.model_dump() for r in distributed.individual_results] == [
+        r.model_dump() for r in local.individual_results
+    ]
+    assert queue.closed
+
+
+def should_reassign_items_after_a_worker_crash(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite", lease_seconds=0.05, poll_interval_seconds=0.01)
+    queue.initialise(["fingerprint"])
+    batch = queue.submit([(0, [0])], ["0:key"])
+
+    crashed = queue.claim("crashed-worker")
+    assert queue.claim("other-worker") is None  # still leased
+    time.sleep(0.1)
+    retried = queue.claim("other-worker")
+    assert retried.item_id == crashed.item_id
+
+    assert queue.complete(retried, [SampleResult(answer="42", score=1.0)])
+    assert not queue.complete(crashed, [SampleResult(answer="late")])
+    assert queue.wait(batch) == {(0, 0): SampleResult(answer="42", score=1.0)}
+
+
+def should_fail_items_after_repeated_lease_expiries(tmp_path):
+    queue = WorkQueue(
+        tmp_path / "queue.sqlite", lease_seconds=0.01, poll_interval_seconds=0.01, max_attempts=2
+    )
+    queue.initialise(["a", "b"])
+    batch = queue.submit([(3, [0, 1])], ["3:key"])
+    for _ in range(2):
+        assert queue.claim("crashing-worker") is not None
+        time.sleep(0.02)
+
+    outcomes = queue.wait(batch)
+    assert set(outcomes) == {(0, 3), (1, 3)}
+    assert all(not r.completed and "Lease expired" in r.error for r in outcomes.values())
+
+
+def should_reject_reused_queue(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite")
+    queue.initialise(["a"])
+    queue.submit([(0, [0])], ["0:key"])
+    with pytest.raises(ValueError):
+        queue.initialise(["a"])
+
+
+def should_reject_workers_with_a_different_trial_config(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite", poll_interval_seconds=0.01)
+    queue.initialise(["not-a-fingerprint"])
+    with pytest.raises(ValueError):
+        Hive(client=SimulatedBedrockClient()).work(queue, DATASET, TRIAL_CONFIG)